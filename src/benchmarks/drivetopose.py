@@ -0,0 +1,141 @@
+"""
+Measures how long `DriveToPoseCommand` takes to align the simulated robot from a range of offsets.
+
+Usage (from the `src` folder):
+
+  python -m benchmarks.drivetopose [--timeout SECONDS] [--scenario NAME ...] [--seed S]
+
+Starts the robot at every combination of distance, direction and heading offset from a goal, runs
+the command in a headless simulation until it finishes, and reports the time it took, how far
+the real (physics) robot ended from the goal and how far it went past it. Every offset runs with
+and without latency compensation, once per scenario of sensor errors of `benchmarks.odometry`.
+"""
+
+import argparse
+import itertools
+
+from wpilib.simulation import DriverStationSim
+from wpimath.geometry import Pose2d, Rotation2d, Transform2d, Translation2d
+
+from benchmarks.odometry import OdometryBenchmark, kScenarios
+from commands.DriveToPoseCommand import DriveToPoseCommand
+from constants import DriveToPoseConstants, SimulationConstants
+from simulation.headless import HeadlessMatch, setUpSimulation
+
+kGoal = Pose2d(4.0, 4.0, Rotation2d.fromDegrees(60))
+kDistances = (0.1, 0.25, 0.5, 1.0, 2.0)  # meters
+kDirections = (0, 135)  # degrees, from the goal's heading
+kHeadingOffsets = (0, 45, 180)  # degrees
+# Loops for the robot to stop between two runs
+kSettleLoops = 25
+
+
+class AlignResult:
+  def __init__(self, time: float, goal: Pose2d, pose: Pose2d, overshoot: float, aligned: bool):
+    self.time = time
+    self.translationError = pose.translation().distance(goal.translation())
+    self.headingError = abs((pose.rotation() - goal.rotation()).degrees())
+    self.overshoot = overshoot
+    self.aligned = aligned
+
+  def __str__(self) -> str:
+    return (
+      f"{self.time:6.2f} s {self.translationError * 100:5.1f} cm {self.headingError:5.1f} deg"
+      f" {self.overshoot * 100:5.1f} cm" + ("" if self.aligned else " (timed out)")
+    )
+
+
+def align(match: HeadlessMatch, start: Pose2d, latency: float, timeout: float) -> AlignResult:
+  DriverStationSim.setEnabled(False)
+  match.step(kSettleLoops)
+  match.resetPose(start)
+
+  DriverStationSim.setAutonomous(True)
+  DriverStationSim.setEnabled(True)
+  match.step()
+  command = DriveToPoseCommand(
+    match.robot.robotContainer.driveSubsystem, lambda: kGoal, timeout, latency
+  )
+  command.schedule()
+
+  # How far the real robot goes past the goal, along the line it came from
+  approach = kGoal.translation() - start.translation()
+  approach /= max(approach.norm(), 1e-9)
+  overshoot = 0.0
+
+  loops = 0
+  while command.isScheduled():
+    match.step()
+    loops += 1
+    past = match.physics.engine.pose.translation() - kGoal.translation()
+    overshoot = max(overshoot, past.X() * approach.X() + past.Y() * approach.Y())
+
+  return AlignResult(
+    loops * SimulationConstants.kLoopPeriod,
+    kGoal,
+    match.physics.engine.pose,
+    overshoot,
+    command.aligned,
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--timeout", type=float, default=DriveToPoseConstants.kTimeout)
+  parser.add_argument(
+    "--scenario",
+    action="append",
+    choices=kScenarios,
+    help="Sensor errors, defaults to ideal and combined + vision",
+  )
+  parser.add_argument("--seed", type=int, default=3985)
+  args = parser.parse_args()
+
+  setUpSimulation()
+  from robot import MyRobot
+
+  match = HeadlessMatch(MyRobot)
+  match.start()
+  # The physics engine is created on the robot's first loop
+  match.runPeriod(1.0, autonomous=False, enabled=False)
+  sensors = OdometryBenchmark(match, args.seed)
+
+  latencies = {"compensated": DriveToPoseConstants.kControlLatency, "uncompensated": 0.0}
+
+  print(f"Goal: {kGoal}")
+  for scenario in args.scenario or ("ideal", "combined + vision"):
+    sensors.setScenario(kScenarios[scenario])
+    results: dict[str, list[AlignResult]] = {name: [] for name in latencies}
+
+    print(f"\n{scenario}: time, final error, overshoot")
+    print(f"{'offset':>7} {'dir':>5} {'turn':>5}  " + "  ".join(f"{name:44}" for name in latencies))
+    for distance, direction, headingOffset in itertools.product(
+      kDistances, kDirections, kHeadingOffsets
+    ):
+      start = kGoal.transformBy(
+        Transform2d(
+          Translation2d(distance, Rotation2d.fromDegrees(direction)),
+          Rotation2d.fromDegrees(headingOffset),
+        )
+      )
+      row = []
+      for name, latency in latencies.items():
+        result = align(match, start, latency, args.timeout)
+        results[name].append(result)
+        row.append(f"{str(result):44}")
+      print(f"{distance:5.2f} m {direction:5} {headingOffset:5}  " + "  ".join(row))
+
+    for name, nameResults in results.items():
+      times = [result.time for result in nameResults]
+      print(
+        f"{name}: mean {sum(times) / len(times):.2f} s, max {max(times):.2f} s to align,"
+        f" max error {max(result.translationError for result in nameResults) * 100:.1f} cm,"
+        f" max overshoot {max(result.overshoot for result in nameResults) * 100:.1f} cm,"
+        f" {sum(not result.aligned for result in nameResults)} timed out"
+      )
+
+  match.stop()
+
+
+if __name__ == "__main__":
+  main()
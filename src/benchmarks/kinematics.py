@@ -0,0 +1,97 @@
+"""
+Compares the WPILib object based swerve setpoint path with `SwerveKinematics`.
+
+Usage (from the `src` folder):
+
+  python -m benchmarks.kinematics [--iterations N]
+"""
+
+import argparse
+import math
+import timeit
+
+from wpimath.geometry import Rotation2d
+from wpimath.kinematics import ChassisSpeeds, SwerveDrive4Kinematics, SwerveModuleState
+
+from constants import DriveSubsystemConstants
+from utils.swervekinematics import SwerveKinematics
+
+kOffsets = (
+  DriveSubsystemConstants.kFrontLeftChassisAngularOffset,
+  DriveSubsystemConstants.kFrontRightChassisAngularOffset,
+  DriveSubsystemConstants.kBackLeftChassisAngularOffset,
+  DriveSubsystemConstants.kBackRightChassisAngularOffset,
+)
+
+# Field relative joystick input at full speed, the worst case for both paths
+kInput = (1.0, 0.4, 0.8)
+kHeading = 0.7
+kCurrentAngles = [0.3, 1.2, 4.0, 5.5]
+
+
+def objectPath():
+  """
+  `DriveSubsystem.drive` and `SwerveModule.setDesiredState` before the fast path.
+  """
+  speeds = ChassisSpeeds.fromFieldRelativeSpeeds(
+    kInput[0] * DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+    kInput[1] * DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+    kInput[2] * DriveSubsystemConstants.kMaxAngularSpeed,
+    Rotation2d(kHeading),
+  )
+  states = SwerveDrive4Kinematics.desaturateWheelSpeeds(
+    DriveSubsystemConstants.kDriveKinematics.toSwerveModuleStates(speeds),
+    DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+  )
+
+  setpoints = []
+  for state, offset, current in zip(states, kOffsets, kCurrentAngles):
+    corrected = SwerveModuleState()
+    corrected.speed = state.speed
+    corrected.angle = state.angle.__add__(Rotation2d.fromDegrees(math.degrees(offset)))
+    corrected.optimize(Rotation2d(current))
+    setpoints.append((corrected.speed, corrected.angle.radians()))
+  return setpoints
+
+
+kinematics = SwerveKinematics(
+  DriveSubsystemConstants.kDriveKinematics.getModules(),
+  kOffsets,
+  DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+)
+kHeadingRotation = Rotation2d(kHeading)
+
+
+def fastPath():
+  """
+  `DriveSubsystem.drive` with `SwerveKinematics`.
+  """
+  xSpeed = kInput[0] * DriveSubsystemConstants.kMaxSpeedMetersPerSecond
+  ySpeed = kInput[1] * DriveSubsystemConstants.kMaxSpeedMetersPerSecond
+  cos = kHeadingRotation.cos()
+  sin = kHeadingRotation.sin()
+  kinematics.calculate(
+    xSpeed * cos + ySpeed * sin,
+    -xSpeed * sin + ySpeed * cos,
+    kInput[2] * DriveSubsystemConstants.kMaxAngularSpeed,
+    kCurrentAngles,
+  )
+  return kinematics.speeds, kinematics.angles
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--iterations", type=int, default=20000)
+  args = parser.parse_args()
+
+  results = {}
+  for name, function in (("WPILib objects", objectPath), ("SwerveKinematics", fastPath)):
+    best = min(timeit.repeat(function, number=args.iterations, repeat=5)) / args.iterations
+    results[name] = best
+    print(f"{name:18} {best * 1e6:8.2f} us per call")
+
+  print(f"Speedup:           {results['WPILib objects'] / results['SwerveKinematics']:8.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,208 @@
+"""
+Measures how far the drive's pose estimate drifts from the simulated robot's real pose.
+
+Usage (from the `src` folder):
+
+  python -m benchmarks.odometry [--scenario NAME ...] [--path NAME ...] [--seed S]
+    [--encoder-noise M] [--wheel-slip F] [--gyro-drift DEG/S]
+    [--vision-rate FPS] [--vision-latency S] [--vision-noise M]
+
+Follows every path in `deploy/pathplanner/paths` with the full robot code in a headless
+simulation, once per scenario of sensor errors, and compares `DriveSubsystem.getPose()` with the
+physics engine's ground truth every loop. Giving any of the error options runs them as a "custom"
+scenario instead of the predefined ones.
+"""
+
+import argparse
+import math
+import pathlib
+import typing
+
+import hal
+from commands2 import Command
+from pathplannerlib.auto import AutoBuilder
+from pathplannerlib.path import PathPlannerPath
+from wpilib.simulation import DriverStationSim
+from wpimath.geometry import Pose2d
+
+from constants import SimulationConstants
+from simulation.headless import HeadlessMatch, setUpSimulation
+
+kPathsPath = pathlib.Path(__file__).parent.parent / "deploy/pathplanner/paths"
+
+# Loops to keep measuring once the path is done, and to wait for the robot to settle before it
+kSettleLoops = 25
+# Paths that take longer than this (seconds) are cut short
+kMaxPathTime = 30.0
+
+
+class Scenario(typing.NamedTuple):
+  encoderNoise: float = 0.0
+  """Standard deviation of the error on every drive encoder reading (meters)."""
+  wheelSlip: float = 0.0
+  """Average fraction of the wheels' travel that doesn't move the robot."""
+  gyroDrift: float = 0.0
+  """Degrees per second."""
+  visionRate: float = 0.0
+  """Limelight frames per second, 0 for no vision."""
+  visionLatency: float = 0.0
+  """Seconds from capture to publication."""
+  visionNoise: float = 0.0
+  """Standard deviation of the error on x and y (meters)."""
+
+
+kScenarios = {
+  "ideal": Scenario(),
+  "encoder noise": Scenario(encoderNoise=0.002),
+  "wheel slip": Scenario(wheelSlip=0.03),
+  "gyro drift": Scenario(gyroDrift=0.5),
+  "combined": Scenario(encoderNoise=0.002, wheelSlip=0.03, gyroDrift=0.5),
+  "combined + vision": Scenario(
+    encoderNoise=0.002,
+    wheelSlip=0.03,
+    gyroDrift=0.5,
+    visionRate=20,
+    visionLatency=0.05,
+    visionNoise=0.05,
+  ),
+}
+
+
+class PoseErrors:
+  """
+  Translation and heading errors of the pose estimate, one per loop.
+  """
+
+  def __init__(self):
+    self.translation: list[float] = []
+    self.heading: list[float] = []
+
+  def add(self, estimate: Pose2d, truth: Pose2d):
+    self.translation.append(estimate.translation().distance(truth.translation()))
+    self.heading.append(abs((estimate.rotation() - truth.rotation()).degrees()))
+
+  def extend(self, other: "PoseErrors"):
+    self.translation.extend(other.translation)
+    self.heading.extend(other.heading)
+
+  @staticmethod
+  def rms(errors: list[float]) -> float:
+    return math.sqrt(sum(error * error for error in errors) / len(errors))
+
+  def __str__(self) -> str:
+    return (
+      f"{self.rms(self.translation) * 100:8.2f} {max(self.translation) * 100:8.2f}"
+      f" {self.rms(self.heading):9.3f} {max(self.heading):9.3f}"
+    )
+
+
+class OdometryBenchmark:
+  def __init__(self, match: HeadlessMatch, seed: int):
+    self.match = match
+    self.engine = match.physics.engine
+    self.drive = match.robot.robotContainer.driveSubsystem
+    self.seed = seed
+
+  def setScenario(self, scenario: Scenario):
+    for i, module in enumerate(self.engine.modules):
+      module.random.seed(self.seed + i)
+      module.encoderNoise = scenario.encoderNoise
+      module.wheelSlip = scenario.wheelSlip
+
+    self.engine.gyro.drift = math.radians(scenario.gyroDrift)
+
+    for i, limelight in enumerate(self.engine.limelights):
+      limelight.random.seed(self.seed + 100 + i)
+      limelight.frameRate = scenario.visionRate
+      limelight.latency = scenario.visionLatency
+      limelight.noise = scenario.visionNoise
+
+  def followPath(self, path: PathPlannerPath) -> PoseErrors:
+    """
+    Puts the robot (the real one and the estimate) at the start of a path, follows it and returns
+    the estimate's error every loop.
+    """
+    DriverStationSim.setEnabled(False)
+    self.match.step(kSettleLoops)
+    self.match.resetPose(path.getStartingHolonomicPose() or Pose2d(path.getPoint(0).position, 0))
+
+    DriverStationSim.setAutonomous(True)
+    DriverStationSim.setEnabled(True)
+    self.match.step()
+    command: Command = AutoBuilder.followPath(path)
+    command.schedule()
+
+    errors = PoseErrors()
+    # The estimate is updated from sensors read at the start of the loop, before the physics
+    # moves the robot at its end: compare it with where the robot was at the end of the last loop
+    truth = self.engine.pose
+    loops = 0
+    remaining = kSettleLoops
+    while remaining > 0 and loops * SimulationConstants.kLoopPeriod < kMaxPathTime:
+      self.match.step()
+      errors.add(self.drive.getPose(), truth)
+      truth = self.engine.pose
+      loops += 1
+      if not command.isScheduled():
+        remaining -= 1
+
+    command.cancel()
+    return errors
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument(
+    "--scenario", action="append", choices=kScenarios, help="Defaults to all of them"
+  )
+  parser.add_argument(
+    "--path",
+    action="append",
+    help="Name of a path in deploy/pathplanner/paths, defaults to all of them",
+  )
+  parser.add_argument("--seed", type=int, default=3985)
+  parser.add_argument("--encoder-noise", dest="encoderNoise", type=float, metavar="M")
+  parser.add_argument("--wheel-slip", dest="wheelSlip", type=float, metavar="F")
+  parser.add_argument("--gyro-drift", dest="gyroDrift", type=float, metavar="DEG/S")
+  parser.add_argument("--vision-rate", dest="visionRate", type=float, metavar="FPS")
+  parser.add_argument("--vision-latency", dest="visionLatency", type=float, metavar="S")
+  parser.add_argument("--vision-noise", dest="visionNoise", type=float, metavar="M")
+  args = parser.parse_args()
+
+  custom = {
+    field: getattr(args, field) for field in Scenario._fields if getattr(args, field) is not None
+  }
+  if custom:
+    scenarios = {"custom": Scenario(**custom)}
+  else:
+    scenarios = {name: kScenarios[name] for name in args.scenario or kScenarios}
+  pathNames = args.path or sorted(path.stem for path in kPathsPath.glob("*.path"))
+
+  setUpSimulation()
+  # Paths aren't flipped for the blue alliance, the start poses are the ones in the files
+  DriverStationSim.setAllianceStationId(hal.AllianceStationID.kBlue1)
+
+  from robot import MyRobot
+
+  match = HeadlessMatch(MyRobot)
+  match.start()
+  # The physics engine is created on the robot's first loop
+  match.runPeriod(1.0, autonomous=False, enabled=False)
+  benchmark = OdometryBenchmark(match, args.seed)
+  paths = [PathPlannerPath.fromPathFile(name) for name in pathNames]
+
+  print(f"Paths: {', '.join(pathNames)}")
+  print(f"{'':20} {'translation (cm)':>17} {'heading (deg)':>19}")
+  print(f"{'Scenario':20} {'RMS':>8} {'max':>8} {'RMS':>9} {'max':>9}")
+  for name, scenario in scenarios.items():
+    benchmark.setScenario(scenario)
+    errors = PoseErrors()
+    for path in paths:
+      errors.extend(benchmark.followPath(path))
+    print(f"{name:20} {errors}")
+
+  match.stop()
+
+
+if __name__ == "__main__":
+  main()
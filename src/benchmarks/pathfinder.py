@@ -0,0 +1,96 @@
+"""
+Compares the planning latency of `GridPathfinder` with PathPlanner's `LocalADStar` on the real
+navgrid, between random start and goal cells.
+
+Usage (from the `src` folder):
+
+  python -m benchmarks.pathfinder [--pairs N] [--seed S]
+"""
+
+import argparse
+import pathlib
+import random
+import time
+
+from wpimath.geometry import Translation2d
+
+from utils.deploy import useRobotDeployDirectory
+from utils.gridpathfinder import GridPathfinder, NavGrid
+
+kNavGridPath = pathlib.Path(__file__).parent.parent / "deploy/pathplanner/navgrid.json"
+
+
+def localADStarPlanner():
+  """
+  The work `LocalADStar` does before its first path is available, without its polling thread.
+  """
+  useRobotDeployDirectory()
+  from pathplannerlib.pathfinders import LocalADStar
+
+  pathfinder = LocalADStar()
+  # Let its thread finish the empty request it starts with
+  time.sleep(0.5)
+
+  def plan(start: Translation2d, goal: Translation2d):
+    obstacles = pathfinder._staticObstacles
+    startCell = pathfinder._findClosestNonObstacle(pathfinder._getGridPos(start), obstacles)
+    goalCell = pathfinder._findClosestNonObstacle(pathfinder._getGridPos(goal), obstacles)
+    pathfinder._eps = LocalADStar._EPS
+    pathfinder._reset(startCell, goalCell)
+    pathfinder._computeOrImprovePath(startCell, goalCell, obstacles)
+    cells = pathfinder._extractPath(startCell, goalCell, obstacles)
+    return pathfinder._createWaypoints(cells, start, goal, obstacles)
+
+  return plan
+
+
+def gridPathfinderPlanner(grid: NavGrid):
+  pathfinder = GridPathfinder(grid)
+
+  def plan(start: Translation2d, goal: Translation2d):
+    return GridPathfinder.createWaypoints(pathfinder.plan(start, goal))
+
+  return plan
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--pairs", type=int, default=200)
+  parser.add_argument("--seed", type=int, default=3985)
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  grid = NavGrid.fromFile(kNavGridPath)
+  print(f"NavGrid loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+  rng = random.Random(args.seed)
+  freeCells = [cell for cell in range(grid.cellCount) if not grid.isBlocked(cell)]
+  pairs = [
+    (grid.getCellCenter(start), grid.getCellCenter(goal))
+    for start, goal in (rng.sample(freeCells, 2) for _ in range(args.pairs))
+  ]
+
+  results = {}
+  for name, plan in (
+    ("LocalADStar", localADStarPlanner()),
+    ("GridPathfinder", gridPathfinderPlanner(grid)),
+  ):
+    latencies = []
+    for start, goal in pairs:
+      startTime = time.perf_counter()
+      plan(start, goal)
+      latencies.append(time.perf_counter() - startTime)
+    latencies.sort()
+
+    results[name] = latencies[len(latencies) // 2]
+    print(
+      f"{name:15} p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms, "
+      f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms, "
+      f"max {latencies[-1] * 1000:7.2f} ms"
+    )
+
+  print(f"Speedup (p50):  {results['LocalADStar'] / results['GridPathfinder']:7.1f}x")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,137 @@
+"""
+Compares `PoseHistory` with WPILib's `TimeInterpolatablePose2dBuffer` and a deque of objects.
+
+Usage (from the `src` folder):
+
+  python -m benchmarks.posehistory [--iterations N]
+"""
+
+import argparse
+import bisect
+import collections
+import math
+import timeit
+import tracemalloc
+
+from wpimath.geometry import Pose2d
+from wpimath.interpolation import TimeInterpolatablePose2dBuffer
+from wpimath.kinematics import ChassisSpeeds
+
+from constants import DriveSubsystemConstants, RobotConstants
+from utils.posehistory import PoseHistory
+
+kPeriod = RobotConstants.kLoopPeriod
+kDuration = DriveSubsystemConstants.kPoseHistoryDuration
+kPose = Pose2d(3.0, 4.0, 0.5)
+kSpeeds = ChassisSpeeds(1.0, 0.5, 0.2)
+
+
+class ObjectHistory:
+  """
+  The straightforward version: a deque of (timestamp, pose, speeds) tuples and bisect.
+  """
+
+  def __init__(self):
+    self.samples: collections.deque[tuple[float, Pose2d, ChassisSpeeds]] = collections.deque(
+      maxlen=math.ceil(kDuration / kPeriod) + 1
+    )
+    self.timestamps: collections.deque[float] = collections.deque(maxlen=self.samples.maxlen)
+
+  def add(self, timestamp: float, pose: Pose2d, speeds: ChassisSpeeds):
+    # Copies, since the caller's objects would otherwise be shared
+    self.samples.append(
+      (timestamp, Pose2d(pose.translation(), pose.rotation()), ChassisSpeeds(*speeds))
+    )
+    self.timestamps.append(timestamp)
+
+  def getPose(self, timestamp: float) -> Pose2d:
+    i = max(1, min(bisect.bisect_right(self.timestamps, timestamp), len(self.samples) - 1))
+    before, after = self.samples[i - 1], self.samples[i]
+    t = min(max((timestamp - before[0]) / (after[0] - before[0]), 0.0), 1.0)
+    start, end = before[1], after[1]
+    return Pose2d(
+      start.translation() + (end.translation() - start.translation()) * t,
+      start.rotation() + (end.rotation() - start.rotation()) * t,
+    )
+
+
+class WPILibHistory:
+  def __init__(self):
+    self.buffer = TimeInterpolatablePose2dBuffer(kDuration)
+
+  def add(self, timestamp: float, pose: Pose2d, speeds: ChassisSpeeds):
+    self.buffer.addSample(timestamp, pose)
+
+  def getPose(self, timestamp: float) -> Pose2d:
+    return self.buffer.sample(timestamp)
+
+
+def fill(history, samples: int, start: int = 0):
+  for i in range(start, start + samples):
+    history.add(i * kPeriod, kPose, kSpeeds)
+
+
+def retainedBytes(factory) -> tuple[float, int]:
+  """
+  Python memory kept per sample while filling an empty history, and kept by adding ten more
+  histories worth of samples once it is full.
+  """
+  capacity = math.ceil(kDuration / kPeriod) + 1
+  ignored = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+  def allocated(start: tracemalloc.Snapshot) -> int:
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignored)
+    return sum(stat.size_diff for stat in snapshot.compare_to(start, "filename"))
+
+  tracemalloc.start()
+  history = factory()
+  empty = tracemalloc.take_snapshot().filter_traces(ignored)
+  fill(history, capacity)
+  perSample = allocated(empty) / capacity
+  full = tracemalloc.take_snapshot().filter_traces(ignored)
+  fill(history, 10 * capacity, capacity)
+  growth = allocated(full)
+  tracemalloc.stop()
+  return perSample, growth
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--iterations", type=int, default=20000)
+  args = parser.parse_args()
+
+  print(f"{'':18} {'add':>10} {'lookup':>10} {'bytes/sample':>13} {'growth when full':>17}")
+  # Between two samples, a vision frame's latency (about 40 ms) before the newest one
+  query = 199 * kPeriod - 0.041
+  for name, factory in (
+    ("Deque of objects", ObjectHistory),
+    ("WPILib buffer", WPILibHistory),
+    ("PoseHistory", PoseHistory),
+  ):
+    history = factory()
+    fill(history, 200)
+    lookupTime = min(
+      timeit.repeat(lambda: history.getPose(query), number=args.iterations, repeat=5)
+    )
+
+    counter = iter(range(200, 10**9))
+    addTime = min(
+      timeit.repeat(
+        lambda: history.add(next(counter) * kPeriod, kPose, kSpeeds),
+        number=args.iterations,
+        repeat=5,
+      )
+    )
+
+    perSample, growth = retainedBytes(factory)
+    print(
+      f"{name:18} {addTime / args.iterations * 1e6:7.2f} us"
+      f" {lookupTime / args.iterations * 1e6:7.2f} us {perSample:13.0f}"
+      f" {growth:15d} B"
+    )
+
+  print("WPILib keeps its samples in C++, out of sight of tracemalloc.")
+
+
+if __name__ == "__main__":
+  main()
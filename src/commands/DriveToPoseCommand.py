@@ -0,0 +1,153 @@
+import math
+import typing
+
+from commands2 import Command
+from wpilib import Timer
+from wpimath.controller import ProfiledPIDController, ProfiledPIDControllerRadians
+from wpimath.filter import Debouncer
+from wpimath.geometry import Pose2d, Twist2d
+from wpimath.kinematics import ChassisSpeeds
+from wpimath.trajectory import TrapezoidProfile, TrapezoidProfileRadians
+
+from constants import DriveToPoseConstants, RobotConstants
+
+if typing.TYPE_CHECKING:
+  from subsystems.DriveSubsystem import DriveSubsystem
+
+
+class DriveToPoseCommand(Command):
+  """
+  Drives straight to a field pose and holds it, for the last meter or two before scoring.
+
+  x, y and heading each follow a trapezoid profile, with the profile's velocity as feedforward and
+  a P controller on the error. The profiles start from the robot's current pose and speeds, so
+  the command can take over from a path or the driver without a jerk. The x and y constraints are
+  shared in proportion to the distance left on each axis, so both arrive together.
+
+  The pose estimate is from sensors read at the start of the loop, and the speeds sent now take
+  effect a loop later: the controllers run on the estimate moved forward by the current speeds
+  over that latency. The command ends once the robot has been within tolerance for
+  `kSettleTime`, or after `timeout` (`aligned` tells which).
+  """
+
+  def __init__(
+    self,
+    drive: "DriveSubsystem",
+    goal: typing.Callable[[], Pose2d],
+    timeout: float = DriveToPoseConstants.kTimeout,
+    latency: float = DriveToPoseConstants.kControlLatency,
+    period: float = RobotConstants.kLoopPeriod,
+  ):
+    """
+    :param goal: Returns the field pose to drive to, read when the command starts.
+    :param timeout: Time (seconds) after which the command gives up.
+    :param latency: Time (seconds) from reading the sensors to the modules reaching the speeds.
+    :param period: Time (seconds) between two calls to `execute()`.
+    """
+    super().__init__()
+    self.drive = drive
+    self.goalSupplier = goal
+    self.timeout = timeout
+    self.latency = latency
+
+    translationConstraints = TrapezoidProfile.Constraints(
+      DriveToPoseConstants.kMaxVelocity, DriveToPoseConstants.kMaxAcceleration
+    )
+    self.xController = ProfiledPIDController(
+      DriveToPoseConstants.kTranslationP, 0, 0, translationConstraints, period
+    )
+    self.yController = ProfiledPIDController(
+      DriveToPoseConstants.kTranslationP, 0, 0, translationConstraints, period
+    )
+    self.headingController = ProfiledPIDControllerRadians(
+      DriveToPoseConstants.kRotationP,
+      0,
+      0,
+      TrapezoidProfileRadians.Constraints(
+        DriveToPoseConstants.kMaxAngularVelocity, DriveToPoseConstants.kMaxAngularAcceleration
+      ),
+      period,
+    )
+    self.headingController.enableContinuousInput(-math.pi, math.pi)
+
+    self.goal = Pose2d()
+    self.timer = Timer()
+    self.inTolerance = Debouncer(DriveToPoseConstants.kSettleTime)
+    self.aligned = False
+
+    self.addRequirements(drive)
+
+  def initialize(self):
+    self.goal = self.goalSupplier()
+    pose = self.drive.getPose()
+    # In the pose estimate's frame, which isn't the gyro's once the odometry was reset
+    speeds = ChassisSpeeds.fromRobotRelativeSpeeds(
+      self.drive.getRobotRelativeSpeeds(), pose.rotation()
+    )
+
+    # Straight line: each axis gets its share of the constraints
+    dx = self.goal.X() - pose.X()
+    dy = self.goal.Y() - pose.Y()
+    distance = math.hypot(dx, dy)
+    for controller, delta in ((self.xController, dx), (self.yController, dy)):
+      fraction = max(
+        abs(delta) / distance if distance > 0 else 1, DriveToPoseConstants.kMinAxisFraction
+      )
+      controller.setConstraints(
+        TrapezoidProfile.Constraints(
+          DriveToPoseConstants.kMaxVelocity * fraction,
+          DriveToPoseConstants.kMaxAcceleration * fraction,
+        )
+      )
+
+    self.xController.reset(pose.X(), speeds.vx)
+    self.yController.reset(pose.Y(), speeds.vy)
+    self.headingController.reset(pose.rotation().radians(), speeds.omega)
+    self.xController.setGoal(self.goal.X())
+    self.yController.setGoal(self.goal.Y())
+    self.headingController.setGoal(self.goal.rotation().radians())
+
+    self.timer.restart()
+    self.inTolerance.calculate(False)
+    self.aligned = False
+
+  def getPredictedPose(self) -> Pose2d:
+    """
+    Where the robot will be when the speeds sent this loop take effect.
+    """
+    snapshot = self.drive.getSnapshot()
+    speeds = snapshot.robotRelativeSpeeds
+    dt = Timer.getFPGATimestamp() - snapshot.timestamp + self.latency
+    return self.drive.getPose().exp(Twist2d(speeds.vx * dt, speeds.vy * dt, speeds.omega * dt))
+
+  def execute(self):
+    pose = self.getPredictedPose()
+
+    vx = self.xController.calculate(pose.X()) + self.xController.getSetpoint().velocity
+    vy = self.yController.calculate(pose.Y()) + self.yController.getSetpoint().velocity
+    omega = (
+      self.headingController.calculate(pose.rotation().radians())
+      + self.headingController.getSetpoint().velocity
+    )
+    self.drive.driveRobotRelative(
+      ChassisSpeeds.fromFieldRelativeSpeeds(vx, vy, omega, pose.rotation())
+    )
+
+    self.aligned = self.inTolerance.calculate(self.isInTolerance())
+
+  def isInTolerance(self) -> bool:
+    pose = self.drive.getPose()
+    speeds = self.drive.getRobotRelativeSpeeds()
+    return (
+      pose.translation().distance(self.goal.translation())
+      <= DriveToPoseConstants.kTranslationTolerance
+      and abs((pose.rotation() - self.goal.rotation()).radians())
+      <= DriveToPoseConstants.kHeadingTolerance
+      and math.hypot(speeds.vx, speeds.vy) <= DriveToPoseConstants.kVelocityTolerance
+    )
+
+  def isFinished(self) -> bool:
+    return self.aligned or self.timer.hasElapsed(self.timeout)
+
+  def end(self, interrupted: bool):
+    self.drive.driveRobotRelative(ChassisSpeeds())
@@ -0,0 +1,81 @@
+import typing
+
+from commands2 import Command
+from wpimath.trajectory import TrapezoidProfile
+
+from constants import ElevatorSubsystemConstants, RobotConstants
+
+if typing.TYPE_CHECKING:
+  from subsystems.ElevatorSubsystem import ElevatorSubsystem
+
+
+class ElevatorProfileCommand(Command):
+  """
+  Moves the elevator to a goal along a trapezoid motion profile.
+
+  Every loop, the next profile setpoint is sent to the Spark's position controller along with the
+  feedforward (gravity, velocity and acceleration) for the move from the last setpoint to it.
+  Changing the goal while moving continues from the current setpoint, so the carriage is never
+  asked to jump to another velocity. Once there, the command keeps holding the goal (position
+  controller and gravity feedforward) until it is interrupted: the elevator's default command
+  would stop the motors and let the carriage sag.
+  """
+
+  def __init__(
+    self,
+    elevator: "ElevatorSubsystem",
+    goal: float = 0.0,
+    period: float = RobotConstants.kLoopPeriod,
+  ):
+    """
+    :param goal: Position (motor rotations) to move to.
+    :param period: Time (seconds) between two calls to `execute()`.
+    """
+    super().__init__()
+    self.elevator = elevator
+    self.period = period
+    self.profile = TrapezoidProfile(
+      TrapezoidProfile.Constraints(
+        ElevatorSubsystemConstants.kProfileMaxVelocity,
+        ElevatorSubsystemConstants.kProfileMaxAcceleration,
+      )
+    )
+    self.goal = TrapezoidProfile.State(goal, 0)
+    self.setpoint = TrapezoidProfile.State()
+
+    self.addRequirements(elevator)
+
+  def setGoal(self, goal: float):
+    """
+    Changes the position to move to, without restarting the profile if it is running.
+    """
+    self.goal = TrapezoidProfile.State(goal, 0)
+
+  def moveTo(self, goal: float):
+    """
+    Retargets the command if it is running, schedules it otherwise.
+    """
+    self.setGoal(goal)
+    if not self.isScheduled():
+      self.schedule()
+
+  def initialize(self):
+    self.setpoint = TrapezoidProfile.State(self.elevator.getPosition(), self.elevator.getVelocity())
+
+  def execute(self):
+    nextSetpoint = self.profile.calculate(self.period, self.setpoint, self.goal)
+    self.elevator.followSetpoint(
+      nextSetpoint.position, self.setpoint.velocity, nextSetpoint.velocity
+    )
+    self.setpoint = nextSetpoint
+
+  def atGoal(self) -> bool:
+    """
+    Whether the carriage reached the goal and stopped there.
+    """
+    return (
+      self.setpoint == self.goal
+      and abs(self.elevator.getPosition() - self.goal.position)
+      <= ElevatorSubsystemConstants.kPositionTolerance
+      and abs(self.elevator.getVelocity()) <= ElevatorSubsystemConstants.kVelocityTolerance
+    )
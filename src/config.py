@@ -3,42 +3,73 @@ import math
 from pathplannerlib.config import PIDConstants
 from rev import ClosedLoopConfig, SparkBaseConfig, SparkMaxConfig
 
-from constants import ElevatorSubsystemConstants, SwerveModuleConstants
+from constants import (
+  DriveSubsystemConstants,
+  ElevatorSubsystemConstants,
+  PickupSubsystemConstants,
+  SwerveModuleConstants,
+)
+from utils.lazy import LazyClassAttribute
 
 
 class Config:
+  """
+  Motor controller configs are built the first time they are read (see `LazyClassAttribute`),
+  not when this module is imported.
+  """
+
   class MAXSwerveModule:
     ### Drive Motor Configurations ###
     drivingFactor = (
-      SwerveModuleConstants.kWheelDiameter / SwerveModuleConstants.kDriveMotorReduction
+      SwerveModuleConstants.kWheelCircumference / SwerveModuleConstants.kDriveMotorReduction
     )
-    drivingVelocityFeedForward = 0
+    drivingVelocityFeedForward = 1 / SwerveModuleConstants.kWheelFreeSpeedRotationsPerSecond
 
-    driveConfig = SparkBaseConfig()
-    driveConfig.setIdleMode(SparkBaseConfig.IdleMode.kBrake).smartCurrentLimit(50).inverted(False)
+    @LazyClassAttribute
+    def driveConfig(cls) -> SparkBaseConfig:
+      driveConfig = SparkBaseConfig()
+      driveConfig.setIdleMode(SparkBaseConfig.IdleMode.kBrake).smartCurrentLimit(
+        SwerveModuleConstants.kDriveCurrentLimit
+      ).inverted(False)
 
-    driveConfig.encoder.positionConversionFactor(drivingFactor).velocityConversionFactor(
-      drivingFactor / 60
-    )
+      driveConfig.encoder.positionConversionFactor(cls.drivingFactor).velocityConversionFactor(
+        cls.drivingFactor / 60
+      )
+
+      driveConfig.closedLoop.setFeedbackSensor(ClosedLoopConfig.FeedbackSensor.kPrimaryEncoder).pid(
+        0.1, 0, 0
+      ).velocityFF(cls.drivingVelocityFeedForward).outputRange(-1, 1)
 
-    driveConfig.closedLoop.setFeedbackSensor(ClosedLoopConfig.FeedbackSensor.kPrimaryEncoder).pid(
-      0.1, 0, 0
-    ).velocityFF(drivingVelocityFeedForward).outputRange(-1, 1)
+      # Published as often as the odometry thread samples it
+      driveConfig.signals.primaryEncoderPositionPeriodMs(DriveSubsystemConstants.kOdometryPeriodMs)
+
+      return driveConfig
 
     ### Trun Motor Config ###
     kTurningFactor = 2 * math.pi
 
-    turnConfig = SparkBaseConfig()
-    turnConfig.setIdleMode(SparkBaseConfig.IdleMode.kBrake).smartCurrentLimit(20)
+    @LazyClassAttribute
+    def turnConfig(cls) -> SparkBaseConfig:
+      turnConfig = SparkBaseConfig()
+      turnConfig.setIdleMode(SparkBaseConfig.IdleMode.kBrake).smartCurrentLimit(
+        SwerveModuleConstants.kTurnCurrentLimit
+      )
+
+      turnConfig.absoluteEncoder.inverted(True).positionConversionFactor(
+        cls.kTurningFactor
+      ).velocityConversionFactor(cls.kTurningFactor / 60.0)  # Radians per Second
 
-    turnConfig.absoluteEncoder.inverted(True).positionConversionFactor(
-      kTurningFactor
-    ).velocityConversionFactor(kTurningFactor / 60.0)  # Radians per Second
+      # TODO: Calibrate PID Controller
+      turnConfig.closedLoop.setFeedbackSensor(ClosedLoopConfig.FeedbackSensor.kAbsoluteEncoder).pid(
+        1, 0, 0
+      ).outputRange(-1, 1).positionWrappingEnabled(True).positionWrappingInputRange(
+        0, cls.kTurningFactor
+      )
 
-    # TODO: Calibrate PID Controller
-    turnConfig.closedLoop.setFeedbackSensor(ClosedLoopConfig.FeedbackSensor.kAbsoluteEncoder).pid(
-      1, 0, 0
-    ).outputRange(-1, 1).positionWrappingEnabled(True).positionWrappingInputRange(0, kTurningFactor)
+      # Published as often as the odometry thread samples it
+      turnConfig.signals.absoluteEncoderPositionPeriodMs(DriveSubsystemConstants.kOdometryPeriodMs)
+
+      return turnConfig
 
   class ElevatorSubsystem:
     # driveFactor = (
@@ -48,39 +79,56 @@ class Config:
     ### Left Motor Config ##
     MotorVelocityFeedForward = 0
 
-    leftMotorConfig = SparkMaxConfig()
+    @LazyClassAttribute
+    def leftMotorConfig(cls) -> SparkMaxConfig:
+      leftMotorConfig = SparkMaxConfig()
+
+      leftMotorConfig.setIdleMode(SparkMaxConfig.IdleMode.kBrake).smartCurrentLimit(
+        ElevatorSubsystemConstants.kCurrentLimit
+      ).inverted(True)
 
-    leftMotorConfig.setIdleMode(SparkMaxConfig.IdleMode.kBrake).smartCurrentLimit(50).inverted(True)
+      # leftMotorConfig.softLimit.forwardSoftLimit(
+      #   ElevatorSubsystemConstants.kMotorForwardSoftLimit
+      # ).reverseSoftLimit(ElevatorSubsystemConstants.kMotorReverseSoftLimit).forwardSoftLimitEnabled(
+      #   True
+      # ).reverseSoftLimitEnabled(True)
 
-    # leftMotorConfig.softLimit.forwardSoftLimit(
-    #   ElevatorSubsystemConstants.kMotorForwardSoftLimit
-    # ).reverseSoftLimit(ElevatorSubsystemConstants.kMotorReverseSoftLimit).forwardSoftLimitEnabled(
-    #   True
-    # ).reverseSoftLimitEnabled(True)
+      leftMotorConfig.closedLoop.setFeedbackSensor(
+        ClosedLoopConfig.FeedbackSensor.kPrimaryEncoder
+      ).pid(
+        ElevatorSubsystemConstants.kP, ElevatorSubsystemConstants.kI, ElevatorSubsystemConstants.kD
+      ).velocityFF(ElevatorSubsystemConstants.kMotorVelocityFeedForward).outputRange(-1, 1)
+      leftMotorConfig.closedLoop.maxMotion.maxVelocity(
+        ElevatorSubsystemConstants.kMotorMaxVelocity
+      ).maxAcceleration(ElevatorSubsystemConstants.kMotorAcceleration)
 
-    leftMotorConfig.closedLoop.setFeedbackSensor(
-      ClosedLoopConfig.FeedbackSensor.kPrimaryEncoder
-    ).pid(
-      ElevatorSubsystemConstants.kP, ElevatorSubsystemConstants.kI, ElevatorSubsystemConstants.kD
-    ).velocityFF(ElevatorSubsystemConstants.kMotorVelocityFeedForward).outputRange(-1, 1)
-    leftMotorConfig.closedLoop.maxMotion.maxVelocity(
-      ElevatorSubsystemConstants.kMotorMaxVelocity
-    ).maxAcceleration(ElevatorSubsystemConstants.kMotorAcceleration)
+      return leftMotorConfig
 
     ### Right Motor Config ###
 
-    rightMotorConfig = SparkMaxConfig()
+    @LazyClassAttribute
+    def rightMotorConfig(cls) -> SparkMaxConfig:
+      rightMotorConfig = SparkMaxConfig()
 
-    rightMotorConfig.setIdleMode(SparkMaxConfig.IdleMode.kBrake).follow(
-      ElevatorSubsystemConstants.kLeftElevatorMotorId, True
-    )
+      # Same limit as the leader, the power manager lowers both together
+      rightMotorConfig.setIdleMode(SparkMaxConfig.IdleMode.kBrake).smartCurrentLimit(
+        ElevatorSubsystemConstants.kCurrentLimit
+      ).follow(ElevatorSubsystemConstants.kLeftElevatorMotorId, True)
+
+      return rightMotorConfig
 
   class PickupSubsystem:
     ### Lower Motor Config ###
-    lowerMotorConfig = SparkBaseConfig()
+    @LazyClassAttribute
+    def lowerMotorConfig(cls) -> SparkBaseConfig:
+      return SparkBaseConfig().smartCurrentLimit(PickupSubsystemConstants.kCurrentLimit)
 
     ### Upper Motor Config ###
-    upperMotorConfig = SparkBaseConfig().inverted(True)
+    @LazyClassAttribute
+    def upperMotorConfig(cls) -> SparkBaseConfig:
+      return (
+        SparkBaseConfig().smartCurrentLimit(PickupSubsystemConstants.kCurrentLimit).inverted(True)
+      )
 
   class DriveSubsystem:
     translationPPHolonominicDrivePID = PIDConstants(5.0, 0.0, 0.0)
@@ -12,17 +12,240 @@ class RobotConstants:
 
   kWheelCenterOffset = units.inchesToMeters(2)
 
+  kMass = 50  # kilograms (with bumpers and battery, estimated)
+  kBumperThickness = units.inchesToMeters(3.25)  # estimated
+
+  # TimedRobot's default period. Not TimedRobot.kDefaultPeriod, which is in milliseconds.
+  kLoopPeriod = 0.02  # seconds
+
+
+class FieldConstants:
+  # 2025 Reefscape welded field: https://firstfrc.blob.core.windows.net/frc2025/FieldAssets/2025FieldDrawings.pdf
+  kFieldLength = 17.548  # meters
+  kFieldWidth = 8.052  # meters
+
+  # Blue alliance AprilTags as (x, y) in inches and the direction they face in degrees. The red
+  # alliance ones are the same, rotated around the center of the field.
+  kReefTags = {
+    17: (160.39, 130.17, 240),
+    18: (144.00, 158.50, 180),
+    19: (160.39, 186.83, 120),
+    20: (193.10, 186.83, 60),
+    21: (209.49, 158.50, 0),
+    22: (193.10, 130.17, 300),
+  }
+  kCoralStationTags = {
+    12: (33.51, 25.80, 54),
+    13: (33.51, 291.20, 306),
+  }
+  # From the center of a reef face (its AprilTag) to each of its two branches
+  kReefBranchOffset = units.inchesToMeters(6.5)
+
+
+class VisionConstants:
+  # NetworkTables name of every Limelight on the robot
+  kCameraNames = ("limelight",)
+
+  # Orientations kept to find the one a frame was solved with (a second of loops)
+  kOrientationHistoryLength = 50
+
+  # Number of frames kept between loops (Limelight publishes at up to ~90 fps)
+  kMaxFramesPerLoop = 10
+
+  ### Frame Filters ###
+  kFieldMargin = 0.5  # meters
+  kMaxPoseJump = 1.0  # meters
+  kMinTagsForPoseJump = 2
+
+  ### Standard Deviations ###
+  # xy std dev = coefficient * (average tag distance)^2 / tag count
+  kXYStdDevCoefficient = 0.3
+  kMinXYStdDev = 0.05  # meters
+  # MegaTag2 uses the gyro's heading, so the heading from vision is ignored
+  kThetaStdDev = 9999999
+
+
+class FieldTargetConstants:
+  # Robot center distance to a target's AprilTag, bumpers touching
+  kTargetDistance = RobotConstants.x / 2 + RobotConstants.kBumperThickness
+
+  ### Lookup Table ###
+  kCellSize = 0.5  # meters
+  kMaxNeighbors = 4  # largest k for k nearest queries
+
+  ### Drive To Target ###
+  kMaxVelocity = 1.0  # m/s
+  kMaxAcceleration = 1.0  # m/s^2
+  kMaxAngularVelocity = math.pi  # rad/s
+  kMaxAngularAcceleration = 2 * math.pi  # rad/s^2
+
+
+class LoopTimerConstants:
+  kTableName = "LoopTimer"
+
+  kWindowSize = 250  # loops (5 seconds)
+  kPublishPeriodLoops = 50  # loops (1 second)
+
+  ### Per Phase Budgets ### (in seconds)
+  kSchedulerBudget = 0.010
+  kDrivePeriodicBudget = 0.004
+  kElevatorPeriodicBudget = 0.001
+  kTeleopPeriodicBudget = 0.002
+  kDashboardBudget = 0.002
+  kPowerManagerBudget = 0.001
+
+
+class GarbageCollectorConstants:
+  # Automatic collections are turned off while the robot is enabled, see utils/gccontrol.py
+  kEnabled = True
+
+  # Objects tracked by the collector that may pile up before the young ones are collected at the
+  # end of a loop (CPython's own threshold is 700)
+  kYoungThreshold = 10000
+  # Past this, they are collected even if the loop has no time left
+  kMaxPending = 100000
+  # Time (seconds) that must be left in the loop for a young collection
+  kIdleMargin = 0.008
+
+
+class RetentionMonitorConstants:
+  kTableName = "RetainedObjects"
+
+  kSamplePeriodLoops = 50  # loops (1 second)
+  kWindowSize = 30  # samples (30 seconds)
+
+  ### Budgets ### (objects left allocated per loop)
+  # Flagged as a regression when the median over the window goes over. The robot's own phases
+  # leave none in simulation: what the loop leaves is mostly the simulation's.
+  kLoopBudget = 200
+  kPhaseBudget = 50
+
+
+class CommandTraceConstants:
+  kEnabled = True
+  kCapacity = 32768  # spans (about 30 seconds of a busy scheduler)
+  # On the roboRIO, written when the robot is disabled. Open with https://ui.perfetto.dev
+  kDirectory = "/home/lvuser/traces"
+  # Older traces are deleted, so they don't fill the roboRIO's storage
+  kMaxFiles = 20
+
+
+class PowerManagerConstants:
+  ### Levels ### (Normal, Reduced, Critical)
+  # Entered when the battery voltage (volts) drops under, or the robot's total current (amps, from
+  # the power distribution) goes over, these thresholds. The roboRIO browns out at 6.75 V.
+  kReducedVoltage = 9.0
+  kCriticalVoltage = 7.5
+  kReducedCurrent = 250
+  kCriticalCurrent = 350
+  # Left one level at a time, once clear of the thresholds by these margins for kRecoveryTime
+  kVoltageHysteresis = 0.5  # volts
+  kCurrentHysteresis = 30  # amps
+  kRecoveryTime = 0.5  # seconds
+
+  # Current shared by every managed motor, at each level (amps)
+  kCurrentBudgets = (math.inf, 300, 200)
+
+  ### Per Motor Minimum Current Limits ### (amps)
+  kDriveMinCurrentLimit = 30
+  kElevatorMinCurrentLimit = 20
+  kPickupMinCurrentLimit = 10
+
+  ### Speed Scales ### (at each level)
+  kDriveSpeedScales = (1.0, 0.85, 0.6)
+  kElevatorSpeedScales = (1.0, 0.8, 0.5)
+  kPickupSpeedScales = (1.0, 0.7, 0.4)
+
+
+class TelemetryConstants:
+  kTableName = "Telemetry"
+
+
+class StartupConstants:
+  # Imported one at a time during robotInit so the startup profiler can time each of them
+  kProfiledImports = (
+    "rev",
+    "navx",
+    "pathplannerlib.auto",
+    "subsystems.DriveSubsystem",
+    "subsystems.ElevatorSubsystem",
+    "subsystems.PickupSubsystem",
+    "robotcontainer",
+  )
+
+
+class InputLogConstants:
+  kFlushPeriod = 0.25  # seconds between writes to disk
+  kLogNetworkTables = True  # Also log every NetworkTables topic (dashboard, telemetry)
+
+
+class TrajectoryCacheConstants:
+  kPrecompiledDirectoryName = "trajectories"  # In deploy/pathplanner
+  kCacheDirectoryName = "trajectory_cache"  # In /home/lvuser on the roboRIO
+  # The cache gives paths their trajectories through PathPlanner's internals, it is only used with
+  # the version they were checked against (by tests/test_trajectorycache.py)
+  kSupportedPathPlannerVersion = "2025.2.7"
+
+
+class PathfinderConstants:
+  kClearance = 0.5  # meters, paths closer than this to an obstacle cost more
+  kClearanceWeight = 1.0  # extra cost (cells) per cell closer than kClearance
+  kSmoothingAnchor = 0.8  # how far along each segment corners start being rounded
+
+
+class SysIdConstants:
+  kLogFrequency = 200  # Hz, samples logged per motor
+  kStatusFramePeriodMs = 5  # Sparks' status frames while characterizing (until they restart)
+  kRestTime = 2  # seconds between two tests
+  kChooserName = "SysId Mechanism"
+
+  ### Tests ### (ramp rate in volts per second, step voltage, timeout in seconds)
+  kDriveRampRate = 1
+  kDriveStepVoltage = 6
+  kDriveTimeout = 4  # the robot travels a few meters each test
+  kTurnRampRate = 1
+  kTurnStepVoltage = 4
+  kTurnTimeout = 5
+  kElevatorRampRate = 0.5
+  kElevatorStepVoltage = 4
+  kElevatorTimeout = 8
+  # Tests stop before the ends of travel (motor rotations)
+  kElevatorForwardLimit = 60
+  kElevatorReverseLimit = 5
+
+  ### Fitting ###
+  kMinVelocity = 0.01  # units per second, slower samples are still breaking free
+  kMaxControlEffort = 7  # volts, for the suggested feedback gains (like the SysId tool)
+  kControllerPeriod = 0.001  # seconds, the Sparks' closed loop runs at 1 kHz
+
+
+class SparkConfigConstants:
+  kHashFileName = "spark_config_hashes.json"  # In /home/lvuser on the roboRIO
+  kMaxWorkers = 6
+
+
+class SparkOutputConstants:
+  kTolerance = 1e-4  # Duty cycle, m/s, radians...
+  kKeepAlivePeriod = 0.25  # seconds
+
 
 class DriverControllerConstants:
   kDriverControllerPort = 0
 
   kDriveDeadband = 0.05
 
+  ### Axis Shaping ### (expo: 0 is linear, 1 is cubic; slew rate: full stick per second)
+  kDriveExpo = 0.3
+  kDriveSlewRate = 3  # reaches full speed in a third of a second
+  kRotationExpo = 0.3
+  kRotationSlewRate = 4
+
 
 class OperatorControllerConstants:
   kOperatorControllerPort = 1
 
   kElevateDeadband = 0.05
+  kElevateExpo = 0.5
   kPickupDeadband = 0.05
 
 
@@ -70,6 +293,50 @@ class DriveSubsystemConstants:
   kBackLeftChassisAngularOffset = math.pi
   kBackRightChassisAngularOffset = math.pi / 2
 
+  ### Odometry Thread ###
+  # The Sparks' encoder position frames and the navX publish at this rate (see `config.py` and
+  # `DriveSubsystem`). Sampling faster would only read the same values again, and faster frames
+  # would load the CAN bus.
+  kOdometryFrequency = 100  # Hz
+  kOdometryPeriodMs = round(1000 / kOdometryFrequency)
+  # Samples kept between two loops. Enough for a few overrun loops at kOdometryFrequency.
+  kOdometryBufferSize = 25
+
+  ### Pose History ###
+  kPoseHistoryDuration = 2.0  # seconds
+
+
+class DriveToPoseConstants:
+  ### Profiles ###
+  # Under the drive's max speed, leaving room for the feedback and for turning at the same time
+  kMaxVelocity = 0.8 * DriveSubsystemConstants.kMaxSpeedMetersPerSecond  # m/s
+  kMaxAcceleration = 2.0  # m/s^2
+  kMaxAngularVelocity = math.pi  # rad/s
+  kMaxAngularAcceleration = 2 * math.pi  # rad/s^2
+  # Smallest share of the constraints an axis gets, so it can still correct small errors
+  kMinAxisFraction = 0.2
+
+  ### Feedback ###
+  kTranslationP = 3.0
+  kRotationP = 3.0
+
+  # From reading the sensors to the robot reaching new speeds: a loop, then the drive motors'
+  # velocity loops, which lag behind as the Sparks filter their velocity measurements
+  kControlLatency = 0.1  # seconds
+
+  ### Finish Conditions ###
+  # Checked on the pose estimate, so no tighter than its error: 2.8 cm RMS (7.5 cm max) and 0.6 deg
+  # RMS (1.1 deg max) with every sensor error of `benchmarks.odometry`
+  kTranslationTolerance = 0.05  # meters
+  kHeadingTolerance = math.radians(2)  # radians
+  kVelocityTolerance = 0.1  # m/s
+  kSettleTime = 0.1  # seconds in tolerance before finishing, two Limelight frames
+  # The slowest alignment of `benchmarks.drivetopose` (2 m and 180 degrees) takes 4.3 s
+  kTimeout = 6.0  # seconds
+
+  # Closer targets are driven to directly, further ones are pathfound to first
+  kMaxDirectDistance = 1.5  # meters
+
 
 class SwerveModuleConstants:
   """
@@ -93,11 +360,18 @@ class SwerveModuleConstants:
 
   kDriveMotorGearRatio = 1 / kDriveMotorReduction
 
+  kTurnMotorReduction = 9424 / 203
+
+  ### Current Limits ### (amps, lowered by the power manager when the battery sags)
+  kDriveCurrentLimit = 50
+  kTurnCurrentLimit = 20
+
 
 class ElevatorSubsystemConstants:
   kManualElevatorSpeed = 0.25
+  kCurrentLimit = 50  # amps, per motor
 
-  kP = 0
+  kP = 0.1  # duty cycle per rotation of error, a starting point until tuned
   kI = 0
   kD = 0
   kClosedLoopSlot = 0
@@ -117,14 +391,68 @@ class ElevatorSubsystemConstants:
   kUpperSwitchChannel = 0
   kLowerSwitchChannel = 1
 
+  ### Limit Switch Edges ###
+  # The upper switch is passed once per stage, the carriage stops on its second hit going up
+  kUpperSwitchStopCount = 2
+  # Edges kept between two loops
+  kEdgeBufferSize = 16
+  # Longest wait for an edge before checking whether to stop (seconds)
+  kEdgeWaitTimeout = 0.1
+  # The encoder is zeroed again at the bottom when it is off by more than this (rotations)
+  kZeroPositionTolerance = 0.05
+
   kMiddleSetPoint = 10
   kBottomSetPoint = 5
   kScoreSetPoint = 3
 
+  ### Motion Profile ### (in motor rotations, like the set points)
+  kProfileMaxVelocity = 80  # rotations per second
+  kProfileMaxAcceleration = 300  # rotations per second squared
+  kPositionTolerance = 0.25  # rotations
+  kVelocityTolerance = 1  # rotations per second
+
+  ### Feedforward ### (volts, estimated from the mechanism below until characterized)
+  kS = 0
+  kG = 0.32  # holds the carriage
+  kV = 0.127  # per rotation per second (NEO free speed)
+  kA = 0.0006  # per rotation per second squared
+
+  ### Mechanism ### (estimated, used by the simulation)
+  kGearRatio = 9
+  kDrumRadius = units.inchesToMeters(1)
+  kCarriageMass = 5  # kilograms
+  kMinHeight = 0  # meters
+  kMaxHeight = 1.5  # meters
 
 
 class PickupSubsystemConstants:
   kManualPickupSpeed = 0.5
+  kCurrentLimit = 80  # amps, per motor (the Spark's default)
 
   kUpperPickupMotorId = 22
   kLowerPickupMotorId = 23
+
+
+class SimulationConstants:
+  kLoopPeriod = RobotConstants.kLoopPeriod
+
+  ### Swerve Modules ###
+  # Moment of inertia seen by each drive wheel (a quarter of the robot's mass at the wheel radius)
+  kDriveMomentOfInertia = (RobotConstants.kMass / 4) * (
+    SwerveModuleConstants.kWheelDiameter / 2
+  ) ** 2
+  kTurnMomentOfInertia = 0.004  # kg m^2
+
+  ### Elevator ###
+  # Heights (meters) at which the upper switch's magnets pass by the sensor
+  kUpperSwitchHeights = (0.3, 1.2)
+  kUpperSwitchHalfWidth = 0.02  # meters
+  kLowerSwitchHeight = 0.005  # meters
+
+  ### Pickup ###
+  kPickupGearing = 4
+  kPickupMomentOfInertia = 0.0005  # kg m^2
+
+  ### Match ###
+  kAutonomousLength = 15  # seconds
+  kTeleopLength = 135  # seconds
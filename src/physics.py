@@ -0,0 +1,108 @@
+"""
+Simulation physics for the robot. Loaded automatically by `robotpy sim` and `robotpy test`.
+
+https://robotpy.readthedocs.io/projects/pyfrc/en/stable/physics.html
+"""
+
+import typing
+
+from pyfrc.physics.core import PhysicsInterface
+from wpilib.simulation import BatterySim, PowerDistributionSim, RoboRioSim
+from wpimath.geometry import Pose2d, Twist2d
+from wpimath.kinematics import SwerveModuleState
+
+from constants import DriveSubsystemConstants
+from simulation.models import (
+  ElevatorModel,
+  RollerModel,
+  SimulatedGyro,
+  SimulatedLimelight,
+  SwerveModuleModel,
+)
+
+if typing.TYPE_CHECKING:
+  from robot import MyRobot
+
+
+class PhysicsEngine:
+  def __init__(self, physics_controller: PhysicsInterface, robot: "MyRobot"):
+    self.physics_controller = physics_controller
+
+    driveSubsystem = robot.robotContainer.driveSubsystem
+    elevatorSubsystem = robot.robotContainer.elevatorSubsystem
+    pickupSubsystem = robot.robotContainer.pickupSubsystem
+
+    self.gyro = SimulatedGyro()
+    driveSubsystem.gyro = self.gyro
+
+    self.modules = (
+      SwerveModuleModel(driveSubsystem.frontLeft),
+      SwerveModuleModel(driveSubsystem.frontRight),
+      SwerveModuleModel(driveSubsystem.backLeft),
+      SwerveModuleModel(driveSubsystem.backRight),
+    )
+    self.elevator = ElevatorModel(
+      elevatorSubsystem.elevatorMotor,
+      elevatorSubsystem.upperElevatorSwitch,
+      elevatorSubsystem.lowerElevatorSwitch,
+    )
+    self.rollers = (
+      RollerModel(pickupSubsystem.upperPickupMotor),
+      RollerModel(pickupSubsystem.lowerPickupMotor),
+    )
+
+    self.limelights = tuple(
+      SimulatedLimelight(camera.tableName) for camera in driveSubsystem.cameras
+    )
+
+    self.busVoltage = RoboRioSim.getVInVoltage()
+    self.powerDistribution = PowerDistributionSim(
+      robot.robotContainer.powerManager.powerDistribution
+    )
+
+    # Ground truth. Kept here instead of on the physics controller's Field2d, because the robot
+    # code publishes its own estimate to the same "Field" widget which would overwrite it.
+    self.pose = Pose2d()
+    self.truthObject = physics_controller.field.getObject("Truth")
+
+  def update_sim(self, now: float, tm_diff: float):
+    """
+    Called after every robot loop.
+
+    :param now: The current time (seconds)
+    :param tm_diff: The time (seconds) since the last call
+    """
+    busVoltage = self.busVoltage
+
+    states: list[SwerveModuleState] = [
+      module.update(tm_diff, busVoltage) for module in self.modules
+    ]
+    self.elevator.update(tm_diff, busVoltage)
+    for roller in self.rollers:
+      roller.update(tm_diff, busVoltage)
+
+    # Until now, the sensors saw the robot where it was before this step: so do the cameras
+    for limelight in self.limelights:
+      limelight.update(now, self.pose)
+
+    # Move the robot (ground truth) and feed its heading back to the gyro
+    speeds = DriveSubsystemConstants.kDriveKinematics.toChassisSpeeds(states)
+    self.pose = self.pose.exp(
+      Twist2d(speeds.vx * tm_diff, speeds.vy * tm_diff, speeds.omega * tm_diff)
+    )
+    self.truthObject.setPose(self.pose)
+    self.gyro.update(tm_diff, speeds.omega)
+
+    # Sag the battery under the load of every motor, each on its own power distribution channel
+    currentDraws = self.getCurrentDraws()
+    self.busVoltage = BatterySim.calculate(currentDraws)
+    RoboRioSim.setVInVoltage(self.busVoltage)
+    for channel, current in enumerate(currentDraws):
+      self.powerDistribution.setCurrent(channel, current)
+
+  def getCurrentDraws(self) -> list[float]:
+    return [
+      *(module.getCurrentDrawAmps() for module in self.modules),
+      self.elevator.getCurrentDrawAmps(),
+      *(roller.getCurrentDrawAmps() for roller in self.rollers),
+    ]
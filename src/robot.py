@@ -1,31 +1,171 @@
+import pathlib
+import time
 import typing
 
 import wpilib
 import wpilib.drive
-from commands2 import Command, CommandScheduler, TimedCommandRobot
-from wpilib import SmartDashboard
+from commands2 import Command, CommandScheduler, cmd
 
-from robotcontainer import RobotContainer
+from constants import CommandTraceConstants, LoopTimerConstants, StartupConstants
 from shuffleboard import addDeployArtifacts
-
-
-class MyRobot(TimedCommandRobot):
+from subsystems.EdgeCapture import EdgeCapture
+from utils.retentionmonitor import RetentionMonitor
+from utils.commandtrace import CommandTracer
+from utils.fieldtargets import FieldTargets
+from utils.gccontrol import GarbageCollector
+from utils.inputlog import InputLog
+from utils.looptimer import LoopTimer
+from utils.startupprofiler import StartupProfiler
+from utils.telemetry import Telemetry
+from utils.trajectorycache import TrajectoryCache
+
+if typing.TYPE_CHECKING:
+  from robotcontainer import RobotContainer
+
+
+# TimedRobot rather than TimedCommandRobot: the scheduler is run (and timed) in robotPeriodic, once
+# per loop, so every input read and logged during a cycle belongs to that cycle
+class MyRobot(wpilib.TimedRobot):
   autonomousCommand: typing.Optional[Command] = None
+  robotContainer: "RobotContainer"
 
   def robotInit(self):
     """
     This function is called upon program startup and
     should be used for any initialization code.
+
+    Anything not needed to enable the robot is deferred to the first loop (see `deferredInit()`).
+    """
+    profiler = StartupProfiler.getInstance()
+
+    with profiler.measure("robotInit"):
+      # Imported here instead of at the top of the file so each import is timed separately
+      profiler.importModules(StartupConstants.kProfiledImports)
+      from robotcontainer import RobotContainer
+
+      with profiler.measure("RobotContainer"):
+        self.robotContainer = RobotContainer()
+
+      with profiler.measure("LoopTimer"):
+        self.configureLoopTimer()
+
+      self.garbageCollector = GarbageCollector()
+
+      CommandTracer.getInstance().install(CommandScheduler.getInstance())
+      self.tracedSpans = 0
+
+    profiler.ready()
+
+    cmd.runOnce(self.deferredInit).ignoringDisable(True).schedule()
+
+  def deferredInit(self):
     """
-    addDeployArtifacts()
+    Startup work that can wait until the robot is running. Runs once, on the first loop.
+    """
+    profiler = StartupProfiler.getInstance()
+
+    with profiler.measure("Deferred Init"):
+      with profiler.measure("Deploy Artifacts"):
+        addDeployArtifacts()
+
+      with profiler.measure("Auto Chooser"):
+        self.robotContainer.getAutoChooser()
 
-    self.robotContainer = RobotContainer()
+      # Last, so that everything created at startup is frozen
+      with profiler.measure("GC Freeze"):
+        self.garbageCollector.freeze()
+
+    profiler.report()
+
+  def configureLoopTimer(self):
+    """
+    Times each phase of the robot loop, and samples the objects they leave allocated. Results are
+    published to NetworkTables under /LoopTimer and /RetainedObjects.
+    """
+    self.loopTimer = LoopTimer()
+
+    self.schedulerTimer = self.loopTimer.addPhase(
+      "CommandScheduler.run", LoopTimerConstants.kSchedulerBudget
+    )
+    self.teleopPeriodicTimer = self.loopTimer.addPhase(
+      "RobotContainer.teleopPeriodic", LoopTimerConstants.kTeleopPeriodicBudget
+    )
+
+    LoopTimer.instrument(
+      self.robotContainer.powerManager,
+      "periodic",
+      self.loopTimer.addPhase("PowerManager.periodic", LoopTimerConstants.kPowerManagerBudget),
+    )
+    LoopTimer.instrument(
+      self.robotContainer.driveSubsystem,
+      "periodic",
+      self.loopTimer.addPhase("DriveSubsystem.periodic", LoopTimerConstants.kDrivePeriodicBudget),
+    )
+    LoopTimer.instrument(
+      self.robotContainer.elevatorSubsystem,
+      "periodic",
+      self.loopTimer.addPhase(
+        "ElevatorSubsystem.periodic", LoopTimerConstants.kElevatorPeriodicBudget
+      ),
+    )
+
+    # Both dashboard updates and the telemetry flush are added together into a single phase
+    self.dashboardTimer = self.loopTimer.addPhase("Dashboard", LoopTimerConstants.kDashboardBudget)
+    LoopTimer.instrument(
+      self.robotContainer.driveSubsystem, "updateShuffleBoard", self.dashboardTimer
+    )
+    LoopTimer.instrument(self.robotContainer, "updateShuffleBoard", self.dashboardTimer)
+
+    self.retentionMonitor = RetentionMonitor(self.loopTimer)
 
   def robotPeriodic(self):
-    CommandScheduler.getInstance().run()
+    InputLog.getInstance().beginCycle()
+    # Before the scheduler, which polls the triggers and runs the commands that read the controllers
+    self.robotContainer.controllerInput.update()
+    # Also before the scheduler, so commands run with this loop's limits and speed scales
+    self.robotContainer.powerManager.periodic()
+
+    with self.schedulerTimer:
+      CommandScheduler.getInstance().run()
+
+    # Everything staged this loop (including teleopPeriodic, which runs before this) is sent at once
+    with self.dashboardTimer:
+      Telemetry.getInstance().flush()
+
+    # Before the loop timer, which forgets which phases ran this loop
+    self.retentionMonitor.periodic()
+    self.loopTimer.periodic()
+    self.garbageCollector.periodic(
+      (wpilib.RobotController.getFPGATime() - self.getLoopStartTime()) / 1e6
+    )
+
+  def disabledInit(self):
+    # Red alliance paths are flipped ahead of time, whichever alliance the robot ends up on
+    TrajectoryCache.getInstance().warmUpCommand().schedule()
+    FieldTargets.getInstance().buildAll()
+    self.exportCommandTrace()
+    # Nothing is timing critical while disabled
+    self.garbageCollector.robotDisabled()
+
+  def exportCommandTrace(self):
+    """
+    Writes what the scheduler did while enabled to a Chrome trace on the roboRIO, from a background
+    thread. Nothing is written if no command ran since the last export, and only the newest
+    `kMaxFiles` traces are kept.
+    """
+    tracer = CommandTracer.getInstance()
+    if not wpilib.RobotBase.isReal() or tracer.count == self.tracedSpans:
+      return
+
+    self.tracedSpans = tracer.count
+    name = time.strftime("commands-%Y%m%d-%H%M%S.json")
+    tracer.exportAsync(
+      pathlib.Path(CommandTraceConstants.kDirectory) / name, CommandTraceConstants.kMaxFiles
+    )
 
   def autonomousInit(self):
     """This function is run once each time the robot enters autonomous mode."""
+    self.garbageCollector.robotEnabled()
 
     self.autonomousCommand = self.robotContainer.getAutonomousCommand()
 
@@ -37,19 +177,42 @@ class MyRobot(TimedCommandRobot):
 
   def teleopInit(self):
     """This function is called once each time the robot enters teleoperated mode."""
+    self.garbageCollector.robotEnabled()
 
     if self.autonomousCommand:
       self.autonomousCommand.cancel()
 
   def teleopPeriodic(self):
-    self.robotContainer.teleopPeriodic()
+    with self.teleopPeriodicTimer:
+      self.robotContainer.teleopPeriodic()
 
   def testInit(self):
     """This function is called once each time the robot enters test mode."""
+    self.garbageCollector.robotEnabled()
+
+    # Characterizes the mechanism picked on the dashboard, see utils/sysid.py and utils/sysidfit.py
+    CommandScheduler.getInstance().cancelAll()
+    self.robotContainer.getSysIdCommand().schedule()
 
   def testPeriodic(self):
     """This function is called periodically during test mode."""
 
+  def endCompetition(self):
+    try:
+      # Background threads would otherwise outlive the robot (simulation and tests). Whatever a
+      # failed robotInit didn't get to create is skipped.
+      robotContainer = getattr(self, "robotContainer", None)
+      if robotContainer is not None:
+        robotContainer.driveSubsystem.odometryThread.stop()
+      # Including the elevator's, if robotInit failed after creating it
+      EdgeCapture.stopAll()
+      # Turns automatic collections back on for whatever runs after the robot
+      garbageCollector = getattr(self, "garbageCollector", None)
+      if garbageCollector is not None:
+        garbageCollector.robotDisabled()
+    finally:
+      super().endCompetition()
+
 
 if __name__ == "__main__":
   wpilib.run(MyRobot)
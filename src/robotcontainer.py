@@ -1,50 +1,84 @@
+import typing
+
 import wpilib
-import wpimath
-from commands2 import Command, RunCommand, cmd
+from commands2 import Command, DeferredCommand, RunCommand, cmd
 from commands2.button import CommandXboxController
 from pathplannerlib.auto import AutoBuilder, NamedCommands
 from pathplannerlib.events import EventTrigger
-from wpilib import Field2d, SmartDashboard
+from pathplannerlib.path import PathConstraints
+from pathplannerlib.pathfinding import Pathfinding
+from wpilib import Field2d, SendableChooser, SmartDashboard
 
+from commands.DriveToPoseCommand import DriveToPoseCommand
+from commands.ElevatorProfileCommand import ElevatorProfileCommand
 from constants import (
   DriverControllerConstants,
+  DriveToPoseConstants,
   ElevatorSubsystemConstants,
+  FieldTargetConstants,
   OperatorControllerConstants,
+  PickupSubsystemConstants,
+  PowerManagerConstants,
+  SwerveModuleConstants,
+  SysIdConstants,
 )
 from subsystems.DriveSubsystem import DriveSubsystem
 from subsystems.ElevatorSubsystem import ElevatorSubsystem
 from subsystems.PickupSubsystem import PickupSubsystem
+from utils.controllerinput import ControllerInput
+from utils.fieldtargets import FieldTargets, TargetKind
+from utils.gridpathfinder import GridPathfinder, NavGrid
+from utils.powermanager import PowerConsumer, PowerManager
+from utils.sparkconfig import SparkConfigManager
+from utils.startupprofiler import StartupProfiler
+from utils.sysid import SysIdMechanism
+from utils.telemetry import Priority, Telemetry
+from utils.trajectorycache import TrajectoryCache
 
 
 class RobotContainer:
   def __init__(self):
+    profiler = StartupProfiler.getInstance()
+
     self.field = Field2d()
     SmartDashboard.putData("Field", self.field)
 
-    self.driveSubsystem = DriveSubsystem()
-    self.elevatorSubsystem = ElevatorSubsystem()
-    self.pickupSubsystem = PickupSubsystem()
+    with profiler.measure("DriveSubsystem"):
+      self.driveSubsystem = DriveSubsystem()
+    with profiler.measure("ElevatorSubsystem"):
+      self.elevatorSubsystem = ElevatorSubsystem()
+    with profiler.measure("PickupSubsystem"):
+      self.pickupSubsystem = PickupSubsystem()
+
+    self.elevatorProfile = ElevatorProfileCommand(self.elevatorSubsystem)
+
+    with profiler.measure("Spark Configuration"):
+      sparkConfigManager = SparkConfigManager.getInstance()
+      sparkConfigManager.waitForAll()
+      sparkConfigManager.report()
+
+    # Once the configs are applied, so they don't overwrite its current limits
+    self.configurePowerManager()
 
     self.driverController = CommandXboxController(DriverControllerConstants.kDriverControllerPort)
     self.operatorController = CommandXboxController(
       OperatorControllerConstants.kOperatorControllerPort
     )
+    self.controllerInput = ControllerInput(self.driverController, self.operatorController)
 
-    self.configureButtonBindings()
-    self.configureAuto()
+    with profiler.measure("Bindings"):
+      self.configureButtonBindings()
+      self.configureAuto()
+      self.configureTelemetry()
+      self.configureSysId()
 
+    inputs = self.controllerInput
     self.driveSubsystem.setDefaultCommand(
       RunCommand(
         lambda: self.driveSubsystem.drive(
-          wpimath.applyDeadband(
-            -self.driverController.getLeftY(), DriverControllerConstants.kDriveDeadband
-          ),
-          wpimath.applyDeadband(
-            -self.driverController.getLeftX(), DriverControllerConstants.kDriveDeadband
-          ),
-          wpimath.applyDeadband(
-            -self.driverController.getRightX(), DriverControllerConstants.kDriveDeadband
-          ),
+          inputs.snapshot.driveX,
+          inputs.snapshot.driveY,
+          inputs.snapshot.driveRotation,
           DriveSubsystem.fieldRelative,
         ),
         self.driveSubsystem,
@@ -59,36 +93,16 @@ class RobotContainer:
     )
 
   def teleopPeriodic(self):
-    ### Manual Elevator Commands ###
-    y = wpimath.applyDeadband(
-      self.operatorController.getLeftY(), OperatorControllerConstants.kElevateDeadband
-    )
-    if abs(y) > 0:
-      elevatorCurrentCommand = self.elevatorSubsystem.getCurrentCommand()
-      if elevatorCurrentCommand is not None:
-        elevatorCurrentCommand.cancel()
-      self.elevatorSubsystem.manualDrive(-y)
-
-    ### Manual Pickup Commands ###
-    leftTriggerAxis = wpimath.applyDeadband(
-      self.operatorController.getLeftTriggerAxis(), OperatorControllerConstants.kPickupDeadband
-    )
-    rightTriggerAxis = wpimath.applyDeadband(
-      self.operatorController.getRightTriggerAxis(), OperatorControllerConstants.kPickupDeadband
-    )
-
-    pickupCurrentCommand = self.pickupSubsystem.getCurrentCommand()
-    if pickupCurrentCommand is not None:
-      pickupCurrentCommand.cancel()
+    self.updateShuffleBoard()
 
-    if leftTriggerAxis > 0:
-      self.pickupSubsystem.manualDrive(leftTriggerAxis)
-    elif rightTriggerAxis > 0:
-      self.pickupSubsystem.manualDrive(-rightTriggerAxis)
+  def configureTelemetry(self):
+    telemetry = Telemetry.getInstance()
+    self.fieldPoseTelemetry = telemetry.addEntry(self.field.setRobotPose, Priority.kMedium)
+    self.fieldRelativeTelemetry = telemetry.addBoolean("Field Relative", Priority.kLow)
 
-    ### Shuffleboard ###
-    self.field.setRobotPose(self.driveSubsystem.getPose())
-    SmartDashboard.putBoolean("Field Relative", DriveSubsystem.fieldRelative)
+  def updateShuffleBoard(self):
+    self.fieldPoseTelemetry.set(self.driveSubsystem.getPose())
+    self.fieldRelativeTelemetry.set(DriveSubsystem.fieldRelative)
 
   def configureButtonBindings(self):
     """
@@ -103,36 +117,143 @@ class RobotContainer:
       cmd.runOnce(lambda: self.driveSubsystem.toggleFieldRelative())
     )
 
+    self.driverController.a().whileTrue(self.driveToNearestTarget(TargetKind.kReef))
+    self.driverController.b().whileTrue(self.driveToNearestTarget(TargetKind.kCoralStation))
+
     ### Operator Controller ###
+    # Scheduled when a stick leaves its deadband, cancelled (back to stopping) when it returns
+    self.controllerInput.elevatorActive.whileTrue(
+      cmd.run(
+        lambda: self.elevatorSubsystem.manualDrive(self.controllerInput.snapshot.elevator),
+        self.elevatorSubsystem,
+      )
+    )
+    self.controllerInput.pickupActive.whileTrue(
+      cmd.run(
+        lambda: self.pickupSubsystem.manualDrive(self.controllerInput.snapshot.pickup),
+        self.pickupSubsystem,
+      )
+    )
+
     self.operatorController.y().onTrue(RunCommand(lambda: self.elevatorSubsystem.zeroPosition()))
 
+    # Retargets the elevator's motion profile when it is already moving
     self.operatorController.povUp().onTrue(
-      cmd.runOnce(
-        lambda: self.elevatorSubsystem.goToPosition(ElevatorSubsystemConstants.kMiddleSetPoint),
-        self.elevatorSubsystem,
-      )
+      cmd.runOnce(lambda: self.elevatorProfile.moveTo(ElevatorSubsystemConstants.kMiddleSetPoint))
     )
     self.operatorController.povRight().onTrue(
-      cmd.runOnce(
-        lambda: self.elevatorSubsystem.goToPosition(ElevatorSubsystemConstants.kBottomSetPoint),
-        self.elevatorSubsystem,
-      )
+      cmd.runOnce(lambda: self.elevatorProfile.moveTo(ElevatorSubsystemConstants.kBottomSetPoint))
     )
     self.operatorController.povDown().onTrue(
-      cmd.runOnce(
-        lambda: self.elevatorSubsystem.goToPosition(ElevatorSubsystemConstants.kScoreSetPoint),
-        self.elevatorSubsystem,
+      cmd.runOnce(lambda: self.elevatorProfile.moveTo(ElevatorSubsystemConstants.kScoreSetPoint))
+    )
+
+  def driveToNearestTarget(self, kind: TargetKind) -> Command:
+    """
+    Aligns to the target of that kind closest to the robot when the command starts, pathfinding
+    to it first when it is far away.
+    """
+    constraints = PathConstraints(
+      FieldTargetConstants.kMaxVelocity,
+      FieldTargetConstants.kMaxAcceleration,
+      FieldTargetConstants.kMaxAngularVelocity,
+      FieldTargetConstants.kMaxAngularAcceleration,
+    )
+
+    def build() -> Command:
+      translation = self.driveSubsystem.getPose().translation()
+      target = FieldTargets.getInstance().nearest(kind, translation).pose
+      align = DriveToPoseCommand(self.driveSubsystem, lambda: target)
+      if translation.distance(target.translation()) <= DriveToPoseConstants.kMaxDirectDistance:
+        return align
+      return AutoBuilder.pathfindToPose(target, constraints).andThen(align)
+
+    return DeferredCommand(build, self.driveSubsystem)
+
+  def configurePowerManager(self):
+    """
+    Shares the current budget when the battery sags: driving (pushing) first, then the elevator,
+    then the pickup. Turning motors keep their limit, steering must never starve.
+    """
+    self.powerManager = PowerManager(
+      (
+        PowerConsumer(
+          "Drive",
+          [module.driveMotor for module in self.driveSubsystem.modules],
+          PowerManagerConstants.kDriveMinCurrentLimit,
+          SwerveModuleConstants.kDriveCurrentLimit,
+          PowerManagerConstants.kDriveSpeedScales,
+          self.driveSubsystem.setSpeedScale,
+        ),
+        PowerConsumer(
+          "Elevator",
+          self.elevatorSubsystem.elevatorMotors,
+          PowerManagerConstants.kElevatorMinCurrentLimit,
+          ElevatorSubsystemConstants.kCurrentLimit,
+          PowerManagerConstants.kElevatorSpeedScales,
+          self.elevatorSubsystem.setSpeedScale,
+        ),
+        PowerConsumer(
+          "Pickup",
+          (self.pickupSubsystem.upperPickupMotor, self.pickupSubsystem.lowerPickupMotor),
+          PowerManagerConstants.kPickupMinCurrentLimit,
+          PickupSubsystemConstants.kCurrentLimit,
+          PowerManagerConstants.kPickupSpeedScales,
+          self.pickupSubsystem.setSpeedScale,
+        ),
       )
     )
 
+  def configureSysId(self):
+    # Each mechanism is only built when its tests are first run
+    self.sysIdFactories = {
+      "drive": self.driveSubsystem.sysIdDrive,
+      "turn": self.driveSubsystem.sysIdTurn,
+      "elevator": self.elevatorSubsystem.sysId,
+    }
+    self.sysIdMechanisms: dict[str, SysIdMechanism] = {}
+
+    self.sysIdChooser = SendableChooser()
+    for name in self.sysIdFactories:
+      self.sysIdChooser.addOption(name, name)
+    self.sysIdChooser.setDefaultOption("drive", "drive")
+    SmartDashboard.putData(SysIdConstants.kChooserName, self.sysIdChooser)
+
+  def getSysIdCommand(self) -> Command:
+    """
+    The characterization tests of the mechanism picked on the dashboard.
+    """
+    name = self.sysIdChooser.getSelected()
+    mechanism = self.sysIdMechanisms.get(name)
+    if mechanism is None:
+      mechanism = self.sysIdMechanisms[name] = self.sysIdFactories[name]()
+    return mechanism.testCommand()
+
   def configureAuto(self):
+    # Must be set before any pathfinding command is created, they would use PathPlanner's own
+    with StartupProfiler.getInstance().measure("Pathfinder"):
+      Pathfinding.setPathfinder(GridPathfinder(NavGrid.fromDeploy()))
+
     self.configureNamedCommands()
     self.configureTriggerCommands()
-    # Build an auto chooser. This will use Commands.none() as the default option.
-    # Another option that allows you to specify the default auto by its name
-    self.autoChooser = AutoBuilder.buildAutoChooser()
+    # The auto chooser loads every auto from the deploy folder, it is built by getAutoChooser()
+    self.autoChooser: typing.Optional[SendableChooser] = None
+
+  def getAutoChooser(self) -> SendableChooser:
+    """
+    Builds the auto chooser the first time it is needed (normally on the robot's first loop).
+    """
+    if self.autoChooser is None:
+      # Autos would otherwise generate every path's trajectory as they are built
+      TrajectoryCache.getInstance().loadIdealTrajectories()
+
+      # Build an auto chooser. This will use Commands.none() as the default option.
+      # Another option that allows you to specify the default auto by its name
+      self.autoChooser = AutoBuilder.buildAutoChooser()
+
+      SmartDashboard.putData("Auto Chooser", self.autoChooser)
 
-    SmartDashboard.putData("Auto Chooser", self.autoChooser)
+    return self.autoChooser
 
   def configureNamedCommands(self):
     # Commands need
@@ -144,4 +265,4 @@ class RobotContainer:
     pass
 
   def getAutonomousCommand(self) -> Command:
-    return self.autoChooser.getSelected()
+    return self.getAutoChooser().getSelected()
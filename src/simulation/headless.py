@@ -0,0 +1,359 @@
+"""
+Runs a full match (autonomous + teleop) in simulation without a GUI, as fast as the CPU allows.
+
+Usage (from the `src` folder):
+
+  python -m simulation.headless [--autonomous SECONDS] [--teleop SECONDS]
+
+Reports the wall-clock speedup and how long each robot loop took, so robot code changes can be
+benchmarked without the robot.
+"""
+
+import argparse
+import pathlib
+import threading
+import time
+import typing
+
+import ntcore
+import wpilib
+from pyfrc.physics.core import PhysicsInterface
+from wpimath.geometry import Pose2d
+from wpilib.simulation import (
+  DriverStationSim,
+  XboxControllerSim,
+  pauseTiming,
+  restartTiming,
+  stepTiming,
+  stepTimingAsync,
+)
+
+from constants import (
+  DriverControllerConstants,
+  OperatorControllerConstants,
+  SimulationConstants,
+)
+from utils.commandtrace import CommandTracer
+from utils.deploy import useRobotDeployDirectory
+from utils.inputlog import InputLog
+
+
+class ScriptedInput(typing.NamedTuple):
+  """
+  Holds a controller input at a value for part of a match period.
+  """
+
+  start: float
+  """Time (seconds) since the start of the period."""
+  end: float
+  port: int
+  name: str
+  """Name of the `XboxControllerSim` setter without `set` (ex: `LeftY`, `AButton`, `POV`)."""
+  value: typing.Union[float, bool, int]
+
+
+kRobotPath = pathlib.Path(__file__).parent.parent
+
+kDriver = DriverControllerConstants.kDriverControllerPort
+kOperator = OperatorControllerConstants.kOperatorControllerPort
+
+# Default values for every input used by the scripts. Inputs go back to these when not scripted.
+kNeutralInputs = {
+  "LeftX": 0.0,
+  "LeftY": 0.0,
+  "RightX": 0.0,
+  "LeftTriggerAxis": 0.0,
+  "RightTriggerAxis": 0.0,
+  "POV": -1,
+  "XButton": False,
+  "YButton": False,
+  "BackButton": False,
+}
+
+kTeleopScript = (
+  # Drive a square, then spin in place while strafing
+  ScriptedInput(1, 4, kDriver, "LeftY", -1.0),
+  ScriptedInput(4, 7, kDriver, "LeftX", -1.0),
+  ScriptedInput(7, 10, kDriver, "LeftY", 1.0),
+  ScriptedInput(10, 13, kDriver, "LeftX", 1.0),
+  ScriptedInput(14, 20, kDriver, "RightX", 0.8),
+  ScriptedInput(14, 20, kDriver, "LeftY", -0.5),
+  # Lock the wheels, toggle field relative twice
+  ScriptedInput(21, 22, kDriver, "XButton", True),
+  ScriptedInput(23, 23.2, kDriver, "BackButton", True),
+  ScriptedInput(24, 24.2, kDriver, "BackButton", True),
+  # Run the elevator up and down by hand, then through its set points
+  ScriptedInput(26, 29, kOperator, "LeftY", -1.0),
+  ScriptedInput(30, 32, kOperator, "LeftY", 1.0),
+  ScriptedInput(33, 33.2, kOperator, "POV", 0),
+  ScriptedInput(36, 36.2, kOperator, "POV", 90),
+  ScriptedInput(39, 39.2, kOperator, "POV", 180),
+  # Intake, then outtake
+  ScriptedInput(42, 45, kOperator, "LeftTriggerAxis", 1.0),
+  ScriptedInput(46, 48, kOperator, "RightTriggerAxis", 1.0),
+  # Keep driving around for the rest of the match
+  ScriptedInput(50, 135, kDriver, "LeftY", -0.3),
+  ScriptedInput(50, 135, kDriver, "RightX", 0.2),
+)
+
+
+class HeadlessMatch:
+  """
+  Steps the robot code and physics through a match one loop at a time.
+
+  The robot runs in its own thread like it does with `robotpy sim`, but simulated time only moves
+  forward when `stepTiming()` is called, so the match runs as fast as the robot code allows.
+  """
+
+  def __init__(
+    self,
+    robotClass: type[wpilib.RobotBase],
+    autonomousLength: float = SimulationConstants.kAutonomousLength,
+    teleopLength: float = SimulationConstants.kTeleopLength,
+    teleopScript: typing.Sequence[ScriptedInput] = kTeleopScript,
+  ):
+    self.autonomousLength = autonomousLength
+    self.teleopLength = teleopLength
+    self.teleopScript = teleopScript
+
+    self.physics, robotClass = PhysicsInterface._create_and_attach(robotClass, kRobotPath)
+
+    robotInitialized = threading.Event()
+
+    class HeadlessRobot(robotClass):
+      def robotInit(self):
+        try:
+          super().robotInit()
+        finally:
+          robotInitialized.set()
+
+    self.robotInitialized = robotInitialized
+    self.robot = HeadlessRobot()
+    self.thread: typing.Optional[threading.Thread] = None
+    self.robotException: typing.Optional[BaseException] = None
+
+    self.controllers = {
+      kDriver: XboxControllerSim(kDriver),
+      kOperator: XboxControllerSim(kOperator),
+    }
+
+    self.loopTimes: list[float] = []
+
+  def runRobot(self):
+    try:
+      self.robot.startCompetition()
+    except BaseException as e:
+      self.robotException = e
+      self.robotInitialized.set()
+    finally:
+      self.robot.endCompetition()
+
+  def start(self) -> float:
+    """
+    Starts the robot thread and returns how long (seconds) `robotInit()` took.
+    """
+    self.thread = threading.Thread(target=self.runRobot, name="RobotThread", daemon=True)
+
+    start = time.perf_counter()
+    self.thread.start()
+    self.robotInitialized.wait()
+    initTime = time.perf_counter() - start
+    self.checkRobot()
+
+    DriverStationSim.setDsAttached(True)
+    return initTime
+
+  def stop(self):
+    self.robot.endCompetition()
+    stepTimingAsync(1.0)
+    self.thread.join(timeout=1)
+
+  def run(self) -> "MatchReport":
+    initTime = self.start()
+
+    self.runPeriod(1.0, autonomous=False, enabled=False)
+    self.runPeriod(self.autonomousLength, autonomous=True, enabled=True)
+    self.runPeriod(self.teleopLength, autonomous=False, enabled=True, script=self.teleopScript)
+    self.runPeriod(1.0, autonomous=False, enabled=False)
+
+    self.stop()
+
+    return MatchReport(initTime, self.loopTimes, self.robot)
+
+  def runPeriod(
+    self,
+    length: float,
+    autonomous: bool,
+    enabled: bool,
+    script: typing.Sequence[ScriptedInput] = (),
+  ):
+    DriverStationSim.setAutonomous(autonomous)
+    DriverStationSim.setEnabled(enabled)
+
+    period = SimulationConstants.kLoopPeriod
+    for loop in range(round(length / period)):
+      elapsed = loop * period
+      DriverStationSim.setMatchTime(length - elapsed)
+      self.applyInputs(script, elapsed)
+      DriverStationSim.notifyNewData()
+
+      start = time.perf_counter()
+      stepTiming(period)
+      self.loopTimes.append(time.perf_counter() - start)
+
+    self.checkRobot()
+
+  def step(self, loops: int = 1):
+    """
+    Runs robot loops without touching the driver station or controllers.
+    """
+    for _ in range(loops):
+      DriverStationSim.notifyNewData()
+      stepTiming(SimulationConstants.kLoopPeriod)
+    self.checkRobot()
+
+  def resetPose(self, pose: Pose2d):
+    """
+    Moves the simulated robot, and resets its pose estimate, to a pose. The robot code only runs
+    while time is stepped, so it can be changed in between.
+    """
+    engine = self.physics.engine
+    engine.pose = pose
+    for limelight in engine.limelights:
+      limelight.pending.clear()
+    self.robot.robotContainer.driveSubsystem.resetOdometry(pose)
+
+  def applyInputs(self, script: typing.Sequence[ScriptedInput], elapsed: float):
+    inputs = {port: dict(kNeutralInputs) for port in self.controllers}
+    for scriptedInput in script:
+      if scriptedInput.start <= elapsed < scriptedInput.end:
+        inputs[scriptedInput.port][scriptedInput.name] = scriptedInput.value
+
+    for port, values in inputs.items():
+      controller = self.controllers[port]
+      for name, value in values.items():
+        getattr(controller, "set" + name)(value)
+
+  def checkRobot(self):
+    if self.robotException is not None:
+      raise RuntimeError("The robot code crashed during the simulated match") from (
+        self.robotException
+      )
+
+
+class MatchReport:
+  """
+  Timing results of a headless match.
+  """
+
+  def __init__(self, initTime: float, loopTimes: list[float], robot: wpilib.RobotBase):
+    self.initTime = initTime
+    self.loopTimes = loopTimes
+    self.simulatedTime = len(loopTimes) * SimulationConstants.kLoopPeriod
+    self.wallTime = sum(loopTimes)
+    self.speedup = self.simulatedTime / self.wallTime if self.wallTime > 0 else float("inf")
+
+    # Per phase timings from the robot's own loop timer, over the last few seconds of the match
+    loopTimer = getattr(robot, "loopTimer", None)
+    self.phases = (
+      {phase.name: (*phase.statistics(), phase.overruns) for phase in loopTimer.phases}
+      if loopTimer is not None
+      else {}
+    )
+
+    # Objects each phase left allocated per loop, from the robot's retention monitor
+    retentionMonitor = getattr(robot, "retentionMonitor", None)
+    self.retainedObjects = (
+      {
+        window.name: (*window.statistics(), window.regressions)
+        for window in (retentionMonitor.loop, *retentionMonitor.windows)
+        if window.count > 0
+      }
+      if retentionMonitor is not None
+      else {}
+    )
+    self.garbageCollector = getattr(robot, "garbageCollector", None)
+
+  def percentile(self, fraction: float) -> float:
+    ordered = sorted(self.loopTimes)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+  def __str__(self) -> str:
+    lines = [
+      f"robotInit:       {self.initTime * 1000:8.1f} ms",
+      f"Simulated time:  {self.simulatedTime:8.1f} s ({len(self.loopTimes)} loops)",
+      f"Wall-clock time: {self.wallTime:8.2f} s",
+      f"Speedup:         {self.speedup:8.1f}x real time",
+      f"Loop time:       p50 {self.percentile(0.5) * 1000:.3f} ms, "
+      f"p99 {self.percentile(0.99) * 1000:.3f} ms, max {max(self.loopTimes) * 1000:.3f} ms",
+    ]
+
+    if self.phases:
+      lines.append("Phases (last window): p50 / p99 / max (ms), overruns")
+      for name, (p50, p99, maximum, overruns) in self.phases.items():
+        lines.append(
+          f"  {name:32} {p50 * 1000:7.3f} / {p99 * 1000:7.3f} / {maximum * 1000:7.3f}  {overruns}"
+        )
+
+    if self.retainedObjects:
+      lines.append("Objects left allocated per loop (last window): median / max, regressions")
+      for name, (median, maximum, regressions) in self.retainedObjects.items():
+        lines.append(f"  {name:32} {median:7} / {maximum:7}  {regressions}")
+
+    if self.garbageCollector is not None:
+      lines.append(
+        f"Young collections while enabled: {self.garbageCollector.collections}"
+        f" ({self.garbageCollector.forcedCollections} with no time left),"
+        f" max {self.garbageCollector.maxCollectionTime * 1000:.3f} ms"
+      )
+
+    return "\n".join(lines)
+
+
+def setUpSimulation():
+  """
+  Prepares the simulation for a `HeadlessMatch`. Call it before importing the robot.
+  """
+  useRobotDeployDirectory()
+
+  # Same setup that `robotpy test` does before creating the robot
+  ntcore.NetworkTableInstance.getDefault().startLocal()
+  pauseTiming()
+  restartTiming()
+  wpilib.DriverStation.silenceJoystickConnectionWarning(True)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("--autonomous", type=float, default=SimulationConstants.kAutonomousLength)
+  parser.add_argument("--teleop", type=float, default=SimulationConstants.kTeleopLength)
+  parser.add_argument(
+    "--log",
+    metavar="DIRECTORY",
+    help="Record an input log that can be replayed (simulation.replay)",
+  )
+  parser.add_argument(
+    "--trace",
+    metavar="FILE",
+    help="Write what the command scheduler did as a Chrome trace (open with ui.perfetto.dev)",
+  )
+  args = parser.parse_args()
+
+  setUpSimulation()
+
+  if args.log:
+    pathlib.Path(args.log).mkdir(parents=True, exist_ok=True)
+    InputLog._instance = InputLog(InputLog.startDataLog(args.log))
+
+  from robot import MyRobot
+
+  report = HeadlessMatch(MyRobot, args.autonomous, args.teleop).run()
+  print(report)
+
+  if args.trace:
+    CommandTracer.getInstance().export(args.trace)
+    print(f"Command trace written to {args.trace}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,298 @@
+import collections
+import math
+import random
+
+from ntcore import NetworkTableInstance, PubSubOptions
+from rev import SparkMax, SparkMaxSim
+from wpilib import DigitalInput
+from wpilib.simulation import DCMotorSim, DIOSim, ElevatorSim, FlywheelSim
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import SwerveModuleState
+from wpimath.system.plant import DCMotor, LinearSystemId
+
+from constants import (
+  ElevatorSubsystemConstants,
+  SimulationConstants,
+  SwerveModuleConstants,
+)
+from subsystems.SwerveModule import SwerveModule
+
+
+class SimulatedGyro:
+  """
+  Stands in for `navx.AHRS` in simulation.
+
+  The navX library reads its SimDevice from a background thread that runs in real time, so its
+  values lag behind when the simulation runs faster than real time. The physics engine swaps this
+  in for `DriveSubsystem.gyro` and sets the heading directly every step.
+
+  Like the navX, yaw and rate are clockwise positive and `getRotation2d()` is counter-clockwise
+  positive.
+  """
+
+  def __init__(self):
+    self.heading = 0.0  # radians, counter-clockwise positive, continuous
+    self.rate = 0.0  # radians per second, counter-clockwise positive
+    self.offset = 0.0
+    # Added to the real rate, the heading drifts away from the robot's by this much every second
+    self.drift = 0.0  # radians per second
+
+  def update(self, dt: float, rate: float):
+    """
+    Turns the gyro along with the robot.
+
+    :param dt: Time (seconds) since the last update.
+    :param rate: The robot's real rate (radians per second, counter-clockwise positive).
+    """
+    self.rate = rate + self.drift
+    self.heading += self.rate * dt
+
+  def getRotation2d(self) -> Rotation2d:
+    return Rotation2d(self.heading - self.offset)
+
+  def getAngle(self) -> float:
+    return -math.degrees(self.heading - self.offset)
+
+  def getYaw(self) -> float:
+    return -math.degrees(math.remainder(self.heading - self.offset, math.tau))
+
+  def getRate(self) -> float:
+    return -math.degrees(self.rate)
+
+  def zeroYaw(self):
+    self.offset = self.heading
+
+  def reset(self):
+    self.offset = self.heading
+
+  def isConnected(self) -> bool:
+    return True
+
+
+class SwerveModuleModel:
+  """
+  Simulates a MAXSwerve module's driving wheel and turning mechanism as DC motors, closing the
+  loop through the SparkMaxes' own simulated controllers.
+
+  The wheel can be made to slip and its encoder to be noisy (both off by default), to measure how
+  much the odometry drifts (see `benchmarks.odometry`).
+  """
+
+  def __init__(self, module: SwerveModule):
+    self.module = module
+
+    self.random = random.Random()
+    # Standard deviation of the error on every reading of the drive encoder (meters)
+    self.encoderNoise = 0.0
+    self.encoderError = 0.0
+    # Average fraction of the wheel's travel that doesn't move the robot
+    self.wheelSlip = 0.0
+
+    self.driveMotorSim = SparkMaxSim(module.driveMotor, DCMotor.NEO(1))
+    self.turnMotorSim = SparkMaxSim(module.turnMotor, DCMotor.NEO550(1))
+    self.driveEncoderSim = self.driveMotorSim.getRelativeEncoderSim()
+    self.turnEncoderSim = self.turnMotorSim.getAbsoluteEncoderSim()
+
+    self.driveMechanism = DCMotorSim(
+      LinearSystemId.DCMotorSystem(
+        DCMotor.NEO(1),
+        SimulationConstants.kDriveMomentOfInertia,
+        SwerveModuleConstants.kDriveMotorReduction,
+      ),
+      DCMotor.NEO(1),
+    )
+    self.turnMechanism = DCMotorSim(
+      LinearSystemId.DCMotorSystem(
+        DCMotor.NEO550(1),
+        SimulationConstants.kTurnMomentOfInertia,
+        SwerveModuleConstants.kTurnMotorReduction,
+      ),
+      DCMotor.NEO550(1),
+    )
+
+  def update(self, dt: float, busVoltage: float) -> SwerveModuleState:
+    """
+    Steps the module forward and returns its real (chassis relative) state.
+    """
+    self.driveMechanism.setInputVoltage(self.driveMotorSim.getAppliedOutput() * busVoltage)
+    self.driveMechanism.update(dt)
+    self.turnMechanism.setInputVoltage(self.turnMotorSim.getAppliedOutput() * busVoltage)
+    self.turnMechanism.update(dt)
+
+    # The drive motor's closed loop uses its relative encoder (in conversion factor units)
+    motorRPM = (
+      self.driveMechanism.getAngularVelocityRPM() * SwerveModuleConstants.kDriveMotorReduction
+    )
+    self.driveMotorSim.iterate(
+      motorRPM * self.driveEncoderSim.getVelocityConversionFactor(), busVoltage, dt
+    )
+    if self.encoderNoise > 0:
+      # A new error on every reading, the one of the last reading must not add up
+      position = self.driveEncoderSim.getPosition() - self.encoderError
+      self.encoderError = self.random.gauss(0, self.encoderNoise)
+      self.driveEncoderSim.setPosition(position + self.encoderError)
+
+    # The turning motor's closed loop uses the absolute encoder, which wraps like the real one
+    moduleAngle = self.turnMechanism.getAngularPosition()
+    self.turnMotorSim.iterate(self.turnMechanism.getAngularVelocity(), busVoltage, dt)
+    self.turnEncoderSim.setPosition(moduleAngle % math.tau)
+
+    speed = self.driveMechanism.getAngularVelocity() * SwerveModuleConstants.kWheelDiameter / 2
+    if self.wheelSlip > 0:
+      speed *= 1 - self.random.uniform(0, 2 * self.wheelSlip)
+    return SwerveModuleState(
+      speed,
+      Rotation2d(moduleAngle - self.module.chassisAngularOffset),
+    )
+
+  def getCurrentDrawAmps(self) -> float:
+    return abs(self.driveMechanism.getCurrentDraw()) + abs(self.turnMechanism.getCurrentDraw())
+
+
+class ElevatorModel:
+  """
+  Simulates the two-motor elevator, including both limit switches.
+  """
+
+  def __init__(self, motor: SparkMax, upperSwitch: DigitalInput, lowerSwitch: DigitalInput):
+    self.motorSim = SparkMaxSim(motor, DCMotor.NEO(2))
+    self.upperSwitchSim = DIOSim(upperSwitch)
+    self.lowerSwitchSim = DIOSim(lowerSwitch)
+
+    self.mechanism = ElevatorSim(
+      DCMotor.NEO(2),
+      ElevatorSubsystemConstants.kGearRatio,
+      ElevatorSubsystemConstants.kCarriageMass,
+      ElevatorSubsystemConstants.kDrumRadius,
+      ElevatorSubsystemConstants.kMinHeight,
+      ElevatorSubsystemConstants.kMaxHeight,
+      True,
+      ElevatorSubsystemConstants.kMinHeight,
+    )
+
+  def update(self, dt: float, busVoltage: float):
+    output = self.motorSim.getAppliedOutput()
+
+    # The motors are in brake mode, which is enough to hold the carriage when they aren't driven
+    if output == 0:
+      self.mechanism.setState(self.mechanism.getPosition(), 0)
+
+    self.mechanism.setInputVoltage(output * busVoltage)
+    self.mechanism.update(dt)
+
+    height = self.mechanism.getPosition()
+    motorRPM = (
+      self.mechanism.getVelocity()
+      / (2 * math.pi * ElevatorSubsystemConstants.kDrumRadius)
+      * ElevatorSubsystemConstants.kGearRatio
+      * 60
+    )
+    self.motorSim.iterate(motorRPM, busVoltage, dt)
+
+    self.upperSwitchSim.setValue(
+      any(
+        abs(height - switchHeight) <= SimulationConstants.kUpperSwitchHalfWidth
+        for switchHeight in SimulationConstants.kUpperSwitchHeights
+      )
+    )
+    self.lowerSwitchSim.setValue(height <= SimulationConstants.kLowerSwitchHeight)
+
+  def getHeight(self) -> float:
+    return self.mechanism.getPosition()
+
+  def getCurrentDrawAmps(self) -> float:
+    return abs(self.mechanism.getCurrentDraw())
+
+
+class RollerModel:
+  """
+  Simulates a single pickup roller as a flywheel.
+  """
+
+  def __init__(self, motor: SparkMax):
+    self.motorSim = SparkMaxSim(motor, DCMotor.NEO(1))
+    self.mechanism = FlywheelSim(
+      LinearSystemId.flywheelSystem(
+        DCMotor.NEO(1),
+        SimulationConstants.kPickupMomentOfInertia,
+        SimulationConstants.kPickupGearing,
+      ),
+      DCMotor.NEO(1),
+    )
+
+  def update(self, dt: float, busVoltage: float):
+    self.mechanism.setInputVoltage(self.motorSim.getAppliedOutput() * busVoltage)
+    self.mechanism.update(dt)
+    motorRPM = (
+      self.mechanism.getAngularVelocity() * 60 / math.tau * SimulationConstants.kPickupGearing
+    )
+    self.motorSim.iterate(motorRPM, busVoltage, dt)
+
+  def getCurrentDrawAmps(self) -> float:
+    return abs(self.mechanism.getCurrentDraw())
+
+
+class SimulatedLimelight:
+  """
+  Publishes MegaTag2 botpose arrays for a Limelight, measured from the robot's real pose.
+
+  There are no AprilTags in the simulation, so the camera sees the same number of tags at the same
+  distance all the time. Frames are published `latency` after they are captured, with that latency
+  in the array like the real camera. Off (`frameRate` of 0) unless a benchmark turns it on.
+  """
+
+  def __init__(self, tableName: str):
+    table = NetworkTableInstance.getDefault().getTable(tableName)
+    self.publisher = table.getDoubleArrayTopic("botpose_orb_wpiblue").publish(
+      # A still robot gives the same array every frame
+      PubSubOptions(keepDuplicates=True)
+    )
+
+    self.random = random.Random()
+    self.frameRate = 0.0  # frames per second
+    self.latency = 0.0  # seconds, from capture to publication
+    self.noise = 0.0  # meters, standard deviation of the error on x and y
+    self.tagCount = 1
+    self.tagDistance = 2.0  # meters
+
+    self.lastCapture = -math.inf
+    # Captured frames waiting for their latency to pass: (capture time, measured pose)
+    self.pending: collections.deque[tuple[float, Pose2d]] = collections.deque()
+
+  def update(self, now: float, pose: Pose2d):
+    """
+    :param now: FPGA timestamp (seconds).
+    :param pose: The robot's real pose.
+    """
+    if self.frameRate > 0 and now - self.lastCapture >= 1 / self.frameRate:
+      self.lastCapture = now
+      self.pending.append(
+        (
+          now,
+          Pose2d(
+            pose.X() + self.random.gauss(0, self.noise),
+            pose.Y() + self.random.gauss(0, self.noise),
+            pose.rotation(),
+          ),
+        )
+      )
+
+    while self.pending and now - self.pending[0][0] >= self.latency:
+      captureTime, measured = self.pending.popleft()
+      # [x, y, z, roll, pitch, yaw, latency (ms), tag count, tag span, average distance, area]
+      self.publisher.set(
+        [
+          measured.X(),
+          measured.Y(),
+          0,
+          0,
+          0,
+          measured.rotation().degrees(),
+          (now - captureTime) * 1000,
+          self.tagCount,
+          0,
+          self.tagDistance,
+          0,
+        ],
+        round(now * 1000000),
+      )
@@ -0,0 +1,313 @@
+"""
+Replays a log recorded on the robot (see `utils.inputlog.InputLog`) through the robot code.
+
+Usage (from the `src` folder):
+
+  python -m simulation.replay path/to/FRC_XXX.wpilog
+
+Every loop cycle of the log is run through the robot's own loop, as fast as possible, with the
+hardware reads (drive sensors, odometry thread, Limelight frames, limit switches, joysticks and
+driver station) replaced by the logged values. Change the pose estimator, vision filters or
+commands, then replay the same match to compare the resulting poses with the original ones.
+"""
+
+import argparse
+import functools
+import math
+import time
+import typing
+
+import hal
+import ntcore
+import wpilib
+from wpilib import Timer
+from wpilib.simulation import DIOSim, DriverStationSim, pauseTiming, stepTimingAsync
+from wpimath.geometry import Pose2d, Rotation2d
+from wpiutil.log import DataLogReader, DataLogRecord
+
+from constants import DriveSubsystemConstants
+from subsystems.DriveSnapshot import DriveSnapshot, OdometrySample
+from subsystems.vision import VisionFrame
+from utils.deploy import useRobotDeployDirectory
+from utils.inputlog import InputLog
+from utils.powermanager import PowerSample
+
+kDecoders: dict[str, typing.Callable[[DataLogRecord], typing.Any]] = {
+  "boolean": DataLogRecord.getBoolean,
+  "int64": DataLogRecord.getInteger,
+  "double": DataLogRecord.getDouble,
+  "boolean[]": DataLogRecord.getBooleanArray,
+  "int64[]": DataLogRecord.getIntegerArray,
+  "float[]": DataLogRecord.getFloatArray,
+  "double[]": DataLogRecord.getDoubleArray,
+}
+
+
+class ReplayCycle(typing.NamedTuple):
+  timestamp: int
+  """FPGA time (microseconds) at which the cycle started."""
+  records: dict[str, list]
+  """Every value logged during the cycle, by entry name."""
+  driverStation: dict[str, typing.Any]
+  """Driver station values (`DS:` entries) that changed since the previous cycle."""
+
+
+class ReplayLog:
+  """
+  A data log split back into loop cycles.
+  """
+
+  def __init__(self, cycles: list[ReplayCycle], initial: ReplayCycle):
+    self.cycles = cycles
+    self.initial = initial
+    """Values logged before the first cycle (while the subsystems were constructed)."""
+
+  @staticmethod
+  def read(path: str) -> "ReplayLog":
+    entries: dict[int, tuple[str, str]] = {}
+    initial = ReplayCycle(0, {}, {})
+    cycles: list[ReplayCycle] = []
+    cycle = initial
+    driverStation: dict[str, typing.Any] = {}
+
+    for record in DataLogReader(path):
+      if record.isStart():
+        start = record.getStartData()
+        entries[start.entry] = (start.name, start.type)
+        continue
+      if record.isControl() or record.getEntry() not in entries:
+        continue
+
+      name, entryType = entries[record.getEntry()]
+      decode = kDecoders.get(entryType)
+      if decode is None:
+        continue
+
+      if name.startswith("DS:"):
+        # Applied at the start of the next cycle, like the robot reads them at the start of a loop
+        driverStation[name] = decode(record)
+      elif name == "Inputs/Cycle":
+        cycle = ReplayCycle(record.getTimestamp(), {}, driverStation)
+        driverStation = {}
+        cycles.append(cycle)
+      elif name.startswith("Inputs/") or name.startswith("Outputs/"):
+        cycle.records.setdefault(name, []).append(decode(record))
+
+    return ReplayLog(cycles, initial)
+
+
+class LogReplay:
+  """
+  Runs a `ReplayLog` through the robot's loop one cycle at a time, without a robot thread.
+  """
+
+  def __init__(self, log: ReplayLog, robotClass: type[wpilib.TimedRobot]):
+    self.log = log
+    self.cycle = log.initial
+
+    # The replay itself isn't logged
+    InputLog._instance = InputLog(None)
+
+    self.robot = robotClass()
+    self.robot.robotInit()
+
+    container = self.robot.robotContainer
+    self.driveSubsystem = container.driveSubsystem
+
+    # Swap every hardware read for the logged values
+    self.driveSubsystem.odometryThread.stop()
+    self.driveSubsystem.odometryThread.drain = self.readOdometrySamples
+    self.driveSubsystem.readSnapshot = self.readSnapshot
+    for camera in self.driveSubsystem.cameras:
+      camera.readFrames = functools.partial(self.readVisionFrames, camera.tableName)
+    container.powerManager.readSample = self.readPowerSample
+    self.switches = {
+      "Inputs/Elevator/Upper Switch": DIOSim(container.elevatorSubsystem.upperElevatorSwitch),
+      "Inputs/Elevator/Lower Switch": DIOSim(container.elevatorSubsystem.lowerElevatorSwitch),
+    }
+
+    # Start from the same odometry the robot started with
+    initialSnapshot = LogReplay.decodeSnapshot(log.initial)
+    if initialSnapshot is not None:
+      self.driveSubsystem.odometry.resetPosition(
+        initialSnapshot.gyroRotation, initialSnapshot.positions, Pose2d()
+      )
+      self.driveSubsystem.snapshot = initialSnapshot
+
+  def run(self) -> "ReplayReport":
+    replayedPoses: list[Pose2d] = []
+    loggedPoses: list[typing.Optional[Pose2d]] = []
+
+    start = time.perf_counter()
+    for cycle in self.log.cycles:
+      self.cycle = cycle
+      self.applyDriverStation(cycle)
+      self.applySwitches(cycle)
+      stepTimingAsync(max(0.0, cycle.timestamp / 1e6 - Timer.getFPGATimestamp()))
+
+      self.robot._loopFunc()
+
+      replayedPoses.append(self.driveSubsystem.getPose())
+      logged = cycle.records.get("Outputs/Drive/Pose")
+      loggedPoses.append(Pose2d(logged[0][0], logged[0][1], logged[0][2]) if logged else None)
+
+    wallTime = time.perf_counter() - start
+    self.robot.endCompetition()
+    return ReplayReport(self.log.cycles, replayedPoses, loggedPoses, wallTime)
+
+  ### Logged hardware reads ###
+
+  def readSnapshot(self) -> DriveSnapshot:
+    snapshot = LogReplay.decodeSnapshot(self.cycle)
+    return snapshot if snapshot is not None else self.driveSubsystem.snapshot
+
+  @staticmethod
+  def decodeSnapshot(cycle: ReplayCycle) -> typing.Optional[DriveSnapshot]:
+    records = cycle.records
+    if "Inputs/Drive/Positions" not in records:
+      return None
+
+    states = InputLog.decodeStates(records["Inputs/Drive/States"][0])
+    return DriveSnapshot(
+      records["Inputs/Drive/Timestamp"][0],
+      Rotation2d(records["Inputs/Drive/Gyro"][0]),
+      records.get("Inputs/Drive/Gyro Rate", [0.0])[0],
+      InputLog.decodePositions(records["Inputs/Drive/Positions"][0]),
+      states,
+      DriveSubsystemConstants.kDriveKinematics.toChassisSpeeds(states),
+    )
+
+  def readOdometrySamples(self) -> list[OdometrySample]:
+    samples = []
+    length = InputLog.kOdometrySampleLength
+    for values in self.cycle.records.get("Inputs/Drive/Odometry", ()):
+      for i in range(0, len(values), length):
+        samples.append(
+          OdometrySample(
+            values[i],
+            Rotation2d(values[i + 1]),
+            InputLog.decodePositions(values[i + 2 : i + length]),
+          )
+        )
+    return samples
+
+  def readVisionFrames(self, camera: str) -> list[VisionFrame]:
+    return [
+      VisionFrame(int(values[0]), list(values[1:]))
+      for values in self.cycle.records.get(f"Inputs/Vision/{camera}/Frame", ())
+    ]
+
+  def readPowerSample(self) -> PowerSample:
+    values = self.cycle.records.get("Inputs/Power")
+    if not values:
+      # Older logs: a full battery
+      return PowerSample(12.0, 0.0, False)
+    voltage, current, brownedOut = values[0]
+    return PowerSample(voltage, current, bool(brownedOut))
+
+  def applySwitches(self, cycle: ReplayCycle):
+    for name, switch in self.switches.items():
+      values = cycle.records.get(name)
+      if values:
+        switch.setValue(values[0])
+
+  def applyDriverStation(self, cycle: ReplayCycle):
+    for name, value in cycle.driverStation.items():
+      if name == "DS:enabled":
+        DriverStationSim.setEnabled(value)
+      elif name == "DS:autonomous":
+        DriverStationSim.setAutonomous(value)
+      elif name == "DS:test":
+        DriverStationSim.setTest(value)
+      elif name == "DS:estop":
+        DriverStationSim.setEStop(value)
+      elif name.startswith("DS:joystick"):
+        stick = int(name[len("DS:joystick") : name.index("/")])
+        if name.endswith("/axes"):
+          DriverStationSim.setJoystickAxisCount(stick, len(value))
+          for axis, axisValue in enumerate(value):
+            DriverStationSim.setJoystickAxis(stick, axis, axisValue)
+        elif name.endswith("/buttons"):
+          DriverStationSim.setJoystickButtonCount(stick, len(value))
+          for button, pressed in enumerate(value):
+            DriverStationSim.setJoystickButton(stick, button + 1, pressed)
+        elif name.endswith("/povs"):
+          DriverStationSim.setJoystickPOVCount(stick, len(value))
+          for pov, povValue in enumerate(value):
+            DriverStationSim.setJoystickPOV(stick, pov, povValue)
+
+    redAlliance = cycle.records.get("Inputs/DS/Red Alliance")
+    if redAlliance:
+      DriverStationSim.setAllianceStationId(
+        hal.AllianceStationID.kRed1 if redAlliance[0] else hal.AllianceStationID.kBlue1
+      )
+
+    DriverStationSim.notifyNewData()
+
+
+class ReplayReport:
+  """
+  Replayed poses compared with the ones logged on the robot.
+  """
+
+  def __init__(
+    self,
+    cycles: list[ReplayCycle],
+    replayedPoses: list[Pose2d],
+    loggedPoses: list[typing.Optional[Pose2d]],
+    wallTime: float,
+  ):
+    self.cycles = cycles
+    self.replayedPoses = replayedPoses
+    self.loggedPoses = loggedPoses
+    self.wallTime = wallTime
+    self.logTime = (cycles[-1].timestamp - cycles[0].timestamp) / 1e6 if cycles else 0.0
+
+    self.errors = [
+      replayed.translation().distance(logged.translation())
+      for replayed, logged in zip(replayedPoses, loggedPoses)
+      if logged is not None
+    ]
+
+  def __str__(self) -> str:
+    speedup = self.logTime / self.wallTime if self.wallTime > 0 else math.inf
+    lines = [
+      f"Cycles:          {len(self.cycles):8d} ({self.logTime:.1f} s of log)",
+      f"Wall-clock time: {self.wallTime:8.2f} s ({speedup:.1f}x real time)",
+    ]
+
+    if self.replayedPoses:
+      final = self.replayedPoses[-1]
+      lines.append(
+        f"Final pose:      x {final.X():.3f} m, y {final.Y():.3f} m, "
+        f"{final.rotation().degrees():.1f} deg"
+      )
+    if self.errors:
+      lines.append(
+        f"Difference with the logged poses: max {max(self.errors):.4f} m, "
+        f"final {self.errors[-1]:.4f} m"
+      )
+
+    return "\n".join(lines)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("log", help="Path of the .wpilog file recorded on the robot")
+  args = parser.parse_args()
+
+  useRobotDeployDirectory()
+
+  ntcore.NetworkTableInstance.getDefault().startLocal()
+  pauseTiming()
+  wpilib.DriverStation.silenceJoystickConnectionWarning(True)
+  DriverStationSim.setDsAttached(True)
+
+  from robot import MyRobot
+
+  report = LogReplay(ReplayLog.read(args.log), MyRobot).run()
+  print(report)
+
+
+if __name__ == "__main__":
+  main()
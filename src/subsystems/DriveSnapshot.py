@@ -0,0 +1,50 @@
+from typing import NamedTuple
+
+from wpimath.geometry import Rotation2d
+from wpimath.kinematics import ChassisSpeeds, SwerveModulePosition, SwerveModuleState
+
+
+class SwerveModuleSample(NamedTuple):
+  """
+  Everything read from a single swerve module's encoders in one pass.
+
+  The position and state share the same turning angle so that they agree with each other.
+  """
+
+  position: SwerveModulePosition
+  state: SwerveModuleState
+
+
+class DriveSnapshot(NamedTuple):
+  """
+  Immutable record of every drivetrain sensor value for a single loop cycle.
+
+  The snapshot is read once at the start of `DriveSubsystem.periodic` and is then shared by
+  odometry, telemetry, PathPlanner suppliers and commands so that every consumer sees the same
+  values within a cycle. Module tuples are ordered front left, front right, back left, back right.
+  """
+
+  timestamp: float
+  """FPGA timestamp (seconds) at which the snapshot was read."""
+  gyroRotation: Rotation2d
+  yawRate: float
+  """Counterclockwise rate of the gyro (radians per second)."""
+  positions: tuple[
+    SwerveModulePosition, SwerveModulePosition, SwerveModulePosition, SwerveModulePosition
+  ]
+  states: tuple[SwerveModuleState, SwerveModuleState, SwerveModuleState, SwerveModuleState]
+  robotRelativeSpeeds: ChassisSpeeds
+
+
+class OdometrySample(NamedTuple):
+  """
+  Gyro and module positions read together by the odometry thread, tagged with the time they were
+  read at.
+  """
+
+  timestamp: float
+  """FPGA timestamp (seconds) at which the sample was read."""
+  gyroRotation: Rotation2d
+  positions: tuple[
+    SwerveModulePosition, SwerveModulePosition, SwerveModulePosition, SwerveModulePosition
+  ]
@@ -1,25 +1,35 @@
+import math
+import typing
+
 import navx
 from commands2 import Subsystem
-from ntcore import NetworkTableInstance
+from commands2.sysid import SysIdRoutine
 from pathplannerlib.auto import AutoBuilder
 from pathplannerlib.config import RobotConfig
 from pathplannerlib.controller import PPHolonomicDriveController
-from wpilib import DriverStation, SmartDashboard
+from wpilib import DriverStation, Timer
 from wpimath.estimator import SwerveDrive4PoseEstimator
 from wpimath.geometry import Pose2d, Rotation2d
-from wpimath.kinematics import (
-  ChassisSpeeds,
-  SwerveDrive4Kinematics,
-  SwerveModuleState,
-)
+from wpimath.kinematics import ChassisSpeeds, SwerveModuleState
 
 from config import Config
-from constants import DriveSubsystemConstants, RobotConstants
+from constants import DriveSubsystemConstants, SysIdConstants, VisionConstants
+from subsystems.DriveSnapshot import DriveSnapshot, OdometrySample
+from subsystems.OdometryThread import OdometryThread
 from subsystems.SwerveModule import SwerveModule
+from utils.inputlog import InputLog
+from utils.posehistory import PoseHistory
+from utils.sparkconfig import SparkConfigManager
+from utils.swervekinematics import SwerveKinematics
+from utils.sysid import SysIdMechanism, SysIdMotor
+from utils.telemetry import Priority, Telemetry
 
 from .vision import LimelightHelpers
 
 
+kModuleNames = ("frontLeft", "frontRight", "backLeft", "backRight")
+
+
 class DriveSubsystem(Subsystem):
   fieldRelative = True
 
@@ -49,19 +59,32 @@ class DriveSubsystem(Subsystem):
       DriveSubsystemConstants.kBackRightChassisAngularOffset,
     )
 
-    self.gyro = navx.AHRS(navx.AHRS.NavXComType.kMXP_SPI)
+    self.modules = (self.frontLeft, self.frontRight, self.backLeft, self.backRight)
+    # Lowered by the power manager when the battery sags
+    self.speedScale = 1.0
+
+    # The modules' encoders are read below, all four must be configured first
+    SparkConfigManager.getInstance().waitForAll()
+    self.kinematics = SwerveKinematics(
+      DriveSubsystemConstants.kDriveKinematics.getModules(),
+      [module.chassisAngularOffset for module in self.modules],
+      DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+    )
+
+    # Updated as often as the odometry thread samples it
+    self.gyro = navx.AHRS(
+      navx.AHRS.NavXComType.kMXP_SPI, DriveSubsystemConstants.kOdometryFrequency
+    )
+
+    self.snapshot = self.readSnapshot()
 
     self.odometry = SwerveDrive4PoseEstimator(
       DriveSubsystemConstants.kDriveKinematics,
-      self.gyro.getRotation2d(),
-      (
-        self.frontLeft.getPosition(),
-        self.frontRight.getPosition(),
-        self.backLeft.getPosition(),
-        self.backRight.getPosition(),
-      ),
+      self.snapshot.gyroRotation,
+      self.snapshot.positions,
       Pose2d(),
     )
+    self.poseHistory = PoseHistory()
 
     # Configure the AutoBuilder last
     AutoBuilder.configure(
@@ -80,10 +103,110 @@ class DriveSubsystem(Subsystem):
       self,
     )
 
-    self.limelightHelpers = LimelightHelpers()
+    self.cameras = tuple(LimelightHelpers(name) for name in VisionConstants.kCameraNames)
+    # Whether vision agreed with the pose estimate yet, see `updateVision()`
+    self.visionSeeded = False
+
+    # Started last, once everything it reads exists
+    self.odometryThread = OdometryThread(self.readOdometrySample)
+    self.odometryThread.start()
+
+    ### Telemetry ###
+    telemetry = Telemetry.getInstance()
+    self.poseTelemetry = telemetry.addStruct("Drive/Pose", Pose2d, Priority.kHigh)
+    self.moduleStatesTelemetry = telemetry.addStructArray(
+      "Drive/ModuleStates", SwerveModuleState, Priority.kMedium
+    )
+    self.acceptedVisionFramesTelemetry = telemetry.addDouble(
+      "Vision/Accepted Frames", Priority.kLow
+    )
+    self.rejectedVisionFramesTelemetry = telemetry.addDouble(
+      "Vision/Rejected Frames", Priority.kLow
+    )
+    self.droppedOdometrySamplesTelemetry = telemetry.addDouble(
+      "Drive/Dropped Odometry Samples", Priority.kLow
+    )
+    self.orientationRoundTripTelemetry = [
+      telemetry.addDouble(f"Vision/{camera.tableName}/Orientation Round Trip", Priority.kLow)
+      for camera in self.cameras
+    ]
 
   def periodic(self) -> None:
-    self.odometry.update(
+    self.snapshot = self.readSnapshot()
+
+    self.updateOdometry()
+
+    self.updateVision()
+
+    # Speeds in the pose estimate's frame, which isn't the gyro's once the odometry was reset
+    pose = self.getPose()
+    self.poseHistory.add(
+      self.snapshot.timestamp,
+      pose,
+      ChassisSpeeds.fromRobotRelativeSpeeds(self.snapshot.robotRelativeSpeeds, pose.rotation()),
+    )
+
+    InputLog.getInstance().logPose(pose)
+
+    self.updateShuffleBoard()
+
+  def updateShuffleBoard(self):
+    self.poseTelemetry.set(self.getPose())
+    self.moduleStatesTelemetry.set(self.snapshot.states)
+    self.acceptedVisionFramesTelemetry.set(sum(camera.acceptedFrames for camera in self.cameras))
+    self.rejectedVisionFramesTelemetry.set(sum(camera.rejectedFrames for camera in self.cameras))
+    for camera, roundTripTelemetry in zip(self.cameras, self.orientationRoundTripTelemetry):
+      roundTripTelemetry.set(camera.orientationRoundTrip)
+    self.droppedOdometrySamplesTelemetry.set(self.odometryThread.droppedSamples)
+
+  def updateOdometry(self):
+    """
+    Replays every sample taken by the odometry thread since the last loop into the pose estimator.
+    Falls back to this loop's snapshot if the thread hasn't produced any.
+    """
+    samples = self.odometryThread.drain()
+    InputLog.getInstance().logOdometry(samples)
+    if not samples:
+      self.odometry.updateWithTime(
+        self.snapshot.timestamp, self.snapshot.gyroRotation, self.snapshot.positions
+      )
+      return
+
+    for sample in samples:
+      self.odometry.updateWithTime(sample.timestamp, sample.gyroRotation, sample.positions)
+
+  def updateVision(self):
+    """
+    Sends the heading estimated from this loop's odometry to every camera, then adds the frames
+    received since the last loop to the pose estimator.
+    """
+    # https://github.com/LimelightVision/limelight-examples/blob/28cb4c8f9b68cea62bef010ab793960f8d2b7a53/java-wpilib/swerve-megatag-odometry/src/main/java/frc/robot/Drivetrain.java#L142
+    heading = self.getPose().rotation()
+    for camera in self.cameras:
+      camera.setRobotOrientation(heading, self.snapshot.yawRate)
+    LimelightHelpers.flush()
+
+    # Jumps can only be rejected once vision agrees with the estimate: it starts at the origin
+    # wherever the robot is placed, and the robot can be moved by hand while disabled
+    gatePose = self.getPose() if self.visionSeeded and DriverStation.isEnabled() else None
+    for camera in self.cameras:
+      for measurement in camera.getVisionMeasurements(gatePose):
+        self.odometry.addVisionMeasurement(
+          measurement.pose, measurement.timestamp, measurement.stdDevs
+        )
+        if not self.visionSeeded:
+          self.visionSeeded = (
+            measurement.pose.translation().distance(self.getPose().translation())
+            <= VisionConstants.kMaxPoseJump
+          )
+
+  def readOdometrySample(self) -> OdometrySample:
+    """
+    Reads the gyro and module positions for the odometry thread. Only reads the hardware, so it is
+    safe to call from outside the robot loop.
+    """
+    return OdometrySample(
+      Timer.getFPGATimestamp(),
       self.gyro.getRotation2d(),
       (
         self.frontLeft.getPosition(),
@@ -93,21 +216,37 @@ class DriveSubsystem(Subsystem):
       ),
     )
 
-    # get limelight megapose
-    (pose, timestamp) = self.limelightHelpers.getLLPose()
+  def readSnapshot(self) -> DriveSnapshot:
     """
-    https://github.com/LimelightVision/limelight-examples/blob/28cb4c8f9b68cea62bef010ab793960f8d2b7a53/java-wpilib/swerve-megatag-odometry/src/main/java/frc/robot/Drivetrain.java#L142
+    Reads every module's encoders and the gyro exactly once.
+
+    This is called at the start of every `periodic()`. Everything else should use
+    `getSnapshot()` instead of reading the hardware again.
     """
-    self.odometry.setVisionMeasurementStdDevs([0.7, 0.7, 9999999])
-    self.odometry.addVisionMeasurement(pose, timestamp)
+    frontLeft = self.frontLeft.sample()
+    frontRight = self.frontRight.sample()
+    backLeft = self.backLeft.sample()
+    backRight = self.backRight.sample()
 
-    self.updateShuffleBoard()
+    states = (frontLeft.state, frontRight.state, backLeft.state, backRight.state)
 
-  def updateShuffleBoard(self):
-    SmartDashboard.putNumber("Front Left Rotation", self.frontLeft.getPosition().angle.degrees())
-    SmartDashboard.putNumber("Front Right Rotation", self.frontRight.getPosition().angle.degrees())
-    SmartDashboard.putNumber("Back Left Rotation", self.backLeft.getPosition().angle.degrees())
-    SmartDashboard.putNumber("Back Right Rotation", self.backRight.getPosition().angle.degrees())
+    snapshot = DriveSnapshot(
+      Timer.getFPGATimestamp(),
+      self.gyro.getRotation2d(),
+      # The navX is clockwise positive, like its yaw
+      -math.radians(self.gyro.getRate()),
+      (frontLeft.position, frontRight.position, backLeft.position, backRight.position),
+      states,
+      DriveSubsystemConstants.kDriveKinematics.toChassisSpeeds(states),
+    )
+    InputLog.getInstance().logSnapshot(snapshot)
+    return snapshot
+
+  def getSnapshot(self) -> DriveSnapshot:
+    """
+    Returns the sensor values read at the start of the current loop cycle.
+    """
+    return self.snapshot
 
   def getPose(self) -> Pose2d:
     """
@@ -121,16 +260,19 @@ class DriveSubsystem(Subsystem):
 
     :param pose: THe pose to set the odometry to.
     """
-    self.odometry.resetPosition(
-      self.gyro.getRotation2d(),
-      (
-        self.frontLeft.getPosition(),
-        self.frontRight.getPosition(),
-        self.backLeft.getPosition(),
-        self.backRight.getPosition(),
-      ),
-      pose,
-    )
+    # Samples taken before the reset must not be replayed on top of the new pose
+    self.odometryThread.drain()
+    self.odometry.resetPosition(self.snapshot.gyroRotation, self.snapshot.positions, pose)
+    self.poseHistory.clear()
+
+  def getPoseAt(self, timestamp: float) -> typing.Optional[Pose2d]:
+    """
+    Returns the estimated pose of the robot at a time of the last couple of seconds.
+
+    :param timestamp: FPGA timestamp (seconds).
+    :return None if that time is before the oldest pose kept (or the last odometry reset)
+    """
+    return self.poseHistory.getPose(timestamp)
 
   def getHeading(self) -> float:
     """
@@ -138,29 +280,21 @@ class DriveSubsystem(Subsystem):
 
     :return the robot's heading in degrees, from -180 to 180
     """
-    return self.gyro.getRotation2d()
+    return self.snapshot.gyroRotation
 
   def getCurrentSpeeds(self) -> ChassisSpeeds:
     """
-    Returns the current speeds of the robot.
+    Returns the current speeds of the robot in field relative coordinates.
     """
-    DriveSubsystemConstants.kDriveKinematics.toChassisSpeeds(
-      self.frontLeft.getState(),
-      self.frontRight.getState(),
-      self.backLeft.getState(),
-      self.backRight.getState(),
+    return ChassisSpeeds.fromRobotRelativeSpeeds(
+      self.snapshot.robotRelativeSpeeds, self.snapshot.gyroRotation
     )
 
   def getRobotRelativeSpeeds(self) -> ChassisSpeeds:
     """
     Returns the current speeds of the robot in robot relative coordinates.
     """
-    return ChassisSpeeds.fromFieldRelativeSpeeds(
-      self.getCurrentSpeeds().vx,
-      self.getCurrentSpeeds().vy,
-      self.getCurrentSpeeds().omega,
-      self.gyro.getRotation2d(),
-    )
+    return self.snapshot.robotRelativeSpeeds
 
   def setX(self):
     """
@@ -182,29 +316,29 @@ class DriveSubsystem(Subsystem):
     """
 
     # Binds Joystick input values to robot max speeds
-    xSpeedDelivered = xSpeed * DriveSubsystemConstants.kMaxSpeedMetersPerSecond
-    ySpeedDelivered = ySpeed * DriveSubsystemConstants.kMaxSpeedMetersPerSecond
-    rotDelivered = rot * DriveSubsystemConstants.kMaxAngularSpeed
+    maxSpeed = DriveSubsystemConstants.kMaxSpeedMetersPerSecond * self.speedScale
+    xSpeedDelivered = xSpeed * maxSpeed
+    ySpeedDelivered = ySpeed * maxSpeed
+    rotDelivered = rot * DriveSubsystemConstants.kMaxAngularSpeed * self.speedScale
 
     if fieldRelative:
-      swerveModuleStates = DriveSubsystemConstants.kDriveKinematics.toSwerveModuleStates(
-        ChassisSpeeds.fromFieldRelativeSpeeds(
-          xSpeedDelivered, ySpeedDelivered, rotDelivered, self.gyro.getRotation2d()
-        )
-      )
-    else:
-      swerveModuleStates = DriveSubsystemConstants.kDriveKinematics.toSwerveModuleStates(
-        ChassisSpeeds(xSpeedDelivered, ySpeedDelivered, rotDelivered)
+      # Same as ChassisSpeeds.fromFieldRelativeSpeeds
+      heading = self.snapshot.gyroRotation
+      cos = heading.cos()
+      sin = heading.sin()
+      xSpeedDelivered, ySpeedDelivered = (
+        xSpeedDelivered * cos + ySpeedDelivered * sin,
+        -xSpeedDelivered * sin + ySpeedDelivered * cos,
       )
 
-    states = SwerveDrive4Kinematics.desaturateWheelSpeeds(
-      swerveModuleStates, DriveSubsystemConstants.kMaxSpeedMetersPerSecond
-    )
+    self.setModuleSetpoints(xSpeedDelivered, ySpeedDelivered, rotDelivered)
 
-    self.frontLeft.setDesiredState(states[0])
-    self.frontRight.setDesiredState(states[1])
-    self.backLeft.setDesiredState(states[2])
-    self.backRight.setDesiredState(states[3])
+  def setSpeedScale(self, scale: float):
+    """
+    Scales the speeds `drive()` delivers down (0 - 1), see `PowerManager`. Paths followed with
+    `driveRobotRelative()` keep their own speeds, current limits still apply to them.
+    """
+    self.speedScale = scale
 
   def driveRobotRelative(self, robotRelativeSpeeds: ChassisSpeeds) -> None:
     """
@@ -213,22 +347,92 @@ class DriveSubsystem(Subsystem):
 
     :param chassisSpeeds: The chassis speeds to drive the robot with.
     """
-    targetSpeeds = ChassisSpeeds.discretize(robotRelativeSpeeds, 0.02)
-
-    swerveModuleStates = DriveSubsystemConstants.kDriveKinematics.toSwerveModuleStates(
-      ChassisSpeeds(targetSpeeds)
+    self.setModuleSetpoints(
+      *SwerveKinematics.discretize(
+        robotRelativeSpeeds.vx, robotRelativeSpeeds.vy, robotRelativeSpeeds.omega, 0.02
+      )
     )
 
-    states = SwerveDrive4Kinematics.desaturateWheelSpeeds(
-      swerveModuleStates, DriveSubsystemConstants.kMaxSpeedMetersPerSecond
+  def setModuleSetpoints(self, vx: float, vy: float, omega: float) -> None:
+    """
+    Computes and sends every module's setpoint for the given robot relative speeds.
+
+    :param vx: Forward speed (m/s).
+    :param vy: Left speed (m/s).
+    :param omega: Counter-clockwise rotation speed (rad/s).
+    """
+    modules = self.modules
+    kinematics = self.kinematics
+    kinematics.calculate(vx, vy, omega, [module.turnAngle.radians() for module in modules])
+
+    speeds = kinematics.speeds
+    angles = kinematics.angles
+    for i in range(4):
+      modules[i].setSetpoint(speeds[i], angles[i])
+
+  def setDriveVoltage(self, volts: float) -> None:
+    """
+    Drives straight forward open loop, for characterization.
+    """
+    for module in self.modules:
+      module.setDriveVoltage(volts, module.chassisAngularOffset)
+
+  def setTurnVoltage(self, volts: float) -> None:
+    """
+    Turns every module open loop without driving, for characterization.
+    """
+    for module in self.modules:
+      module.setTurnVoltage(volts)
+
+  def sysIdDrive(self) -> SysIdMechanism:
+    """
+    Characterizes the driving motors, driving straight forward (meters).
+    """
+    return SysIdMechanism(
+      "drive",
+      self,
+      self.setDriveVoltage,
+      [
+        SysIdMotor(
+          name,
+          module.driveMotor,
+          module.driveEncorder.getPosition,
+          module.driveEncorder.getVelocity,
+        )
+        for name, module in zip(kModuleNames, self.modules)
+      ],
+      SysIdRoutine.Config(
+        SysIdConstants.kDriveRampRate,
+        SysIdConstants.kDriveStepVoltage,
+        SysIdConstants.kDriveTimeout,
+      ),
     )
 
-    self.frontLeft.setDesiredState(states[0])
-    self.frontRight.setDesiredState(states[1])
-    self.backLeft.setDesiredState(states[2])
-    self.backRight.setDesiredState(states[3])
+  def sysIdTurn(self) -> SysIdMechanism:
+    """
+    Characterizes the turning motors, turning in place (rotations).
+    """
+    return SysIdMechanism(
+      "turn",
+      self,
+      self.setTurnVoltage,
+      [
+        SysIdMotor(
+          name,
+          module.turnMotor,
+          lambda module=module: module.turnEncoder.getPosition() / math.tau,
+          lambda module=module: module.turnEncoder.getVelocity() / math.tau,
+        )
+        for name, module in zip(kModuleNames, self.modules)
+      ],
+      SysIdRoutine.Config(
+        SysIdConstants.kTurnRampRate, SysIdConstants.kTurnStepVoltage, SysIdConstants.kTurnTimeout
+      ),
+      angular=True,
+    )
 
-  def shouldFlipPath():
+  @staticmethod
+  def shouldFlipPath() -> bool:
     # Boolean supplier that controls when the path will be mirrored for the red alliance
     # This will flip the path being followed to the red side of the field.
     # THE ORIGIN WILL REMAIN ON THE BLUE SIDE
@@ -0,0 +1,133 @@
+import collections
+import threading
+import typing
+
+from wpilib import DigitalInput, SynchronousInterrupt
+
+from constants import ElevatorSubsystemConstants
+
+
+class Edge(typing.NamedTuple):
+  # True when the input went from low to high (switch pressed)
+  rising: bool
+  # FPGA time of the edge, from the interrupt (seconds)
+  timestamp: float
+  # Encoder position and velocity when the interrupt was handled
+  position: float
+  velocity: float
+
+
+class EdgeCapture:
+  """
+  Captures both edges of a digital input as they happen, instead of polling it every loop.
+
+  A background thread waits on the input's interrupt. For every edge it reads the encoder, calls
+  `onEdge` right away (so a limit switch can stop a motor without waiting for the next loop) and
+  pushes the edge into a ring buffer protected by a lock. The robot loop calls `drain()` once per
+  cycle, like `OdometryThread`.
+
+  The roboRIO's FPGA latches edges and timestamps them, so edges that happen while one is being
+  handled are still reported by the next wait. In simulation, only edges that happen while the
+  thread is waiting are seen.
+  """
+
+  # Every capture whose thread is running, so `stopAll()` can reach the ones whose owner was never
+  # fully built
+  active: "set[EdgeCapture]" = set()
+
+  def __init__(
+    self,
+    source: DigitalInput,
+    readPosition: typing.Callable[[], float],
+    readVelocity: typing.Callable[[], float],
+    onEdge: typing.Optional[typing.Callable[[Edge], None]] = None,
+    bufferSize: int = ElevatorSubsystemConstants.kEdgeBufferSize,
+    timeout: float = ElevatorSubsystemConstants.kEdgeWaitTimeout,
+  ):
+    """
+    :param readPosition: Reads the encoder position. Called from the capture thread.
+    :param readVelocity: Reads the encoder velocity. Called from the capture thread.
+    :param onEdge: Called from the capture thread for every edge, oldest first.
+    :param bufferSize: Maximum number of edges kept between two calls to `drain()`.
+    :param timeout: Longest wait for an edge (seconds) before checking whether to stop.
+    """
+    self.readPosition = readPosition
+    self.readVelocity = readVelocity
+    self.onEdge = onEdge
+    self.timeout = timeout
+
+    self.interrupt = SynchronousInterrupt(source)
+    self.interrupt.setInterruptEdges(risingEdge=True, fallingEdge=True)
+
+    self.lock = threading.Lock()
+    self.buffer: collections.deque[Edge] = collections.deque(maxlen=bufferSize)
+    self.droppedEdges = 0
+
+    self.running = False
+    self.thread: typing.Optional[threading.Thread] = None
+
+  def start(self):
+    if self.thread is not None:
+      return
+
+    self.running = True
+    self.thread = threading.Thread(target=self.run, name="Edge Capture", daemon=True)
+    self.thread.start()
+    EdgeCapture.active.add(self)
+
+  def stop(self):
+    if self.thread is None:
+      return
+
+    self.running = False
+    self.interrupt.wakeupWaitingInterrupt()
+    self.thread.join()
+    self.thread = None
+    EdgeCapture.active.discard(self)
+
+  @staticmethod
+  def stopAll():
+    """
+    Stops every running capture. Called when the robot ends, whether or not robotInit succeeded.
+    """
+    for capture in list(EdgeCapture.active):
+      capture.stop()
+
+  def run(self):
+    while self.running:
+      # Edges that happened while an edge was being handled are reported by the next wait
+      result = self.interrupt.waitForInterrupt(self.timeout, ignorePrevious=False)
+      if self.running and result != SynchronousInterrupt.WaitResult.kTimeout:
+        self.capture(result)
+
+  def capture(self, result: SynchronousInterrupt.WaitResult):
+    """
+    Records the edges reported by one interrupt. Called by the capture thread.
+    """
+    position = self.readPosition()
+    velocity = self.readVelocity()
+
+    edges = []
+    if result.value & SynchronousInterrupt.WaitResult.kRisingEdge.value:
+      edges.append(Edge(True, self.interrupt.getRisingTimestamp(), position, velocity))
+    if result.value & SynchronousInterrupt.WaitResult.kFallingEdge.value:
+      edges.append(Edge(False, self.interrupt.getFallingTimestamp(), position, velocity))
+    # Both edges since the last wait: a short press or release
+    edges.sort(key=lambda edge: edge.timestamp)
+
+    for edge in edges:
+      if self.onEdge is not None:
+        self.onEdge(edge)
+      with self.lock:
+        if len(self.buffer) == self.buffer.maxlen:
+          self.droppedEdges += 1
+        self.buffer.append(edge)
+
+  def drain(self) -> list[Edge]:
+    """
+    Removes and returns every edge captured since the last call, oldest first.
+    """
+    with self.lock:
+      edges = list(self.buffer)
+      self.buffer.clear()
+    return edges
@@ -1,20 +1,25 @@
+import threading
+
 from commands2 import Subsystem
+from commands2.sysid import SysIdRoutine
 from rev import (
-  SparkBase,
   SparkClosedLoopController,
   SparkMax,
 )
-from wpilib import DigitalInput, SmartDashboard
+from wpilib import DigitalInput
 from wpimath.controller import ElevatorFeedforward
 
 from config import Config
-from constants import ElevatorSubsystemConstants
+from constants import ElevatorSubsystemConstants, SysIdConstants
+from subsystems.EdgeCapture import Edge, EdgeCapture
+from utils.inputlog import InputLog
+from utils.sparkconfig import SparkConfigManager
+from utils.sparkoutput import SparkOutput
+from utils.sysid import SysIdMechanism, SysIdMotor
+from utils.telemetry import Priority, Telemetry
 
 
 class ElevatorSubsystem(Subsystem):
-  upperElevatorSwitchTriggerCount = 0
-  upperElevatorSwitchIncrementFlag = False
-
   def __init__(self):
     super().__init__()
 
@@ -30,62 +35,123 @@ class ElevatorSubsystem(Subsystem):
     )
 
     ### Apply Configs ###
-    leftElevatorMotor.configure(
-      Config.ElevatorSubsystem.leftMotorConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
-    rightElevatorMotor.configure(
-      Config.ElevatorSubsystem.rightMotorConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
+    sparkConfigManager = SparkConfigManager.getInstance()
+    sparkConfigManager.configure(leftElevatorMotor, Config.ElevatorSubsystem.leftMotorConfig)
+    sparkConfigManager.configure(rightElevatorMotor, Config.ElevatorSubsystem.rightMotorConfig)
 
     self.elevatorMotor = leftElevatorMotor
+    self.elevatorMotors = (leftElevatorMotor, rightElevatorMotor)
+    # Lowered by the power manager when the battery sags
+    self.speedScale = 1.0
 
     ### Encoders ###
     self.elevatorEncoder = self.elevatorMotor.getEncoder()
 
-    ### Closed Loop Controllers ###
-    self.elevatorClosedLoopController = self.elevatorMotor.getClosedLoopController()
+    ### Outputs ### (Only send setpoints that changed)
+    self.elevatorOutput = SparkOutput(self.elevatorMotor)
 
     ### Elevator Feed Forward ###
     # https://docs.wpilib.org/en/stable/docs/software/advanced-controls/introduction/tuning-elevator.html
-    self.feedForward = ElevatorFeedforward(0, 0, 0, 0)
+    self.feedForward = ElevatorFeedforward(
+      ElevatorSubsystemConstants.kS,
+      ElevatorSubsystemConstants.kG,
+      ElevatorSubsystemConstants.kV,
+      ElevatorSubsystemConstants.kA,
+    )
+
+    ### Limit Switches ###
+    # Updated by the edge capture threads
+    self.switchLock = threading.Lock()
+    self.upperSwitchTriggerCount = 0
+    self.softStopRequested = False
+    self.lowerSwitchPressed = self.lowerElevatorSwitch.get()
+
+    ### Telemetry ###
+    self.upperSwitchTriggerCountTelemetry = Telemetry.getInstance().addDouble(
+      "Elevator/Up. Elevator Switch Trigger Count", Priority.kLow
+    )
+
+    # Started last, once everything their callbacks use exists. The robot stops them when it ends,
+    # with `EdgeCapture.stopAll()`, even if building the rest of the robot fails.
+    self.upperSwitchEdges = EdgeCapture(
+      self.upperElevatorSwitch, self.getPosition, self.getVelocity, self.onUpperSwitchEdge
+    )
+    self.lowerSwitchEdges = EdgeCapture(
+      self.lowerElevatorSwitch, self.getPosition, self.getVelocity, self.onLowerSwitchEdge
+    )
+    self.upperSwitchEdges.start()
+    self.lowerSwitchEdges.start()
 
   def periodic(self):
-    currentElevatorMotorSpeed = self.elevatorMotor.get()
-    currentUpperElevatorSwitchStatus = self.upperElevatorSwitch.get()
-
-    if currentUpperElevatorSwitchStatus and not ElevatorSubsystem.upperElevatorSwitchIncrementFlag:
-      if currentElevatorMotorSpeed > 0:
-        ElevatorSubsystem.upperElevatorSwitchTriggerCount += 1
-        ElevatorSubsystem.upperElevatorSwitchIncrementFlag = True
-      elif currentElevatorMotorSpeed < 0:
-        ElevatorSubsystem.upperElevatorSwitchTriggerCount -= 1
-        ElevatorSubsystem.upperElevatorSwitchIncrementFlag = True
-
-      if ElevatorSubsystem.upperElevatorSwitchTriggerCount >= 2:
-        currentCommand = self.getCurrentCommand()
-        if currentCommand is not None:
-          currentCommand.cancel()
-        self.stop()
-    elif (
-      not currentUpperElevatorSwitchStatus and ElevatorSubsystem.upperElevatorSwitchIncrementFlag
-    ):
-      ElevatorSubsystem.upperElevatorSwitchIncrementFlag = False
+    upperSwitchStatus = self.upperElevatorSwitch.get()
+    self.lowerSwitchPressed = self.lowerElevatorSwitch.get()
 
-    if self.lowerElevatorSwitch.get():
+    inputLog = InputLog.getInstance()
+    inputLog.logBoolean("Elevator/Upper Switch", upperSwitchStatus)
+    inputLog.logBoolean("Elevator/Lower Switch", self.lowerSwitchPressed)
+    inputLog.logEdges("Elevator/Upper Switch Edges", self.upperSwitchEdges.drain())
+    inputLog.logEdges("Elevator/Lower Switch Edges", self.lowerSwitchEdges.drain())
+
+    with self.switchLock:
+      softStopped = self.softStopRequested
+      self.softStopRequested = False
+
+    if softStopped:
+      # The motor was already stopped by the edge capture thread
       currentCommand = self.getCurrentCommand()
       if currentCommand is not None:
         currentCommand.cancel()
+      self.elevatorOutput.invalidate()
       self.stop()
+
+    # The switch's edge zeroes the encoder. This catches the carriage resting on it at startup, or
+    # the encoder drifting while it sits there, without re-sending the position every loop.
+    if (
+      self.lowerSwitchPressed
+      and abs(self.getPosition()) > ElevatorSubsystemConstants.kZeroPositionTolerance
+    ):
       self.zeroPosition()
-      # ElevatorSubsystem.upperElevatorSwitchTriggerCount = 0
 
-    SmartDashboard.putNumber(
-      "Up. Elevator Switch Trigger Count", ElevatorSubsystem.upperElevatorSwitchTriggerCount
-    )
+    self.upperSwitchTriggerCountTelemetry.set(self.upperSwitchTriggerCount)
+
+  def onUpperSwitchEdge(self, edge: Edge):
+    """
+    Counts the carriage passing the upper switch, and stops it on its last hit going up.
+    Called from the edge capture thread.
+    """
+    if not edge.rising:
+      return
+
+    # The encoder tells which way the carriage was moving, the last output only if it was stopped
+    direction = edge.velocity if edge.velocity != 0 else self.elevatorMotor.get()
+    if direction == 0:
+      return
+
+    with self.switchLock:
+      self.upperSwitchTriggerCount += 1 if direction > 0 else -1
+      if direction > 0 and (
+        self.upperSwitchTriggerCount >= ElevatorSubsystemConstants.kUpperSwitchStopCount
+      ):
+        self.elevatorMotor.stopMotor()
+        self.softStopRequested = True
+
+  def onLowerSwitchEdge(self, edge: Edge):
+    """
+    Stops the carriage when it reaches the bottom and zeroes the encoder there.
+    Called from the edge capture thread.
+    """
+    if not edge.rising:
+      return
+
+    # The encoder tells which way the carriage was moving, the last output only if it was stopped
+    direction = edge.velocity if edge.velocity != 0 else self.elevatorMotor.get()
+
+    with self.switchLock:
+      if direction < 0:
+        self.elevatorMotor.stopMotor()
+        self.softStopRequested = True
+      self.zeroPosition()
+      self.upperSwitchTriggerCount = 0
 
   def zeroPosition(self):
     self.elevatorEncoder.setPosition(0)
@@ -95,21 +161,82 @@ class ElevatorSubsystem(Subsystem):
     Raises or Lowers the elevator at the speed determined by manua user input.
 
     ::param speed: User input speed from controller. (-1 to 1)"""
-    deliveredSpeed = speed * ElevatorSubsystemConstants.kManualElevatorSpeed
+    deliveredSpeed = speed * ElevatorSubsystemConstants.kManualElevatorSpeed * self.speedScale
+    # Already at the bottom: only allow going up
+    if self.lowerSwitchPressed and deliveredSpeed < 0:
+      deliveredSpeed = 0
+
+    self.elevatorOutput.set(deliveredSpeed)
 
-    self.elevatorMotor.set(deliveredSpeed)
+  def getPosition(self) -> float:
+    """
+    Returns the elevator's position in motor rotations.
+    """
+    return self.elevatorEncoder.getPosition()
 
-  def goToPosition(self, position: float):
+  def getVelocity(self) -> float:
+    """
+    Returns the elevator's velocity in motor rotations per second.
     """
-    Raises or Lowers the elevator to the provided posistion.
+    return self.elevatorEncoder.getVelocity() / 60
+
+  def followSetpoint(self, position: float, velocity: float, nextVelocity: float):
+    """
+    Sends one setpoint of a motion profile to the Spark's position controller.
+
+    :param position: Position to be at by the next loop (motor rotations)
+    :param velocity: Velocity of the previous setpoint (rotations per second)
+    :param nextVelocity: Velocity to be at by the next loop (rotations per second)
+    """
+    # Already at the bottom: don't drive into the switch
+    if self.lowerSwitchPressed and nextVelocity <= 0 and position <= self.getPosition():
+      self.stop()
+      return
 
-    ::param position: Desired Position"""
-    self.elevatorClosedLoopController.setReference(
+    self.elevatorOutput.setReference(
       position,
-      SparkMax.ControlType.kMAXMotionPositionControl,
-      arbFeedforward=self.feedForward.calculate(self.elevatorEncoder.getVelocity()),
+      SparkMax.ControlType.kPosition,
+      arbFeedforward=self.feedForward.calculate(velocity, nextVelocity),
       arbFFUnits=SparkClosedLoopController.ArbFFUnits.kVoltage,
     )
 
+  def setVoltage(self, volts: float):
+    """
+    Drives the elevator open loop, for characterization.
+    """
+    # Already at the bottom: only allow going up
+    if self.lowerSwitchPressed and volts < 0:
+      volts = 0
+
+    self.elevatorOutput.setReference(volts, SparkMax.ControlType.kVoltage)
+
+  def sysId(self) -> SysIdMechanism:
+    """
+    Characterizes the elevator (motor rotations), stopping each test before the end of travel.
+    """
+    return SysIdMechanism(
+      "elevator",
+      self,
+      self.setVoltage,
+      [SysIdMotor("elevator", self.elevatorMotor, self.getPosition, self.getVelocity)],
+      SysIdRoutine.Config(
+        SysIdConstants.kElevatorRampRate,
+        SysIdConstants.kElevatorStepVoltage,
+        SysIdConstants.kElevatorTimeout,
+      ),
+      angular=True,
+      limit=lambda direction: (
+        self.getPosition() >= SysIdConstants.kElevatorForwardLimit
+        if direction == SysIdRoutine.Direction.kForward
+        else self.getPosition() <= SysIdConstants.kElevatorReverseLimit
+      ),
+    )
+
+  def setSpeedScale(self, scale: float):
+    """
+    Scales manual control speed down (0 - 1), see `PowerManager`.
+    """
+    self.speedScale = scale
+
   def stop(self):
-    self.elevatorMotor.set(0)
+    self.elevatorOutput.set(0)
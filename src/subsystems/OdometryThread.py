@@ -0,0 +1,67 @@
+import collections
+import threading
+import typing
+
+from wpilib import Notifier
+
+from constants import DriveSubsystemConstants
+
+T = typing.TypeVar("T")
+
+
+class OdometryThread(typing.Generic[T]):
+  """
+  Reads odometry samples in the background at a higher rate than the robot loop.
+
+  Every sample is pushed into a fixed size ring buffer protected by a lock. The robot loop calls
+  `drain()` once per cycle and replays the samples into the pose estimator with their own
+  timestamps. When the loop falls behind, the oldest samples are dropped and counted.
+  """
+
+  def __init__(
+    self,
+    read: typing.Callable[[], T],
+    frequency: float = DriveSubsystemConstants.kOdometryFrequency,
+    bufferSize: int = DriveSubsystemConstants.kOdometryBufferSize,
+  ):
+    """
+    :param read: Reads a single sample. Called from the notifier thread.
+    :param frequency: Samples per second.
+    :param bufferSize: Maximum number of samples kept between two calls to `drain()`.
+    """
+    self.read = read
+    self.period = 1 / frequency
+
+    self.lock = threading.Lock()
+    self.buffer: collections.deque[T] = collections.deque(maxlen=bufferSize)
+    self.droppedSamples = 0
+
+    self.notifier = Notifier(self.sample)
+    self.notifier.setName("Odometry")
+
+  def start(self):
+    self.notifier.startPeriodic(self.period)
+
+  def stop(self):
+    self.notifier.stop()
+
+  def sample(self):
+    """
+    Reads one sample and adds it to the buffer. Called by the notifier.
+    """
+    # Read outside of the lock so the robot loop never waits on CAN
+    sample = self.read()
+
+    with self.lock:
+      if len(self.buffer) == self.buffer.maxlen:
+        self.droppedSamples += 1
+      self.buffer.append(sample)
+
+  def drain(self) -> list[T]:
+    """
+    Removes and returns every sample taken since the last call, oldest first.
+    """
+    with self.lock:
+      samples = list(self.buffer)
+      self.buffer.clear()
+    return samples
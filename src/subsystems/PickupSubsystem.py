@@ -1,11 +1,10 @@
 from commands2 import Subsystem
-from rev import (
-  SparkBase,
-  SparkMax,
-)
+from rev import SparkMax
 
 from config import Config
 from constants import PickupSubsystemConstants
+from utils.sparkconfig import SparkConfigManager
+from utils.sparkoutput import SparkOutput
 
 
 class PickupSubsystem(Subsystem):
@@ -23,17 +22,17 @@ class PickupSubsystem(Subsystem):
     self.upperPickupMotor.getEncoder()
     self.lowerPickupMotor.getEncoder()
 
+    ### Outputs ### (Only send setpoints that changed)
+    self.upperPickupOutput = SparkOutput(self.upperPickupMotor)
+    self.lowerPickupOutput = SparkOutput(self.lowerPickupMotor)
+
+    # Lowered by the power manager when the battery sags
+    self.speedScale = 1.0
+
     ### Apply Configs ###
-    self.upperPickupMotor.configure(
-      Config.PickupSubsystem.upperMotorConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
-    self.lowerPickupMotor.configure(
-      Config.PickupSubsystem.lowerMotorConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
+    sparkConfigManager = SparkConfigManager.getInstance()
+    sparkConfigManager.configure(self.upperPickupMotor, Config.PickupSubsystem.upperMotorConfig)
+    sparkConfigManager.configure(self.lowerPickupMotor, Config.PickupSubsystem.lowerMotorConfig)
 
   def manualDrive(self, speed: float):
     """
@@ -41,11 +40,17 @@ class PickupSubsystem(Subsystem):
 
     ::param speed: User input speed. (-1 - 1)
     """
-    deliveredSpeed = speed * PickupSubsystemConstants.kManualPickupSpeed
+    deliveredSpeed = speed * PickupSubsystemConstants.kManualPickupSpeed * self.speedScale
 
-    self.upperPickupMotor.set(deliveredSpeed)
-    self.lowerPickupMotor.set(deliveredSpeed)
+    self.upperPickupOutput.set(deliveredSpeed)
+    self.lowerPickupOutput.set(deliveredSpeed)
+
+  def setSpeedScale(self, scale: float):
+    """
+    Scales manual control speed down (0 - 1), see `PowerManager`.
+    """
+    self.speedScale = scale
 
   def stop(self):
-    self.upperPickupMotor.set(0)
-    self.lowerPickupMotor.set(0)
+    self.upperPickupOutput.set(0)
+    self.lowerPickupOutput.set(0)
@@ -1,13 +1,11 @@
-from rev import (
-  SparkBase,
-  SparkLowLevel,
-  SparkMax,
-)
+from rev import SparkLowLevel, SparkMax
 from wpimath.geometry import Rotation2d
 from wpimath.kinematics import SwerveModulePosition, SwerveModuleState
-from wpimath.units import radiansToDegrees
 
 from config import Config
+from subsystems.DriveSnapshot import SwerveModuleSample
+from utils.sparkconfig import SparkConfigManager
+from utils.sparkoutput import SparkOutput
 
 
 class SwerveModule:
@@ -24,6 +22,7 @@ class SwerveModule:
     :param chassisAngularOffset: The angle of the module relative to the chassis (radians).
     """
     self.chassisAngularOffset = chassisAngularOffset
+    self.chassisAngularOffsetRotation = Rotation2d(chassisAngularOffset)
     self.desiredState = SwerveModuleState(0.0, Rotation2d())
 
     ### Motors and Configuration ###
@@ -36,26 +35,39 @@ class SwerveModule:
     self.driveEncorder = self.driveMotor.getEncoder()
     self.turnEncoder = self.turnMotor.getAbsoluteEncoder()
 
-    ### Closed Loop Controllers ### (Drive Motor can only get the CLC output, not the CLC object)
-    self.driveClosedLoopController = self.driveMotor.getClosedLoopController()
-    self.turnClosedLoopController = self.turnMotor.getClosedLoopController()
+    ### Closed Loop Outputs ### (Only send setpoints that changed)
+    self.driveOutput = SparkOutput(self.driveMotor)
+    self.turnOutput = SparkOutput(self.turnMotor)
 
-    ### Apply Motor Controller Configs ###
-    self.driveMotor.configure(
-      Config.MAXSwerveModule.driveConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
+    ### Apply Motor Controller Configs ### (Finished in DriveSubsystem, with the other modules)
+    sparkConfigManager = SparkConfigManager.getInstance()
+    sparkConfigManager.configure(self.driveMotor, Config.MAXSwerveModule.driveConfig)
 
-    self.turnMotor.configure(
-      Config.MAXSwerveModule.turnConfig,
-      SparkBase.ResetMode.kResetSafeParameters,
-      SparkBase.PersistMode.kPersistParameters,
-    )
+    sparkConfigManager.configure(self.turnMotor, Config.MAXSwerveModule.turnConfig)
+
+    # Raw (chassis offset not removed) turning angle from the last sample. Used to optimize
+    # setpoints without reading the absolute encoder a second time in the same cycle. Not read
+    # here, the encoder's conversion factor may not be configured yet.
+    self.turnAngle = Rotation2d()
 
-    self.desiredState.angle = Rotation2d(self.turnEncoder.getPosition())
+    self.desiredState.angle = self.turnAngle
     self.resetDriveEncoder()
 
+  def sample(self) -> SwerveModuleSample:
+    """
+    Reads the drive and turning encoders exactly once and returns the module's position and state.
+
+    Prefer this over calling `getPosition()` and `getState()` separately, which read the turning
+    encoder twice and may return angles from different CAN frames.
+    """
+    self.turnAngle = Rotation2d(self.turnEncoder.getPosition())
+    angle = Rotation2d(self.turnAngle.radians() - self.chassisAngularOffset)
+
+    return SwerveModuleSample(
+      SwerveModulePosition(self.driveEncorder.getPosition(), angle),
+      SwerveModuleState(self.driveEncorder.getVelocity(), angle),
+    )
+
   def getState(self) -> SwerveModuleState:
     """Returns the current state of the module."""
 
@@ -79,16 +91,46 @@ class SwerveModule:
     """
     correctDesiredState = SwerveModuleState()
     correctDesiredState.speed = desiredState.speed
-    correctDesiredState.angle = desiredState.angle.__add__(Rotation2d.fromDegrees(radiansToDegrees(self.chassisAngularOffset)))
+    correctDesiredState.angle = desiredState.angle + self.chassisAngularOffsetRotation
 
     # Optimize the reference state to avoid spinning further than 90 degrees.
-    correctDesiredState.optimize(Rotation2d(self.turnEncoder.getPosition()))
+    correctDesiredState.optimize(self.turnAngle)
 
     # Command driving and turning motors towards their respective setpoints.
-    self.driveClosedLoopController.setReference(correctDesiredState.speed, SparkLowLevel.ControlType.kVelocity)
-    self.turnClosedLoopController.setReference(correctDesiredState.angle.radians(), SparkLowLevel.ControlType.kPosition)
+    self.driveOutput.setReference(correctDesiredState.speed, SparkLowLevel.ControlType.kVelocity)
+    self.turnOutput.setReference(
+      correctDesiredState.angle.radians(), SparkLowLevel.ControlType.kPosition
+    )
 
     self.desiredState = desiredState
 
+  def setSetpoint(self, speed: float, angle: float) -> None:
+    """Sends an already optimized setpoint straight to the motor controllers.
+
+    Used by `DriveSubsystem` with the output of `SwerveKinematics`, `desiredState` isn't updated.
+
+    :param speed: Driving speed (m/s).
+    :param angle: Turning angle (radians), with the chassis angular offset already added.
+    """
+    self.driveOutput.setReference(speed, SparkLowLevel.ControlType.kVelocity)
+    self.turnOutput.setReference(angle, SparkLowLevel.ControlType.kPosition)
+
+  def setDriveVoltage(self, volts: float, angle: float) -> None:
+    """Drives the wheel open loop, for characterization.
+
+    :param volts: Driving motor voltage.
+    :param angle: Turning angle (radians), with the chassis angular offset already added.
+    """
+    self.driveOutput.setReference(volts, SparkLowLevel.ControlType.kVoltage)
+    self.turnOutput.setReference(angle, SparkLowLevel.ControlType.kPosition)
+
+  def setTurnVoltage(self, volts: float) -> None:
+    """Turns the module open loop with the wheel stopped, for characterization.
+
+    :param volts: Turning motor voltage.
+    """
+    self.driveOutput.setReference(0, SparkLowLevel.ControlType.kVoltage)
+    self.turnOutput.setReference(volts, SparkLowLevel.ControlType.kVoltage)
+
   def resetDriveEncoder(self) -> None:
     self.driveEncorder.setPosition(0)
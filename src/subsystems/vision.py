@@ -1,39 +1,177 @@
+import bisect
+import collections
 import math
+import typing
 
-from ntcore import NetworkTable, NetworkTableInstance
+from ntcore import NetworkTable, NetworkTableInstance, PubSubOptions
+from wpilib import Timer
 from wpimath.geometry import Pose2d, Rotation2d, Translation2d
 
+from constants import FieldConstants, VisionConstants
+from utils.inputlog import InputLog
+
+
+class VisionMeasurement(typing.NamedTuple):
+  """
+  A single Limelight frame that passed every filter, ready to be given to the pose estimator.
+  """
+
+  pose: Pose2d
+  timestamp: float
+  """FPGA timestamp (seconds) at which the frame was captured (latency already removed)."""
+  stdDevs: tuple[float, float, float]
+  tagCount: int
+  averageTagDistance: float
+
+
+class VisionFrame(typing.NamedTuple):
+  """
+  A raw botpose array, like the ones returned by `readQueue()`.
+  """
+
+  time: int
+  """Time (microseconds) at which the array was received."""
+  value: list[float]
+
 
 class LimelightHelpers:
-  def __init__(self):
-    self.ll: NetworkTable = NetworkTableInstance.getDefault().getTable("limelight")
+  # Indices in the botpose array (https://docs.limelightvision.io/docs/docs-limelight/apis/complete-networktables-api#apriltag-and-3d-data)
+  kLatencyIndex = 6
+  kTagCountIndex = 7
+  kAverageTagDistanceIndex = 9
+  kMinimumLength = 11
+
+  def __init__(self, tableName: str = VisionConstants.kCameraNames[0]):
+    """
+    :param tableName: NetworkTables name of the Limelight, as set in its web interface.
+    """
+    self.tableName = tableName
+    self.ll: NetworkTable = NetworkTableInstance.getDefault().getTable(tableName)
     self.poseTopic = self.ll.getDoubleArrayTopic("botpose_orb_wpiblue")
 
+    # Queue every frame received since the last loop instead of only looking at the latest value
+    self.poseSubscriber = self.poseTopic.subscribe(
+      [], PubSubOptions(pollStorage=VisionConstants.kMaxFramesPerLoop)
+    )
+    self.lastTimestamp = 0.0
+
+    # MegaTag2 solves with the robot's heading, which has to be sent to the camera every loop
+    self.orientationPublisher = self.ll.getDoubleArrayTopic("robot_orientation_set").publish()
+    self.orientationTimes: collections.deque[float] = collections.deque(
+      maxlen=VisionConstants.kOrientationHistoryLength
+    )
+    self.orientationRoundTrip = 0.0
+
+    self.acceptedFrames = 0
+    self.rejectedFrames = 0
+
   @staticmethod
-  def toPose2d(inData: list[float], timestamp: float) -> tuple[Pose2d, float]:
-    """
-    https://github.com/LimelightVision/limelight-examples/blob/28cb4c8f9b68cea62bef010ab793960f8d2b7a53/java-wpilib/swerve-aim-and-range/src/main/java/frc/robot/LimelightHelpers.java#L509
-
-    public static Pose2d toPose2D(double[] inData){
-      if(inData.length < 6)
-      {
-          //System.err.println("Bad LL 2D Pose Data!");
-          return new Pose2d();
-      }
-      Translation2d tran2d = new Translation2d(inData[0], inData[1]);
-      Rotation2d r2d = new Rotation2d(Units.degreesToRadians(inData[5]));
-      return new Pose2d(tran2d, r2d);
-    }
-    """
-    if len(inData) < 7:
-      return (Pose2d(), 0.0)
-    tran2d = Translation2d(inData[0], inData[1])
-    r2d = Rotation2d(math.radians(inData[5]))
-    totalLatency: float = inData[6]
-    adjustedTimestamp = (timestamp / 1000000.0) - (totalLatency / 1000.0)
-    return (Pose2d(tran2d, r2d), adjustedTimestamp)
-
-  def getLLPose(self) -> tuple[Pose2d, float]:
-    data = self.poseTopic.getEntry([]).getAtomic()
-    pose = LimelightHelpers.toPose2d(data.value, data.time)
-    return pose
+  def toVisionMeasurement(
+    inData: list[float], timestamp: float, currentPose: typing.Optional[Pose2d]
+  ) -> typing.Optional[VisionMeasurement]:
+    """
+    Converts a botpose array to a vision measurement. Returns None if the frame is invalid, has
+    no tags, is outside the field or is too far away from the current pose estimate.
+
+    :param inData: botpose array published by the Limelight.
+    :param timestamp: Time (microseconds) at which the array was received.
+    :param currentPose: Current pose estimate, used to reject large jumps. None accepts any jump.
+    """
+    if len(inData) < LimelightHelpers.kMinimumLength:
+      return None
+
+    tagCount = int(inData[LimelightHelpers.kTagCountIndex])
+    if tagCount < 1:
+      return None
+
+    x, y = inData[0], inData[1]
+    margin = VisionConstants.kFieldMargin
+    if not (
+      -margin <= x <= FieldConstants.kFieldLength + margin
+      and -margin <= y <= FieldConstants.kFieldWidth + margin
+    ):
+      return None
+
+    # Large jumps are only trusted when they are seen by more than one tag
+    if currentPose is not None and tagCount < VisionConstants.kMinTagsForPoseJump:
+      jump = math.hypot(x - currentPose.X(), y - currentPose.Y())
+      if jump > VisionConstants.kMaxPoseJump:
+        return None
+
+    # Trust measurements less the further away the tags are, and more the more tags are seen
+    averageTagDistance = inData[LimelightHelpers.kAverageTagDistanceIndex]
+    xyStdDev = max(
+      VisionConstants.kMinXYStdDev,
+      VisionConstants.kXYStdDevCoefficient * averageTagDistance**2 / tagCount,
+    )
+
+    return VisionMeasurement(
+      Pose2d(Translation2d(x, y), Rotation2d(math.radians(inData[5]))),
+      (timestamp / 1000000.0) - (inData[LimelightHelpers.kLatencyIndex] / 1000.0),
+      (xyStdDev, xyStdDev, VisionConstants.kThetaStdDev),
+      tagCount,
+      averageTagDistance,
+    )
+
+  def setRobotOrientation(self, yaw: Rotation2d, yawRate: float):
+    """
+    Sends the robot's heading to the camera for MegaTag2. Call `flush()` once every camera's
+    orientation is set, so the next frame isn't solved with the heading of the previous loop.
+
+    :param yaw: Field relative heading, counterclockwise positive.
+    :param yawRate: Counterclockwise rate of the heading (radians per second).
+    """
+    # [yaw, yaw rate, pitch, pitch rate, roll, roll rate], in degrees
+    self.orientationPublisher.set([yaw.degrees(), math.degrees(yawRate), 0, 0, 0, 0])
+    self.orientationTimes.append(Timer.getFPGATimestamp())
+
+  @staticmethod
+  def flush():
+    """
+    Sends every value set since the last flush right away, instead of with the next periodic
+    NetworkTables update (up to 100 ms later).
+    """
+    NetworkTableInstance.getDefault().flush()
+
+  def getOrientationRoundTrip(self, measurement: VisionMeasurement, receivedTime: float) -> float:
+    """
+    Time (seconds) from sending the orientation the frame was solved with to receiving the frame,
+    or 0 if no orientation was sent before the frame was captured.
+
+    :param receivedTime: Time (microseconds) at which the frame was received.
+    """
+    # The camera solves with the last orientation it received before capturing the frame
+    index = bisect.bisect_right(self.orientationTimes, measurement.timestamp)
+    if index == 0:
+      return 0.0
+    return receivedTime / 1000000.0 - self.orientationTimes[index - 1]
+
+  def getVisionMeasurements(self, currentPose: typing.Optional[Pose2d]) -> list[VisionMeasurement]:
+    """
+    Returns every new, valid frame received since the last call, oldest first. Frames that were
+    already returned, or are older than one that was, are dropped.
+
+    :param currentPose: Current pose estimate, used to reject large jumps. None accepts any jump.
+    """
+    measurements = []
+
+    for frame in self.readFrames():
+      measurement = LimelightHelpers.toVisionMeasurement(frame.value, frame.time, currentPose)
+      if measurement is None or measurement.timestamp <= self.lastTimestamp:
+        self.rejectedFrames += 1
+        continue
+
+      self.lastTimestamp = measurement.timestamp
+      self.orientationRoundTrip = self.getOrientationRoundTrip(measurement, frame.time)
+      self.acceptedFrames += 1
+      measurements.append(measurement)
+
+    return measurements
+
+  def readFrames(self) -> typing.Sequence[VisionFrame]:
+    """
+    Returns every frame received since the last call and logs them.
+    """
+    frames = self.poseSubscriber.readQueue()
+    InputLog.getInstance().logVisionFrames(self.tableName, frames)
+    return frames
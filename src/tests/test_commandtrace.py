@@ -0,0 +1,108 @@
+import json
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from commands2 import CommandScheduler, Subsystem, cmd
+
+from utils.commandtrace import CommandTracer
+
+
+class CommandTracerTestCase(TestCase):
+  def setUp(self):
+    # A scheduler of its own, since the callbacks can't be removed once registered
+    CommandScheduler.resetInstance()
+    self.scheduler = CommandScheduler.getInstance()
+    self.tracer = CommandTracer(capacity=64)
+    self.tracer.install(self.scheduler)
+
+  def tearDown(self):
+    self.tracer.enabled = False
+    CommandScheduler.resetInstance()
+
+  def spans(self) -> list[tuple[int, str, float, float, str]]:
+    snapshot = self.tracer.snapshot()
+    return [
+      (
+        kind,
+        snapshot.names[nameId],
+        start,
+        duration,
+        snapshot.names[causeId] if causeId >= 0 else "",
+      )
+      for kind, nameId, start, duration, causeId in snapshot.spans()
+    ]
+
+  def test_lifetimes(self):
+    subsystem = Subsystem()
+    finishing = cmd.runOnce(lambda: None).ignoringDisable(True).withName("Finishing")
+    interrupted = cmd.idle(subsystem).ignoringDisable(True).withName("Interrupted")
+    interrupting = cmd.idle(subsystem).ignoringDisable(True).withName("Interrupting")
+
+    finishing.schedule()
+    interrupted.schedule()
+    self.scheduler.run()
+    self.scheduler.run()
+    interrupting.schedule()
+    self.scheduler.run()
+
+    spans = self.spans()
+    kinds = [(kind, name) for kind, name, *_ in spans]
+    self.assertEqual(kinds.count((CommandTracer.kSchedulerRun, "CommandScheduler.run")), 3)
+    self.assertIn((CommandTracer.kFinished, "Finishing"), kinds)
+    self.assertEqual(kinds.count((CommandTracer.kExecute, "Interrupted")), 2)
+    self.assertEqual(kinds.count((CommandTracer.kExecute, "Interrupting")), 1)
+
+    [(_, _, start, duration, interruptor)] = [
+      span for span in spans if span[0] == CommandTracer.kInterrupted
+    ]
+    self.assertEqual(interruptor, "Interrupting")
+    # Every execute() of the interrupted command is within its lifetime
+    for kind, name, executeStart, executeDuration, _ in spans:
+      if kind == CommandTracer.kExecute and name == "Interrupted":
+        self.assertGreaterEqual(executeStart, start)
+        self.assertLessEqual(executeStart + executeDuration, start + duration)
+
+    trace = json.loads(json.dumps(self.tracer.toChromeTrace()))
+    names = {
+      event["args"]["name"] for event in trace["traceEvents"] if event["name"].endswith("_name")
+    }
+    self.assertTrue({"Robot", "CommandScheduler.run", "Interrupted", "Interrupting"} <= names)
+    self.assertIn(
+      "Interrupted.execute()",
+      {event["name"] for event in trace["traceEvents"] if event["ph"] == "X"},
+    )
+
+  def test_ring_buffer(self):
+    self.tracer.enabled = False
+    self.scheduler.run()
+    self.assertEqual(self.tracer.count, 0)
+
+    self.tracer.enabled = True
+    for _ in range(100):
+      self.scheduler.run()
+
+    spans = self.spans()
+    self.assertEqual(self.tracer.count, 100)
+    self.assertEqual(len(spans), 64)
+    # Oldest first, the first 36 runs were overwritten
+    starts = [start for _, _, start, _, _ in spans]
+    self.assertEqual(starts, sorted(starts))
+
+  def test_keeps_the_newest_traces(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    folder = pathlib.Path(directory.name)
+    for age in range(5):
+      old = folder / f"old-{age}.json"
+      old.write_text("{}")
+      os.utime(old, (1000 - age, 1000 - age))
+
+    self.scheduler.run()
+    self.tracer.exportAsync(folder / "new.json", keep=3).join()
+
+    self.assertEqual(
+      sorted(trace.name for trace in folder.iterdir()), ["new.json", "old-0.json", "old-1.json"]
+    )
+    self.assertIn("traceEvents", json.loads((folder / "new.json").read_text()))
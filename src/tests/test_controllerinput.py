@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from commands2 import CommandScheduler, Subsystem, cmd
+from commands2.button import CommandXboxController
+from wpilib.simulation import DriverStationSim, XboxControllerSim
+
+from utils.controllerinput import AxisShaper, ControllerInput
+
+# Not used by the robot
+kDriverPort = 4
+kOperatorPort = 5
+
+
+class AxisShaperTestCase(TestCase):
+  def test_deadband_and_expo(self):
+    shaper = AxisShaper(0.1, expo=0.5)
+    self.assertEqual(shaper.shape(0.05), 0)
+    self.assertEqual(shaper.shape(1), 1)
+    self.assertEqual(shaper.shape(-1), -1)
+    # Halfway out of the deadband: half linear, half cubic
+    self.assertAlmostEqual(shaper.shape(0.55), 0.5 * 0.5 + 0.5 * 0.125)
+
+  def test_slew_rate_limit(self):
+    shaper = AxisShaper(0.0, slewRate=5, period=0.02)
+    self.assertAlmostEqual(shaper.shape(1), 0.1)
+    self.assertAlmostEqual(shaper.shape(1), 0.2)
+    self.assertAlmostEqual(shaper.shape(-1), 0.1)
+    # Releasing the stick stops right away
+    self.assertEqual(shaper.shape(0), 0)
+
+    # Limited every 20 ms loop by default
+    self.assertAlmostEqual(AxisShaper(0.0, slewRate=5).shape(1), 0.1)
+
+
+class ControllerInputTestCase(TestCase):
+  def setUp(self):
+    self.scheduler = CommandScheduler.getInstance()
+    self.driver = XboxControllerSim(kDriverPort)
+    self.operator = XboxControllerSim(kOperatorPort)
+    self.input = ControllerInput(
+      CommandXboxController(kDriverPort), CommandXboxController(kOperatorPort)
+    )
+
+    self.subsystem = Subsystem()
+    self.outputs: list[float] = []
+    self.subsystem.setDefaultCommand(cmd.run(lambda: self.outputs.append(0.0), self.subsystem))
+    self.scheduled = 0
+    self.input.elevatorActive.whileTrue(
+      cmd.startRun(
+        self.countSchedule,
+        lambda: self.outputs.append(self.input.snapshot.elevator),
+        self.subsystem,
+      )
+    )
+
+    DriverStationSim.setAutonomous(False)
+    DriverStationSim.setEnabled(True)
+    DriverStationSim.notifyNewData()
+
+  def countSchedule(self):
+    self.scheduled += 1
+
+  def tearDown(self):
+    self.scheduler.unregisterAllSubsystems()
+    self.scheduler.getActiveButtonLoop().clear()
+    DriverStationSim.setEnabled(False)
+    DriverStationSim.notifyNewData()
+
+  def loop(self, leftY: float):
+    self.operator.setLeftY(leftY)
+    self.operator.notifyNewData()
+    self.input.update()
+    self.scheduler.run()
+
+  def test_manual_control_is_scheduled_on_edges(self):
+    for leftY in (0.0, 0.02, -1.0, -1.0, -0.5, 0.01, 0.0):
+      self.loop(leftY)
+
+    # Once when the stick left the deadband, not every loop
+    self.assertEqual(self.scheduled, 1)
+    # The default command only runs from the loop after it is scheduled
+    self.assertEqual(self.outputs[:3], [0.0, 1.0, 1.0])
+    halfway = (0.5 - 0.05) / 0.95
+    self.assertAlmostEqual(self.outputs[3], 0.5 * halfway + 0.5 * halfway**3)
+    self.assertEqual(self.outputs[4:], [0.0])
@@ -0,0 +1,120 @@
+import math
+from unittest import TestCase
+
+from commands2 import Subsystem
+from wpilib import Timer
+from wpilib.simulation import stepTimingAsync
+from wpimath.geometry import Pose2d, Rotation2d, Translation2d, Twist2d
+from wpimath.kinematics import ChassisSpeeds
+
+from commands.DriveToPoseCommand import DriveToPoseCommand
+from constants import DriveToPoseConstants
+
+kPeriod = 0.02
+kGoal = Pose2d(4.0, 4.0, Rotation2d.fromDegrees(60))
+
+
+class SimulatedDrive(Subsystem):
+  """
+  The parts of `DriveSubsystem` used by the command, on a robot that reaches the speeds it is sent
+  a loop later.
+  """
+
+  def __init__(self, pose: Pose2d):
+    super().__init__()
+    self.pose = pose
+    self.speeds = ChassisSpeeds()
+    self.nextSpeeds = ChassisSpeeds()
+    self.moving = True
+    self.path: list[Translation2d] = []
+
+  def getPose(self) -> Pose2d:
+    return self.pose
+
+  def getRobotRelativeSpeeds(self) -> ChassisSpeeds:
+    return self.speeds
+
+  def getSnapshot(self):
+    return SimulatedSnapshot(Timer.getFPGATimestamp(), self.speeds)
+
+  def driveRobotRelative(self, speeds: ChassisSpeeds):
+    self.nextSpeeds = speeds
+
+  def update(self):
+    if self.moving:
+      self.pose = self.pose.exp(
+        Twist2d(self.speeds.vx * kPeriod, self.speeds.vy * kPeriod, self.speeds.omega * kPeriod)
+      )
+      self.speeds = self.nextSpeeds
+    self.path.append(self.pose.translation())
+
+
+class SimulatedSnapshot:
+  def __init__(self, timestamp: float, speeds: ChassisSpeeds):
+    self.timestamp = timestamp
+    self.robotRelativeSpeeds = speeds
+
+
+class DriveToPoseCommandTestCase(TestCase):
+  def runUntilFinished(self, drive: SimulatedDrive, command: DriveToPoseCommand) -> float:
+    command.initialize()
+    elapsed = 0.0
+    while not command.isFinished():
+      self.assertLess(elapsed, 10.0)
+      command.execute()
+      stepTimingAsync(kPeriod)
+      drive.update()
+      elapsed += kPeriod
+    command.end(False)
+    return elapsed
+
+  def test_aligns_in_a_straight_line(self):
+    start = Pose2d(2.5, 3.0, Rotation2d.fromDegrees(-30))
+    drive = SimulatedDrive(start)
+    command = DriveToPoseCommand(drive, lambda: kGoal)
+
+    self.assertLess(self.runUntilFinished(drive, command), 3.0)
+    self.assertTrue(command.aligned)
+    self.assertLessEqual(
+      drive.pose.translation().distance(kGoal.translation()),
+      DriveToPoseConstants.kTranslationTolerance,
+    )
+    self.assertLessEqual(
+      abs((drive.pose.rotation() - kGoal.rotation()).radians()),
+      DriveToPoseConstants.kHeadingTolerance,
+    )
+
+    # Both axes arrive together: the robot stays close to the line from the start to the goal
+    direction = kGoal.translation() - start.translation()
+    for translation in drive.path:
+      offset = translation - start.translation()
+      distance = abs(offset.X() * direction.Y() - offset.Y() * direction.X()) / direction.norm()
+      self.assertLess(distance, 0.05)
+
+  def test_turns_the_short_way(self):
+    drive = SimulatedDrive(Pose2d(kGoal.translation(), Rotation2d.fromDegrees(-150)))
+    command = DriveToPoseCommand(drive, lambda: kGoal)
+    command.initialize()
+    command.execute()
+    # 210 degrees counterclockwise, or 150 clockwise
+    self.assertLess(drive.nextSpeeds.omega, 0)
+
+  def test_takes_over_the_robot_speed_in_the_field_frame(self):
+    # Driving forward while facing the goal's +Y
+    drive = SimulatedDrive(Pose2d(4.0, 2.0, Rotation2d.fromDegrees(90)))
+    drive.speeds = ChassisSpeeds(1.0, 0.0, 0.0)
+    command = DriveToPoseCommand(drive, lambda: kGoal)
+    command.initialize()
+
+    self.assertAlmostEqual(command.xController.getSetpoint().velocity, 0.0)
+    self.assertAlmostEqual(command.yController.getSetpoint().velocity, 1.0)
+
+  def test_times_out(self):
+    drive = SimulatedDrive(Pose2d())
+    drive.moving = False
+    command = DriveToPoseCommand(drive, lambda: kGoal, timeout=0.5)
+
+    self.assertAlmostEqual(self.runUntilFinished(drive, command), 0.5, delta=kPeriod * 1.5)
+    self.assertFalse(command.aligned)
+    self.assertEqual(drive.nextSpeeds, ChassisSpeeds())
+    self.assertTrue(math.isclose(drive.pose.X(), 0))
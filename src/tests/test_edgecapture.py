@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest import TestCase
+
+from wpilib import DigitalInput, SynchronousInterrupt
+from wpilib.simulation import DIOSim, isTimingPaused, pauseTiming, resumeTiming
+
+from subsystems.EdgeCapture import Edge, EdgeCapture
+
+# Not used by the robot
+kChannel = 6
+
+
+class EdgeCaptureTestCase(TestCase):
+  def setUp(self):
+    # The test harness resets every HAL handle after each test, so the input can't be shared
+    self.input = DigitalInput(kChannel)
+    self.inputSim = DIOSim(self.input)
+
+    # The test harness pauses simulated time, which would give every edge the same timestamp
+    self.wasPaused = isTimingPaused()
+    resumeTiming()
+    self.inputSim.setValue(False)
+
+    self.position = 0.0
+    self.edges: list[Edge] = []
+    self.threads: set[str] = set()
+    self.capture = EdgeCapture(self.input, lambda: self.position, lambda: 1.0, self.onEdge)
+    self.capture.start()
+
+  def tearDown(self):
+    self.capture.stop()
+    if self.wasPaused:
+      pauseTiming()
+
+  def onEdge(self, edge: Edge):
+    self.threads.add(threading.current_thread().name)
+    self.edges.append(edge)
+
+  def setInput(self, value: bool):
+    # The simulated interrupt only sees edges while the thread is waiting, unlike the FPGA's which
+    # latches them, so give it time to get back to waiting
+    time.sleep(0.05)
+    self.inputSim.setValue(value)
+
+  def waitForEdges(self, count: int, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while len(self.edges) < count and time.monotonic() < deadline:
+      time.sleep(0.005)
+    return len(self.edges) >= count
+
+  def test_captures_both_edges_with_the_encoder(self):
+    self.position = 3.0
+    self.setInput(True)
+    self.assertTrue(self.waitForEdges(1))
+    self.position = 5.0
+    self.setInput(False)
+    self.assertTrue(self.waitForEdges(2))
+
+    rising, falling = self.edges
+    self.assertTrue(rising.rising)
+    self.assertFalse(falling.rising)
+    self.assertLess(rising.timestamp, falling.timestamp)
+    self.assertEqual((rising.position, falling.position), (3.0, 5.0))
+    # The callback runs on the capture thread, not the robot loop
+    self.assertEqual(self.threads, {"Edge Capture"})
+    self.assertEqual(self.capture.drain(), self.edges)
+    self.assertEqual(self.capture.drain(), [])
+
+  def test_short_press_edges_are_in_order(self):
+    self.setInput(True)
+    self.setInput(False)
+    self.setInput(True)
+    self.assertTrue(self.waitForEdges(3))
+    self.capture.stop()
+    self.capture.drain()
+
+    # Both edges reported by a single interrupt: released, then pressed again
+    self.capture.capture(SynchronousInterrupt.WaitResult.kBoth)
+    edges = self.capture.drain()
+    self.assertEqual([edge.rising for edge in edges], [False, True])
+    self.assertLess(edges[0].timestamp, edges[1].timestamp)
+
+  def test_stop_all_stops_running_captures(self):
+    thread = self.capture.thread
+    EdgeCapture.stopAll()
+
+    self.assertFalse(thread.is_alive())
+    self.assertIsNone(self.capture.thread)
+    self.assertEqual(EdgeCapture.active, set())
@@ -0,0 +1,114 @@
+import math
+from unittest import TestCase
+
+from commands2 import Subsystem
+from wpimath.controller import ElevatorFeedforward
+from wpimath.system.plant import DCMotor
+from wpilib.simulation import ElevatorSim
+
+from commands.ElevatorProfileCommand import ElevatorProfileCommand
+from constants import ElevatorSubsystemConstants
+
+kPeriod = 0.02
+# Motor rotations per meter of carriage travel
+kRotationsPerMeter = ElevatorSubsystemConstants.kGearRatio / (
+  2 * math.pi * ElevatorSubsystemConstants.kDrumRadius
+)
+
+
+class SimulatedElevator(Subsystem):
+  """
+  The parts of `ElevatorSubsystem` used by the command, with the Spark's position controller
+  running on an `ElevatorSim`.
+  """
+
+  def __init__(self):
+    super().__init__()
+    self.mechanism = ElevatorSim(
+      DCMotor.NEO(2),
+      ElevatorSubsystemConstants.kGearRatio,
+      ElevatorSubsystemConstants.kCarriageMass,
+      ElevatorSubsystemConstants.kDrumRadius,
+      ElevatorSubsystemConstants.kMinHeight,
+      ElevatorSubsystemConstants.kMaxHeight,
+      True,
+      ElevatorSubsystemConstants.kMinHeight,
+    )
+    self.feedForward = ElevatorFeedforward(
+      ElevatorSubsystemConstants.kS,
+      ElevatorSubsystemConstants.kG,
+      ElevatorSubsystemConstants.kV,
+      ElevatorSubsystemConstants.kA,
+    )
+    self.setpoints: list[tuple[float, float]] = []
+
+  def getPosition(self) -> float:
+    return self.mechanism.getPosition() * kRotationsPerMeter
+
+  def getVelocity(self) -> float:
+    return self.mechanism.getVelocity() * kRotationsPerMeter
+
+  def followSetpoint(self, position: float, velocity: float, nextVelocity: float):
+    self.setpoints.append((position, nextVelocity))
+    error = position - self.getPosition()
+    voltage = ElevatorSubsystemConstants.kP * error * 12 + self.feedForward.calculate(
+      velocity, nextVelocity
+    )
+    self.mechanism.setInputVoltage(max(-12, min(12, voltage)))
+    self.mechanism.update(kPeriod)
+
+
+class ElevatorProfileCommandTestCase(TestCase):
+  def setUp(self):
+    self.elevator = SimulatedElevator()
+    self.command = ElevatorProfileCommand(self.elevator, period=kPeriod)
+
+  def runUntilAtGoal(self, timeout: float = 3.0) -> float:
+    elapsed = 0.0
+    while not self.command.atGoal():
+      self.assertLess(elapsed, timeout)
+      self.command.execute()
+      elapsed += kPeriod
+    return elapsed
+
+  def test_settles_at_each_set_point(self):
+    self.command.initialize()
+    for goal in (
+      ElevatorSubsystemConstants.kMiddleSetPoint,
+      ElevatorSubsystemConstants.kBottomSetPoint,
+      ElevatorSubsystemConstants.kScoreSetPoint,
+    ):
+      self.command.setGoal(goal)
+      self.assertLess(self.runUntilAtGoal(), 1.0)
+      self.assertAlmostEqual(
+        self.elevator.getPosition(), goal, delta=ElevatorSubsystemConstants.kPositionTolerance
+      )
+
+  def test_retargeting_keeps_the_setpoints_smooth(self):
+    self.command.setGoal(ElevatorSubsystemConstants.kMiddleSetPoint)
+    self.command.initialize()
+    for _ in range(5):
+      self.command.execute()
+    self.command.setGoal(ElevatorSubsystemConstants.kScoreSetPoint)
+    self.runUntilAtGoal()
+
+    maxVelocityChange = ElevatorSubsystemConstants.kProfileMaxAcceleration * kPeriod
+    velocities = [0.0] + [velocity for _, velocity in self.elevator.setpoints]
+    for velocity, nextVelocity in zip(velocities, velocities[1:]):
+      self.assertLessEqual(abs(nextVelocity - velocity), maxVelocityChange + 1e-9)
+    self.assertEqual(self.elevator.setpoints[-1][0], ElevatorSubsystemConstants.kScoreSetPoint)
+
+  def test_holds_the_goal_until_interrupted(self):
+    self.command.setGoal(ElevatorSubsystemConstants.kScoreSetPoint)
+    self.command.initialize()
+    self.runUntilAtGoal()
+
+    # A second later, still holding against gravity
+    for _ in range(50):
+      self.command.execute()
+    self.assertFalse(self.command.isFinished())
+    self.assertAlmostEqual(
+      self.elevator.getPosition(),
+      ElevatorSubsystemConstants.kScoreSetPoint,
+      delta=ElevatorSubsystemConstants.kPositionTolerance,
+    )
@@ -0,0 +1,47 @@
+from unittest import TestCase, mock
+
+from rev import SparkMax
+from wpilib.simulation import DIOSim
+
+from constants import ElevatorSubsystemConstants
+from subsystems.EdgeCapture import EdgeCapture
+from subsystems.ElevatorSubsystem import ElevatorSubsystem
+
+# Not used by the robot, so they don't collide with a robot created by another test
+kDevices = {
+  "kLeftElevatorMotorId": 62,
+  "kRightElevatorMotorId": 63,
+  "kUpperSwitchChannel": 2,
+  "kLowerSwitchChannel": 3,
+}
+
+
+class ElevatorSubsystemTestCase(TestCase):
+  def setUp(self):
+    with mock.patch.multiple(ElevatorSubsystemConstants, **kDevices):
+      self.elevator = ElevatorSubsystem()
+    self.addCleanup(EdgeCapture.stopAll)
+    self.lowerSwitch = DIOSim(self.elevator.lowerElevatorSwitch)
+
+  def pressLowerSwitch(self):
+    self.lowerSwitch.setValue(True)
+    self.elevator.periodic()
+    self.assertTrue(self.elevator.lowerSwitchPressed)
+
+  def test_doesnt_drive_down_into_the_lower_switch(self):
+    self.pressLowerSwitch()
+    output = self.elevator.elevatorOutput
+
+    self.elevator.setVoltage(-3.0)
+    self.assertEqual(output.lastValue, 0)
+    self.elevator.followSetpoint(-0.5, -1.0, -1.0)
+    self.assertEqual(output.lastValue, 0)
+
+    self.elevator.setVoltage(3.0)
+    self.assertEqual(
+      (output.lastValue, output.lastControlType), (3.0, SparkMax.ControlType.kVoltage)
+    )
+    self.elevator.followSetpoint(0.5, 1.0, 1.0)
+    self.assertEqual(
+      (output.lastValue, output.lastControlType), (0.5, SparkMax.ControlType.kPosition)
+    )
@@ -0,0 +1,65 @@
+import random
+from unittest import TestCase
+
+from pathplannerlib.util import FlippingUtil
+from wpilib import DriverStation
+from wpimath.geometry import Translation2d
+
+from constants import FieldConstants, FieldTargetConstants
+from utils.fieldtargets import FieldTargets, TargetIndex, TargetKind
+
+
+class FieldTargetsTestCase(TestCase):
+  def setUp(self):
+    self.fieldTargets = FieldTargets()
+
+  def randomPositions(self, seed: int, count: int = 2000):
+    rng = random.Random(seed)
+    for _ in range(count):
+      yield Translation2d(
+        rng.uniform(0, FieldConstants.kFieldLength), rng.uniform(0, FieldConstants.kFieldWidth)
+      )
+
+  def test_matches_a_linear_search(self):
+    for kind in TargetKind:
+      for alliance in (DriverStation.Alliance.kBlue, DriverStation.Alliance.kRed):
+        index = self.fieldTargets.getIndex(kind, alliance)
+        for position in self.randomPositions(kind.value):
+          expected = sorted(
+            index.targets, key=lambda target: target.pose.translation().distance(position)
+          )
+          self.assertEqual(index.nearest(position), expected[0])
+          for k in range(1, index.maxNeighbors + 1):
+            self.assertEqual(index.kNearest(position, k), expected[:k])
+
+  def test_red_targets_are_rotated(self):
+    for kind in TargetKind:
+      blue = self.fieldTargets.getIndex(kind, DriverStation.Alliance.kBlue)
+      red = self.fieldTargets.getIndex(kind, DriverStation.Alliance.kRed)
+      for blueTarget, redTarget in zip(blue.targets, red.targets, strict=True):
+        self.assertEqual(blueTarget.name, redTarget.name)
+        self.assertEqual(FlippingUtil.flipFieldPose(blueTarget.pose), redTarget.pose)
+
+  def test_targets_face_their_tag(self):
+    reef = self.fieldTargets.getIndex(TargetKind.kReef, DriverStation.Alliance.kBlue)
+    self.assertEqual(len(reef.targets), 2 * len(FieldConstants.kReefTags))
+    # In front of the reef face closest to the blue driver station (tag 18), the robot faces +x
+    left, right = reef.kNearest(Translation2d(2.5, FieldConstants.kFieldWidth / 2), 2)
+    self.assertEqual({left.name, right.name}, {"Reef 18 Left", "Reef 18 Right"})
+    for target in (left, right):
+      self.assertAlmostEqual(target.pose.rotation().degrees(), 0.0)
+      self.assertAlmostEqual(
+        target.pose.X(), 3.6576 - FieldTargetConstants.kTargetDistance, places=4
+      )
+    self.assertAlmostEqual(
+      abs(left.pose.Y() - right.pose.Y()), 2 * FieldConstants.kReefBranchOffset
+    )
+
+    with self.assertRaises(ValueError):
+      reef.kNearest(Translation2d(), reef.maxNeighbors + 1)
+
+  def test_small_target_sets(self):
+    stations = self.fieldTargets.getIndex(TargetKind.kCoralStation, DriverStation.Alliance.kBlue)
+    self.assertEqual(stations.maxNeighbors, 2)
+    single = TargetIndex(stations.targets[:1])
+    self.assertEqual(single.nearest(Translation2d(16.0, 7.0)), stations.targets[0])
@@ -0,0 +1,66 @@
+import gc
+from unittest import TestCase
+
+from utils.gccontrol import GarbageCollector
+
+
+def makeGarbage(count: int):
+  """
+  Leaves `count` lists in reference cycles, which only the garbage collector frees.
+  """
+  for _ in range(count):
+    cycle = []
+    cycle.append(cycle)
+
+
+class GarbageCollectorTestCase(TestCase):
+  def setUp(self):
+    self.wasEnabled = gc.isenabled()
+    self.collector = GarbageCollector(
+      enabled=True, youngThreshold=500, maxPending=5000, idleMargin=0.008, period=0.02
+    )
+
+  def tearDown(self):
+    if self.wasEnabled:
+      gc.enable()
+    gc.collect()
+
+  def test_automatic_collections_only_while_disabled(self):
+    self.collector.robotEnabled()
+    self.assertFalse(gc.isenabled())
+
+    makeGarbage(1000)
+    self.assertGreaterEqual(gc.get_count()[0], 1000)
+
+    self.collector.robotDisabled()
+    self.assertTrue(gc.isenabled())
+    self.assertLess(gc.get_count()[0], 500)
+
+  def test_collects_young_objects_when_the_loop_has_time_left(self):
+    self.collector.robotEnabled()
+    gc.collect()
+
+    makeGarbage(100)
+    self.collector.periodic(0.001)
+    self.assertEqual(self.collector.collections, 0)
+
+    makeGarbage(1000)
+    self.collector.periodic(0.015)
+    self.assertEqual(self.collector.collections, 0)
+    self.collector.periodic(0.005)
+    self.assertEqual(self.collector.collections, 1)
+    self.assertEqual(self.collector.forcedCollections, 0)
+    self.assertLess(gc.get_count()[0], 500)
+
+  def test_forces_a_collection_past_max_pending(self):
+    self.collector.robotEnabled()
+    makeGarbage(6000)
+    self.collector.periodic(0.019)
+    self.assertEqual(self.collector.collections, 1)
+    self.assertEqual(self.collector.forcedCollections, 1)
+
+  def test_can_be_turned_off(self):
+    collector = GarbageCollector(enabled=False)
+    gc.enable()
+    collector.robotEnabled()
+    self.assertTrue(gc.isenabled())
@@ -0,0 +1,100 @@
+import math
+import pathlib
+import random
+import time
+from unittest import TestCase
+
+from pathplannerlib.path import GoalEndState, PathConstraints
+from wpimath.geometry import Rotation2d, Translation2d
+
+from utils.gridpathfinder import GridPathfinder, NavGrid
+
+kNavGridPath = pathlib.Path(__file__).parent.parent / "deploy/pathplanner/navgrid.json"
+
+
+def crossesObstacle(grid: NavGrid, start: Translation2d, end: Translation2d) -> bool:
+  """
+  Walks the segment in tiny steps, a slow but simple reference.
+  """
+  steps = max(1, int(start.distance(end) / (grid.nodeSize / 50)))
+  for step in range(steps + 1):
+    point = start + (end - start) * (step / steps)
+    if grid.isBlocked(grid.getCell(point)):
+      return True
+  return False
+
+
+class GridPathfinderTestCase(TestCase):
+  def setUp(self):
+    self.grid = NavGrid.fromFile(kNavGridPath)
+    self.pathfinder = GridPathfinder(self.grid)
+    self.freeCells = [cell for cell in range(self.grid.cellCount) if not self.grid.isBlocked(cell)]
+
+  def test_line_of_sight_never_crosses_an_obstacle(self):
+    rng = random.Random(1)
+    for _ in range(500):
+      start, end = rng.sample(self.freeCells, 2)
+      if self.grid.lineOfSight(start, end):
+        self.assertFalse(
+          crossesObstacle(self.grid, self.grid.getCellCenter(start), self.grid.getCellCenter(end))
+        )
+
+  def test_paths_avoid_obstacles(self):
+    rng = random.Random(2)
+    for _ in range(40):
+      start, goal = (self.grid.getCellCenter(cell) for cell in rng.sample(self.freeCells, 2))
+      path = self.pathfinder.plan(start, goal)
+
+      self.assertEqual(path[0], start)
+      self.assertEqual(path[-1], goal)
+      for segmentStart, segmentEnd in zip(path, path[1:]):
+        self.assertFalse(crossesObstacle(self.grid, segmentStart, segmentEnd))
+
+  def test_dynamic_obstacles_are_avoided(self):
+    start, goal = Translation2d(2.0, 1.2), Translation2d(6.0, 1.2)
+    self.assertEqual(len(self.pathfinder.plan(start, goal)), 2)
+
+    added = self.grid.setDynamicObstacles([(Translation2d(3.5, 0.5), Translation2d(4.0, 1.8))])
+    self.assertTrue(added)
+    # Only the cells around the new obstacle were updated
+    incremental = list(self.grid.clearance)
+    self.grid.updateClearance(self.grid.blockedCells(), reset=True)
+    self.assertEqual(incremental, list(self.grid.clearance))
+
+    path = self.pathfinder.plan(start, goal)
+    self.assertGreater(len(path), 2)
+    for segmentStart, segmentEnd in zip(path, path[1:]):
+      self.assertFalse(crossesObstacle(self.grid, segmentStart, segmentEnd))
+
+    self.grid.setDynamicObstacles([])
+    self.assertEqual(len(self.pathfinder.plan(start, goal)), 2)
+
+  def waitForPath(self, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not self.pathfinder.isNewPathAvailable() and time.monotonic() < deadline:
+      time.sleep(0.005)
+    return self.pathfinder.isNewPathAvailable()
+
+  def test_plans_in_the_background(self):
+    self.pathfinder.setStartPosition(Translation2d(2.0, 1.2))
+    self.pathfinder.setGoalPosition(Translation2d(16.0, 6.5))
+    self.assertTrue(self.waitForPath())
+
+    path = self.pathfinder.getCurrentPath(
+      PathConstraints(3.0, 3.0, math.tau, math.tau), GoalEndState(0.0, Rotation2d())
+    )
+    self.assertIsNotNone(path)
+    self.assertFalse(self.pathfinder.isNewPathAvailable())
+    self.assertAlmostEqual(path.getWaypoints()[-1].anchor.X(), 16.0)
+
+    # Away from the path: nothing to plan again
+    self.pathfinder.setDynamicObstacles(
+      [(Translation2d(14.0, 0.6), Translation2d(14.5, 1.0))], Translation2d(2.0, 1.2)
+    )
+    self.assertFalse(self.waitForPath(0.2))
+
+    # Across the start of the path
+    self.pathfinder.setDynamicObstacles(
+      [(Translation2d(2.5, 0.5), Translation2d(3.5, 2.5))], Translation2d(2.0, 1.2)
+    )
+    self.assertTrue(self.waitForPath())
@@ -0,0 +1,20 @@
+import pathlib
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class HeadlessMatchTestCase(TestCase):
+  def test_runs_a_short_match(self):
+    # Runs in its own process, the test harness's robot would otherwise block simulated time
+    result = subprocess.run(
+      [sys.executable, "-m", "simulation.headless", "--autonomous", "1", "--teleop", "3"],
+      cwd=pathlib.Path(__file__).parent.parent,
+      capture_output=True,
+      text=True,
+      timeout=120,
+    )
+
+    self.assertEqual(result.returncode, 0, result.stderr)
+    self.assertIn("Speedup", result.stdout)
+    self.assertIn("(300 loops)", result.stdout)
@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from utils.lazy import LazyClassAttribute
+
+
+class LazyClassAttributeTestCase(TestCase):
+  def test_built_once_on_first_read(self):
+    builds = []
+
+    class Configs:
+      factor = 2
+
+      @LazyClassAttribute
+      def config(cls) -> list:
+        builds.append(cls)
+        return [cls.factor]
+
+    self.assertEqual(builds, [])
+    self.assertEqual(Configs.config, [2])
+    self.assertIs(Configs.config, Configs.config)
+    self.assertEqual(builds, [Configs])
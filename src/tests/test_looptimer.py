@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from utils.looptimer import PhaseTimer
+
+
+class PhaseTimerTestCase(TestCase):
+  def test_accumulates_calls_into_one_sample(self):
+    phase = PhaseTimer("test", budget=1.0, windowSize=10)
+    phase.accumulated = 0.25
+    phase.calls = 2
+    phase.commit()
+
+    self.assertEqual(phase.count, 1)
+    self.assertEqual(phase.statistics(), (0.25, 0.25, 0.25))
+
+  def test_skips_phases_that_did_not_run(self):
+    phase = PhaseTimer("test", budget=1.0, windowSize=10)
+    phase.commit()
+
+    self.assertEqual(phase.count, 0)
+    self.assertEqual(phase.statistics(), (0.0, 0.0, 0.0))
+
+  def test_counts_overruns_and_rolls_window(self):
+    phase = PhaseTimer("test", budget=0.005, windowSize=4)
+    for elapsed in (0.001, 0.002, 0.010, 0.003, 0.004, 0.020):
+      with phase:
+        pass
+      phase.accumulated = elapsed
+      phase.commit()
+
+    self.assertEqual(phase.overruns, 2)
+    # Only the last 4 samples are kept
+    self.assertEqual(sorted(phase.samples), [0.003, 0.004, 0.010, 0.020])
+    self.assertEqual(phase.statistics()[2], 0.020)
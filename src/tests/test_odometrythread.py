@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+from subsystems.OdometryThread import OdometryThread
+
+
+class OdometryThreadTestCase(TestCase):
+  def setUp(self):
+    self.reads = 0
+
+  def read(self) -> int:
+    self.reads += 1
+    return self.reads
+
+  def test_drain_returns_samples_in_order(self):
+    thread = OdometryThread(self.read, bufferSize=10)
+
+    for _ in range(3):
+      thread.sample()
+
+    self.assertEqual(thread.drain(), [1, 2, 3])
+    self.assertEqual(thread.drain(), [])
+
+  def test_full_buffer_drops_oldest(self):
+    thread = OdometryThread(self.read, bufferSize=4)
+
+    for _ in range(6):
+      thread.sample()
+
+    self.assertEqual(thread.drain(), [3, 4, 5, 6])
+    self.assertEqual(thread.droppedSamples, 2)
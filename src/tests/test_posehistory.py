@@ -0,0 +1,75 @@
+import math
+from unittest import TestCase
+
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import ChassisSpeeds
+
+from utils.posehistory import PoseHistory
+
+
+class PoseHistoryTestCase(TestCase):
+  def test_interpolates_between_samples(self):
+    history = PoseHistory(duration=1.0, period=0.02)
+    self.assertIsNone(history.getPose(0.0))
+
+    history.add(1.0, Pose2d(0, 0, Rotation2d.fromDegrees(170)), ChassisSpeeds(1, 0, 0))
+    history.add(1.02, Pose2d(1, 2, Rotation2d.fromDegrees(-170)), ChassisSpeeds(3, 2, 1))
+
+    pose = history.getPose(1.005)
+    self.assertAlmostEqual(pose.X(), 0.25)
+    self.assertAlmostEqual(pose.Y(), 0.5)
+    # Through 180 degrees, not back through 0
+    self.assertAlmostEqual(pose.rotation().degrees(), 175)
+
+    speeds = history.getSpeeds(1.015)
+    self.assertAlmostEqual(speeds.vx, 2.5)
+    self.assertAlmostEqual(speeds.vy, 1.5)
+    self.assertAlmostEqual(speeds.omega, 0.75)
+
+    # Before the oldest sample, and after the newest
+    self.assertIsNone(history.getPose(0.99))
+    self.assertAlmostEqual(history.getPose(2.0).X(), 1)
+
+  def test_evicts_old_samples(self):
+    # The robot's: two seconds of 20 ms loops
+    self.assertEqual(PoseHistory().capacity, 101)
+
+    history = PoseHistory(duration=0.1, period=0.02)
+    self.assertEqual(history.capacity, 6)
+
+    for i in range(20):
+      history.add(i * 0.02, Pose2d(i, 0, 0), ChassisSpeeds())
+    self.assertEqual(history.count, 6)
+    self.assertAlmostEqual(history.getOldestTimestamp(), 0.28)
+    self.assertAlmostEqual(history.getPose(0.31).X(), 15.5)
+
+    # Out of order samples are ignored
+    self.assertFalse(history.add(0.3, Pose2d(), ChassisSpeeds()))
+
+    # A gap in the samples (disabled, slow loop) evicts by age, not only by count
+    history.add(1.0, Pose2d(50, 0, 0), ChassisSpeeds())
+    self.assertEqual(history.count, 2)
+    self.assertAlmostEqual(history.getPose(0.95).X(), 50 - (50 - 19) * 0.05 / (1.0 - 0.38))
+    self.assertIsNone(history.getPose(0.3))
+
+    history.clear()
+    self.assertIsNone(history.getPose(1.0))
+
+  def test_matches_a_linear_search(self):
+    history = PoseHistory(duration=2.0, period=0.02)
+    timestamp = 0.0
+    for i in range(300):
+      # Uneven loop times
+      timestamp += 0.015 + 0.01 * math.sin(i)
+      history.add(timestamp, Pose2d(math.cos(i), math.sin(i), i * 0.1), ChassisSpeeds())
+
+    # (timestamp, buffer index) from oldest to newest
+    samples = []
+    for i in range(history.count):
+      index = (history.start + i) % history.capacity
+      samples.append((history.timestamps[index], index))
+
+    for step in range(500):
+      query = samples[0][0] + (samples[-1][0] - samples[0][0]) * step / 499
+      before = [index for time, index in samples if time <= query][-1]
+      self.assertEqual(history.find(query)[0], before)
@@ -0,0 +1,135 @@
+import math
+from unittest import TestCase
+
+from rev import SparkMax
+from wpilib.simulation import (
+  BatterySim,
+  PowerDistributionSim,
+  RoboRioSim,
+  stepTimingAsync,
+)
+
+from constants import PowerManagerConstants
+from utils.powermanager import PowerConsumer, PowerLevel, PowerManager, allocateCurrent
+
+# Not used by the robot, so they don't collide with the subsystems' motors
+kFirstMotorId = 40
+
+
+def consumer(motors: int, minCurrentLimit: int, maxCurrentLimit: int) -> PowerConsumer:
+  return PowerConsumer("", [None] * motors, minCurrentLimit, maxCurrentLimit, (), lambda _: None)
+
+
+class AllocateCurrentTestCase(TestCase):
+  def test_priority(self):
+    # The robot's: drive, elevator, pickup
+    consumers = (consumer(4, 30, 50), consumer(2, 20, 50), consumer(2, 10, 80))
+
+    self.assertEqual(allocateCurrent(math.inf, consumers), [50, 50, 80])
+    self.assertEqual(allocateCurrent(300, consumers), [50, 40, 10])
+    self.assertEqual(allocateCurrent(200, consumers), [35, 20, 10])
+    # Never under the minimums
+    self.assertEqual(allocateCurrent(0, consumers), [30, 20, 10])
+    # Whole amps only, what the drive can't use goes to the next consumer
+    self.assertEqual(allocateCurrent(182, consumers), [30, 21, 10])
+
+
+class PowerManagerTestCase(TestCase):
+  motorId = kFirstMotorId
+
+  def setUp(self):
+    self.driveMotors = [self.createMotor(), self.createMotor()]
+    self.pickupMotor = self.createMotor()
+    self.driveScales: list[float] = []
+    self.pickupScales: list[float] = []
+    self.manager = PowerManager(
+      (
+        PowerConsumer("Drive", self.driveMotors, 30, 50, (1.0, 0.8, 0.6), self.driveScales.append),
+        PowerConsumer(
+          "Pickup", (self.pickupMotor,), 10, 40, (1.0, 0.5, 0.2), self.pickupScales.append
+        ),
+      ),
+      (math.inf, 100, 80),
+    )
+    self.powerDistribution = PowerDistributionSim(self.manager.powerDistribution)
+
+  @staticmethod
+  def createMotor() -> SparkMax:
+    PowerManagerTestCase.motorId += 1
+    return SparkMax(PowerManagerTestCase.motorId, SparkMax.MotorType.kBrushless)
+
+  def tearDown(self):
+    RoboRioSim.resetData()
+    self.powerDistribution.resetData()
+
+  def loop(self, currentDraw: float, dt: float = 0.02, batteryResistance: float = 0.02):
+    """
+    Sags the simulated battery (ohms) under a load (amps), then runs the power manager.
+    """
+    RoboRioSim.setVInVoltage(BatterySim.calculate(12, batteryResistance, [currentDraw]))
+    self.powerDistribution.setCurrent(0, currentDraw)
+    stepTimingAsync(dt)
+    self.manager.periodic()
+
+  def test_levels(self):
+    self.loop(0)
+    self.assertEqual(self.manager.level, PowerLevel.kNormal)
+    self.assertEqual(self.manager.levelChanges, 0)
+
+    # Pushing: 12 V - 200 A * 0.02 ohm = 8 V
+    self.loop(200)
+    self.assertEqual(self.manager.level, PowerLevel.kReduced)
+    self.loop(200)
+    self.assertEqual(self.manager.levelChanges, 1)
+    self.assertEqual(self.driveScales, [0.8])
+
+    # Nearly browning out, straight to critical
+    self.loop(250)
+    self.assertEqual(self.manager.level, PowerLevel.kCritical)
+    self.assertEqual(self.driveScales, [0.8, 0.6])
+    self.assertEqual(self.pickupScales, [0.5, 0.2])
+    self.assertEqual(self.manager.currentLimits, [35, 10])
+    self.assertEqual(self.driveMotors[0].configAccessor.getSmartCurrentLimit(), 35)
+
+    # Back one level at a time, once the voltage held up for long enough
+    halfRecovery = PowerManagerConstants.kRecoveryTime / 2 + 0.01
+    self.loop(0)
+    self.loop(0, halfRecovery)
+    self.assertEqual(self.manager.level, PowerLevel.kCritical)
+    self.loop(0, halfRecovery)
+    self.assertEqual(self.manager.level, PowerLevel.kReduced)
+    self.loop(0)
+    self.loop(0, 2 * halfRecovery)
+    self.assertEqual(self.manager.level, PowerLevel.kNormal)
+    self.assertEqual(self.driveScales[-2:], [0.8, 1.0])
+    self.assertEqual(self.manager.currentLimits, [50, 40])
+
+  def test_hysteresis(self):
+    self.loop(200)
+    self.assertEqual(self.manager.level, PowerLevel.kReduced)
+
+    # Just over the threshold isn't enough to recover
+    overThreshold = (12 - PowerManagerConstants.kReducedVoltage - 0.2) / 0.02
+    for _ in range(100):
+      self.loop(overThreshold)
+    self.assertEqual(self.manager.level, PowerLevel.kReduced)
+    self.assertEqual(self.manager.levelChanges, 1)
+
+  def test_total_current(self):
+    # A fresh battery hardly sags, the current alone is over the threshold
+    self.loop(PowerManagerConstants.kReducedCurrent + 10, batteryResistance=0.005)
+    self.assertGreater(self.manager.readSample().voltage, PowerManagerConstants.kReducedVoltage)
+    self.assertEqual(self.manager.level, PowerLevel.kReduced)
+
+  def test_sends_the_normal_limits_at_startup(self):
+    self.assertEqual(self.driveMotors[0].configAccessor.getSmartCurrentLimit(), 50)
+    self.assertEqual(self.pickupMotor.configAccessor.getSmartCurrentLimit(), 40)
+
+    # Lower than the limit in `config.py` even at the normal level
+    manager = PowerManager(
+      (PowerConsumer("Drive", self.driveMotors, 30, 50, (1.0, 0.8, 0.6), lambda _: None),),
+      (80, 70, 60),
+    )
+    self.assertEqual(manager.currentLimits, [40])
+    for motor in self.driveMotors:
+      self.assertEqual(motor.configAccessor.getSmartCurrentLimit(), 40)
@@ -0,0 +1,84 @@
+import gc
+from unittest import TestCase
+
+from utils.looptimer import LoopTimer
+from utils.retentionmonitor import RetentionMonitor, RetentionWindow
+
+
+class RetentionWindowTestCase(TestCase):
+  def test_flags_a_regression_once_the_window_is_full(self):
+    window = RetentionWindow("test", budget=10, windowSize=3)
+    self.assertFalse(window.add(20))
+    self.assertFalse(window.add(20))
+    self.assertTrue(window.add(5))
+    self.assertEqual(window.statistics(), (20, 20))
+
+    # Already flagged
+    self.assertFalse(window.add(20))
+    self.assertEqual(window.regressions, 1)
+
+    self.assertFalse(window.add(0))
+    self.assertFalse(window.add(0))
+    self.assertFalse(window.regressed)
+
+
+class RetentionMonitorTestCase(TestCase):
+  def setUp(self):
+    self.wasEnabled = gc.isenabled()
+    gc.disable()
+
+    self.loopTimer = LoopTimer(tableName="TestLoopTimer")
+    self.keeping = self.loopTimer.addPhase("Keeping", 1.0)
+    self.freeing = self.loopTimer.addPhase("Freeing", 1.0)
+    self.idle = self.loopTimer.addPhase("Idle", 1.0)
+    self.monitor = RetentionMonitor(
+      self.loopTimer, tableName="TestRetainedObjects", samplePeriod=1, windowSize=5
+    )
+    self.kept: list[list[object]] = []
+
+  def tearDown(self):
+    if self.wasEnabled:
+      gc.enable()
+
+  def loop(self, collect: bool = False):
+    with self.keeping:
+      self.kept.append([object() for _ in range(10)])
+    with self.freeing:
+      [object() for _ in range(100)]
+      if collect:
+        gc.collect()
+    self.monitor.periodic()
+    self.loopTimer.periodic()
+
+  def test_counts_the_objects_each_phase_keeps(self):
+    # Arms the first sample
+    self.monitor.periodic()
+    for _ in range(5):
+      self.loop()
+
+    keeping, freeing, idle = self.monitor.windows
+    # Ten objects, and the list holding them
+    self.assertAlmostEqual(keeping.statistics()[0], 11, delta=2)
+    # Give or take the objects Python keeps on free lists
+    self.assertAlmostEqual(freeing.statistics()[0], 0, delta=2)
+    self.assertEqual(idle.count, 0)
+    self.assertGreaterEqual(self.monitor.loop.statistics()[0], 9)
+
+  def test_flags_regressions(self):
+    self.monitor.periodic()
+    for _ in range(5):
+      self.loop()
+    self.assertFalse(self.monitor.windows[0].regressed)
+
+    self.keeping.budget = 0
+    self.monitor.windows[0].budget = 5
+    self.loop()
+    self.assertTrue(self.monitor.windows[0].regressed)
+    self.assertFalse(self.monitor.windows[1].regressed)
+
+  def test_drops_loops_with_a_collection(self):
+    self.monitor.periodic()
+    self.loop(collect=True)
+    self.assertEqual(self.monitor.loop.count, 0)
+    self.loop()
+    self.assertEqual(self.monitor.loop.count, 1)
@@ -0,0 +1,63 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from rev import SparkBaseConfig, SparkMax
+
+from utils.sparkconfig import SparkConfigManager
+
+# Not used by the robot, so they don't collide with the subsystems' motors
+kMotorId = 60
+
+
+class SparkConfigManagerTestCase(TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.motor = SparkMax(kMotorId, SparkMax.MotorType.kBrushless)
+
+  def setUp(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.hashFile = pathlib.Path(directory.name) / "hashes.json"
+
+  def configure(self, config: SparkBaseConfig) -> bool:
+    """
+    Configures the motor with a new manager (like after a reboot) and returns whether the config
+    was persisted.
+    """
+    manager = SparkConfigManager(self.hashFile)
+    manager.configure(self.motor, config)
+    (result,) = manager.waitForAll()
+    return result.persisted
+
+  def test_unchanged_config_is_not_persisted(self):
+    self.assertTrue(self.configure(SparkBaseConfig().smartCurrentLimit(30)))
+    self.assertTrue(self.hashFile.exists())
+
+    self.assertFalse(self.configure(SparkBaseConfig().smartCurrentLimit(30)))
+
+  def test_unchanged_config_is_still_applied(self):
+    self.configure(SparkBaseConfig().smartCurrentLimit(30))
+
+    # Left in RAM by the previous run (or a replaced Spark with another config)
+    self.motor.configure(
+      SparkBaseConfig().smartCurrentLimit(10),
+      SparkMax.ResetMode.kNoResetSafeParameters,
+      SparkMax.PersistMode.kNoPersistParameters,
+    )
+    self.assertFalse(self.configure(SparkBaseConfig().smartCurrentLimit(30)))
+    self.assertEqual(self.motor.configAccessor.getSmartCurrentLimit(), 30)
+
+  def test_changed_config_is_persisted(self):
+    self.configure(SparkBaseConfig().smartCurrentLimit(30))
+
+    self.assertTrue(self.configure(SparkBaseConfig().smartCurrentLimit(40)))
+    self.assertFalse(self.configure(SparkBaseConfig().smartCurrentLimit(40)))
+
+  def test_without_hash_file_always_persists(self):
+    manager = SparkConfigManager(None)
+
+    for _ in range(2):
+      manager.configure(self.motor, SparkBaseConfig().smartCurrentLimit(30))
+
+    self.assertEqual([result.persisted for result in manager.waitForAll()], [True, True])
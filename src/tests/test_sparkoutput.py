@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from rev import SparkLowLevel, SparkMax
+
+from utils.sparkoutput import SparkOutput
+
+# Not used by the robot, so they don't collide with the subsystems' motors
+kFirstMotorId = 50
+
+
+class SparkOutputTestCase(TestCase):
+  motorId = kFirstMotorId
+
+  def setUp(self):
+    SparkOutputTestCase.motorId += 1
+    self.motor = SparkMax(SparkOutputTestCase.motorId, SparkMax.MotorType.kBrushless)
+
+  def test_repeated_setpoints_are_suppressed(self):
+    output = SparkOutput(self.motor, keepAlivePeriod=1000)
+
+    for _ in range(5):
+      output.set(0)
+
+    self.assertEqual(output.sentFrames, 1)
+    self.assertEqual(output.suppressedFrames, 4)
+
+  def test_changes_are_sent(self):
+    output = SparkOutput(self.motor, tolerance=0.01, keepAlivePeriod=1000)
+
+    output.set(0.5)
+    output.set(0.505)  # Within tolerance
+    output.set(0.6)
+    output.setReference(0.6, SparkLowLevel.ControlType.kVelocity)
+    output.setReference(0.6, SparkLowLevel.ControlType.kVelocity, arbFeedforward=1.0)
+
+    self.assertEqual(output.sentFrames, 4)
+    self.assertEqual(output.suppressedFrames, 1)
+    self.assertAlmostEqual(self.motor.get(), 0.6)
+
+  def test_keep_alive_resends(self):
+    output = SparkOutput(self.motor, keepAlivePeriod=0)
+
+    for _ in range(3):
+      output.set(0.2)
+
+    self.assertEqual(output.sentFrames, 3)
+
+  def test_invalidate_forces_next_setpoint(self):
+    output = SparkOutput(self.motor, keepAlivePeriod=1000)
+
+    output.set(0.3)
+    self.motor.set(0)  # Commanded without going through the output
+    output.invalidate()
+    output.set(0.3)
+
+    self.assertEqual(output.sentFrames, 2)
+    self.assertAlmostEqual(self.motor.get(), 0.3)
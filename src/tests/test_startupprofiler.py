@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from utils.startupprofiler import StartupProfiler
+
+
+class StartupProfilerTestCase(TestCase):
+  def test_nested_steps_are_listed_before_children(self):
+    profiler = StartupProfiler()
+
+    with profiler.measure("outer"):
+      with profiler.measure("inner"):
+        pass
+    with profiler.measure("after"):
+      pass
+
+    self.assertEqual(
+      [(step.name, step.depth) for step in profiler.steps],
+      [
+        ("outer", 0),
+        ("inner", 1),
+        ("after", 0),
+      ],
+    )
+    self.assertGreaterEqual(profiler.steps[0].duration, profiler.steps[1].duration)
+
+  def test_step_is_recorded_when_it_raises(self):
+    profiler = StartupProfiler()
+
+    with self.assertRaises(ValueError):
+      with profiler.measure("failing"):
+        raise ValueError()
+
+    self.assertEqual(profiler.depth, 0)
+    self.assertEqual(profiler.steps[0].name, "failing")
+
+  def test_import_modules(self):
+    profiler = StartupProfiler()
+
+    profiler.importModules(["json", "math"])
+
+    self.assertEqual([step.name for step in profiler.steps], ["import json", "import math"])
@@ -0,0 +1,85 @@
+import math
+import random
+from unittest import TestCase
+
+from wpimath.geometry import Rotation2d
+from wpimath.kinematics import ChassisSpeeds, SwerveDrive4Kinematics, SwerveModuleState
+
+from constants import DriveSubsystemConstants
+from utils.swervekinematics import SwerveKinematics
+
+kOffsets = (
+  DriveSubsystemConstants.kFrontLeftChassisAngularOffset,
+  DriveSubsystemConstants.kFrontRightChassisAngularOffset,
+  DriveSubsystemConstants.kBackLeftChassisAngularOffset,
+  DriveSubsystemConstants.kBackRightChassisAngularOffset,
+)
+
+
+def wpilibSetpoints(
+  kinematics: SwerveDrive4Kinematics, speeds: ChassisSpeeds, currentAngles: list[float]
+) -> list[tuple[float, float]]:
+  """
+  The setpoints `DriveSubsystem` and `SwerveModule` used to compute with WPILib objects.
+  """
+  states = SwerveDrive4Kinematics.desaturateWheelSpeeds(
+    kinematics.toSwerveModuleStates(speeds), DriveSubsystemConstants.kMaxSpeedMetersPerSecond
+  )
+
+  setpoints = []
+  for state, offset, current in zip(states, kOffsets, currentAngles):
+    corrected = SwerveModuleState(state.speed, state.angle + Rotation2d(offset))
+    corrected.optimize(Rotation2d(current))
+    setpoints.append((corrected.speed, corrected.angle.radians()))
+  return setpoints
+
+
+class SwerveKinematicsTestCase(TestCase):
+  def setUp(self):
+    self.wpilibKinematics = SwerveDrive4Kinematics(
+      *DriveSubsystemConstants.kDriveKinematics.getModules()
+    )
+    self.kinematics = SwerveKinematics(
+      DriveSubsystemConstants.kDriveKinematics.getModules(),
+      kOffsets,
+      DriveSubsystemConstants.kMaxSpeedMetersPerSecond,
+    )
+
+  def assertSetpointsEqual(self, expected: list[tuple[float, float]]):
+    for i, (speed, angle) in enumerate(expected):
+      self.assertAlmostEqual(self.kinematics.speeds[i], speed, places=9)
+      # -pi and pi are the same angle
+      self.assertAlmostEqual(
+        math.remainder(self.kinematics.angles[i] - angle, math.tau), 0, places=9
+      )
+
+  def test_matches_wpilib(self):
+    generator = random.Random(2025)
+
+    for _ in range(500):
+      vx, vy = generator.uniform(-2, 2), generator.uniform(-2, 2)
+      omega = generator.uniform(-4, 4)
+      currentAngles = [generator.uniform(0, math.tau) for _ in range(4)]
+
+      self.kinematics.calculate(vx, vy, omega, currentAngles)
+
+      self.assertSetpointsEqual(
+        wpilibSetpoints(self.wpilibKinematics, ChassisSpeeds(vx, vy, omega), currentAngles)
+      )
+
+  def test_stopped_keeps_last_headings(self):
+    currentAngles = [0.3, 1.2, 4.0, 5.5]
+
+    for speeds in (ChassisSpeeds(0.5, -0.2, 1.0), ChassisSpeeds()):
+      self.kinematics.calculate(speeds.vx, speeds.vy, speeds.omega, currentAngles)
+
+      self.assertSetpointsEqual(wpilibSetpoints(self.wpilibKinematics, speeds, currentAngles))
+
+  def test_discretize_matches_wpilib(self):
+    for vx, vy, omega in ((1.0, 0.5, 2.0), (-0.3, 0.8, 0.0), (0.0, 0.0, -3.0)):
+      expected = ChassisSpeeds.discretize(ChassisSpeeds(vx, vy, omega), 0.02)
+
+      discretized = SwerveKinematics.discretize(vx, vy, omega, 0.02)
+
+      for actual, wanted in zip(discretized, (expected.vx, expected.vy, expected.omega)):
+        self.assertAlmostEqual(actual, wanted, places=9)
@@ -0,0 +1,267 @@
+import contextlib
+import io
+import math
+import pathlib
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+from commands2 import Subsystem
+from commands2.sysid import SysIdRoutine
+from rev import SparkMax
+from wpilib import DigitalInput
+from wpilib.simulation import DCMotorSim, DriverStationSim, ElevatorSim
+from wpimath.system.plant import DCMotor, LinearSystemId
+
+from constants import (
+  ElevatorSubsystemConstants,
+  SimulationConstants,
+  SwerveModuleConstants,
+  SysIdConstants,
+)
+from simulation.models import ElevatorModel
+from utils.sysid import SysIdMechanism, SysIdMotor
+from utils.sysidfit import (
+  LoggedTest,
+  feedbackGains,
+  fitFeedforward,
+  kMechanismFits,
+  printMechanism,
+  readLog,
+)
+
+kPeriod = 1 / SysIdConstants.kLogFrequency
+kBusVoltage = 12.0
+# Not used by the robot, so they don't collide with the subsystems' motors and switches
+kElevatorMotorId = 61
+kUpperSwitchChannel = 8
+kLowerSwitchChannel = 9
+
+
+kLogScript = """
+import sys, time
+from wpilib import DataLogManager
+from wpilib.sysid import State, SysIdRoutineLog
+
+DataLogManager.start(sys.argv[1], "sysid.wpilog")
+log = SysIdRoutineLog("elevator")
+for state in (State.kQuasistaticForward, State.kDynamicForward):
+  for sample in range(10):
+    log.recordState(state)
+    log.motor("elevator").voltage(sample).angularPosition(sample * 2).angularVelocity(sample * 3)
+    time.sleep(0.002)
+  log.recordState(State.kNone)
+  log.motor("elevator").voltage(0).angularPosition(0).angularVelocity(0)
+  time.sleep(0.002)
+"""
+
+
+def runTests(step, limit=lambda direction, position: False) -> list[LoggedTest]:
+  """
+  Runs the four SysId tests on a simulated mechanism.
+
+  :param step: Applies a voltage for one period, then returns the position and velocity.
+  """
+  segments = []
+  position = 0.0
+  for state, direction, voltage in (
+    ("quasistatic-forward", 1, lambda t: SysIdConstants.kElevatorRampRate * t),
+    ("quasistatic-reverse", -1, lambda t: -SysIdConstants.kElevatorRampRate * t),
+    ("dynamic-forward", 1, lambda t: SysIdConstants.kElevatorStepVoltage),
+    ("dynamic-reverse", -1, lambda t: -SysIdConstants.kElevatorStepVoltage),
+  ):
+    segment = LoggedTest(state, [], [], [], [])
+    time = 0.0
+    while time < SysIdConstants.kElevatorTimeout and not limit(direction, position):
+      volts = voltage(time)
+      position, velocity = step(volts)
+      segment.times.append(time)
+      segment.voltages.append(volts)
+      segment.positions.append(position)
+      segment.velocities.append(velocity)
+      time += kPeriod
+    segments.append(segment)
+
+    # Come to rest before the next test
+    for _ in range(int(SysIdConstants.kRestTime / kPeriod)):
+      position, _ = step(0.0)
+  return segments
+
+
+def elevatorLimit(direction: int, position: float) -> bool:
+  if direction > 0:
+    return position >= SysIdConstants.kElevatorForwardLimit
+  return position <= SysIdConstants.kElevatorReverseLimit
+
+
+def elevatorGains() -> tuple[float, float, float]:
+  """
+  kV, kA and kG from the elevator's physics, in motor rotations.
+  """
+  neo = DCMotor.NEO(2)
+  gearing = ElevatorSubsystemConstants.kGearRatio
+  radius = ElevatorSubsystemConstants.kDrumRadius
+  mass = ElevatorSubsystemConstants.kCarriageMass
+  metersPerRotation = 2 * math.pi * radius / gearing
+  return (
+    gearing / (radius * neo.Kv) * metersPerRotation,
+    neo.R * radius * mass / (gearing * neo.Kt) * metersPerRotation,
+    9.8 * neo.R * radius * mass / (gearing * neo.Kt),
+  )
+
+
+class SysIdTestCase(TestCase):
+  def test_fits_the_elevator_physics(self):
+    mechanism = ElevatorSim(
+      DCMotor.NEO(2),
+      ElevatorSubsystemConstants.kGearRatio,
+      ElevatorSubsystemConstants.kCarriageMass,
+      ElevatorSubsystemConstants.kDrumRadius,
+      ElevatorSubsystemConstants.kMinHeight,
+      ElevatorSubsystemConstants.kMaxHeight,
+      True,
+      ElevatorSubsystemConstants.kMinHeight,
+    )
+    rotationsPerMeter = ElevatorSubsystemConstants.kGearRatio / (
+      2 * math.pi * ElevatorSubsystemConstants.kDrumRadius
+    )
+
+    def step(volts: float):
+      mechanism.setInputVoltage(volts)
+      mechanism.update(kPeriod)
+      return (
+        mechanism.getPosition() * rotationsPerMeter,
+        mechanism.getVelocity() * rotationsPerMeter,
+      )
+
+    gains = fitFeedforward(runTests(step, elevatorLimit), gravity=True)
+    kV, kA, kG = elevatorGains()
+
+    self.assertGreater(gains.rSquared, 0.999)
+    self.assertAlmostEqual(gains.kS, 0.0, delta=0.01)
+    self.assertAlmostEqual(gains.kV, kV, delta=kV * 0.02)
+    self.assertAlmostEqual(gains.kA, kA, delta=kA * 0.1)
+    self.assertAlmostEqual(gains.kG, kG, delta=kG * 0.02)
+
+    feedback = feedbackGains(gains, kMechanismFits["elevator"])
+    self.assertGreater(feedback.kP, 0)
+    self.assertGreater(feedback.kD, 0)
+
+  def test_fits_the_simulated_elevator(self):
+    # Simulated Sparks only drive their motor when the robot is enabled
+    DriverStationSim.setEnabled(True)
+    DriverStationSim.notifyNewData()
+    self.addCleanup(DriverStationSim.setEnabled, False)
+
+    motor = SparkMax(kElevatorMotorId, SparkMax.MotorType.kBrushless)
+    model = ElevatorModel(
+      motor, DigitalInput(kUpperSwitchChannel), DigitalInput(kLowerSwitchChannel)
+    )
+    encoder = motor.getEncoder()
+
+    def step(volts: float):
+      motor.setVoltage(volts)
+      model.update(kPeriod, kBusVoltage)
+      return encoder.getPosition(), encoder.getVelocity() / 60
+
+    gains = fitFeedforward(runTests(step, elevatorLimit), gravity=True)
+    kV, _, kG = elevatorGains()
+
+    # The simulated Spark's output lags behind its setpoint, which fits as extra inertia (kA)
+    self.assertGreater(gains.rSquared, 0.99)
+    self.assertAlmostEqual(gains.kS, 0.0, delta=0.02)
+    self.assertAlmostEqual(gains.kV, kV, delta=kV * 0.05)
+    self.assertAlmostEqual(gains.kG, kG, delta=kG * 0.05)
+
+  def test_fits_a_simulated_drive_wheel(self):
+    # The wheel of simulation.models.SwerveModuleModel, velocity in radians per second
+    mechanism = DCMotorSim(
+      LinearSystemId.DCMotorSystem(
+        DCMotor.NEO(1),
+        SimulationConstants.kDriveMomentOfInertia,
+        SwerveModuleConstants.kDriveMotorReduction,
+      ),
+      DCMotor.NEO(1),
+    )
+
+    def step(volts: float):
+      mechanism.setInputVoltage(volts)
+      mechanism.update(kPeriod)
+      return mechanism.getAngularPosition(), mechanism.getAngularVelocity()
+
+    gains = fitFeedforward(runTests(step))
+
+    self.assertGreater(gains.rSquared, 0.99)
+    self.assertAlmostEqual(gains.kS, 0.0, delta=0.02)
+    self.assertAlmostEqual(gains.kG, 0.0)
+    self.assertAlmostEqual(
+      gains.kV, SwerveModuleConstants.kDriveMotorReduction / DCMotor.NEO(1).Kv, delta=0.01
+    )
+    self.assertGreater(feedbackGains(gains, kMechanismFits["drive"]).kP, 0)
+
+  def test_a_motor_that_cant_be_fitted_doesnt_stop_the_others(self):
+    mechanism = DCMotorSim(
+      LinearSystemId.DCMotorSystem(
+        DCMotor.NEO(1),
+        SimulationConstants.kDriveMomentOfInertia,
+        SwerveModuleConstants.kDriveMotorReduction,
+      ),
+      DCMotor.NEO(1),
+    )
+
+    def step(volts: float):
+      mechanism.setInputVoltage(volts)
+      mechanism.update(kPeriod)
+      return mechanism.getAngularPosition(), mechanism.getAngularVelocity()
+
+    stalled = LoggedTest("quasistatic-forward", [0.0, kPeriod], [1.0, 1.0], [0.0, 0.0], [0.0, 0.0])
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+      gains = printMechanism("drive", {"stalled": [stalled], "front-left": runTests(step)})
+
+    self.assertIsNotNone(gains)
+    self.assertIn("stalled", output.getvalue())
+    self.assertIn("front-left", output.getvalue())
+    self.assertIn("Suggested feedback", output.getvalue())
+
+  def test_speeds_up_the_status_frames_of_simulated_sparks(self):
+    # configureAsync crashes simulated Sparks
+    motor = SparkMax(kElevatorMotorId, SparkMax.MotorType.kBrushless)
+    encoder = motor.getEncoder()
+    mechanism = SysIdMechanism(
+      "elevator",
+      Subsystem(),
+      motor.setVoltage,
+      [SysIdMotor("elevator", motor, encoder.getPosition, encoder.getVelocity)],
+      SysIdRoutine.Config(),
+    )
+
+    mechanism.start()
+    mechanism.stop()
+
+    self.assertEqual(
+      motor.configAccessor.signals.getPrimaryEncoderPositionPeriodMs(),
+      SysIdConstants.kStatusFramePeriodMs,
+    )
+
+  def test_reads_the_sysid_log_format(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+
+    # Logged by WPILib in its own process, the data log is written to disk when it exits
+    result = subprocess.run(
+      [sys.executable, "-c", kLogScript, directory.name],
+      capture_output=True,
+      text=True,
+      timeout=60,
+    )
+    self.assertEqual(result.returncode, 0, result.stderr)
+
+    segments = readLog(str(pathlib.Path(directory.name) / "sysid.wpilog"))["elevator"]["elevator"]
+    self.assertEqual(
+      [segment.state for segment in segments], ["quasistatic-forward", "dynamic-forward"]
+    )
+    for segment in segments:
+      self.assertEqual(segment.voltages, [float(sample) for sample in range(10)])
+      self.assertEqual(segment.positions, [sample * 2.0 for sample in range(10)])
+      self.assertEqual(segment.velocities, [sample * 3.0 for sample in range(10)])
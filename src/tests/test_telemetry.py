@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from utils.telemetry import Priority, Telemetry
+
+
+class TelemetryTestCase(TestCase):
+  def test_publishes_at_priority_rate(self):
+    telemetry = Telemetry("TelemetryTest")
+    published = []
+    entry = telemetry.addEntry(published.append, Priority.kMedium)
+
+    for loop in range(20):
+      entry.set(loop)
+      telemetry.flush()
+
+    self.assertEqual(published, [0, 5, 10, 15])
+
+  def test_only_publishes_changed_values(self):
+    telemetry = Telemetry("TelemetryTest")
+    published = []
+    entry = telemetry.addEntry(published.append, Priority.kHigh)
+
+    entry.set(1.0)
+    for _ in range(10):
+      telemetry.flush()
+
+    self.assertEqual(published, [1.0])
+
+  def test_spreads_entries_across_loops(self):
+    telemetry = Telemetry("TelemetryTest")
+    published = []
+    first = telemetry.addEntry(lambda value: published.append(("first", value)), Priority.kLow)
+    second = telemetry.addEntry(lambda value: published.append(("second", value)), Priority.kLow)
+
+    first.set(1)
+    second.set(2)
+    telemetry.flush()
+    self.assertEqual(published, [("first", 1)])
+    telemetry.flush()
+    self.assertEqual(published, [("first", 1), ("second", 2)])
@@ -0,0 +1,123 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from commands2 import cmd
+from pathplannerlib.path import (
+  EventMarker,
+  GoalEndState,
+  IdealStartingState,
+  PathConstraints,
+  PathPlannerPath,
+  PointTowardsZone,
+)
+from wpilib import DriverStation
+from wpimath.geometry import Pose2d, Rotation2d, Translation2d
+
+from constants import TrajectoryCacheConstants
+from utils.trajectorycache import TrajectoryCache, pathplannerDirectory
+
+kPathName = "Move Test"
+
+
+class TrajectoryCacheTestCase(TestCase):
+  def setUp(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.cacheDirectory = pathlib.Path(directory.name)
+
+  def createCache(self) -> TrajectoryCache:
+    # A new cache, like after a reboot
+    return TrajectoryCache(pathplannerDirectory(), None, self.cacheDirectory)
+
+  def assertSameEvents(self, expected, actual):
+    self.assertEqual(
+      [(type(event), round(event.getTimestamp(), 9)) for event in expected.getEvents()],
+      [(type(event), round(event.getTimestamp(), 9)) for event in actual.getEvents()],
+    )
+
+  def assertSameStates(self, expected, actual):
+    self.assertEqual(len(expected.getStates()), len(actual.getStates()))
+    for expectedState, actualState in zip(expected.getStates(), actual.getStates()):
+      self.assertAlmostEqual(expectedState.timeSeconds, actualState.timeSeconds)
+      self.assertAlmostEqual(expectedState.pose.X(), actualState.pose.X())
+      self.assertAlmostEqual(expectedState.pose.Y(), actualState.pose.Y())
+      self.assertAlmostEqual(
+        expectedState.pose.rotation().radians(), actualState.pose.rotation().radians()
+      )
+      self.assertAlmostEqual(expectedState.fieldSpeeds.vx, actualState.fieldSpeeds.vx)
+      self.assertAlmostEqual(expectedState.linearVelocity, actualState.linearVelocity)
+      self.assertEqual(
+        expectedState.feedforwards.forcesNewtons, actualState.feedforwards.forcesNewtons
+      )
+
+  def test_generated_trajectory_is_saved_then_loaded(self):
+    cache = self.createCache()
+    generated = cache.getTrajectory(kPathName, DriverStation.Alliance.kBlue)
+    self.assertEqual((cache.hits, cache.misses), (0, 1))
+    self.assertEqual(len(list(self.cacheDirectory.glob("*.traj"))), 1)
+
+    cache = self.createCache()
+    loaded = cache.getTrajectory(kPathName, DriverStation.Alliance.kBlue)
+    self.assertEqual((cache.hits, cache.misses), (1, 0))
+    self.assertSameStates(generated, loaded)
+
+  def test_red_alliance_trajectory_is_flipped(self):
+    cache = self.createCache()
+    path = PathPlannerPath.fromPathFile(kPathName)
+    expected = cache.generate(path, DriverStation.Alliance.kBlue).flip()
+
+    self.assertNotEqual(
+      cache.key(kPathName, DriverStation.Alliance.kBlue),
+      cache.key(kPathName, DriverStation.Alliance.kRed),
+    )
+    cache.getTrajectory(kPathName, DriverStation.Alliance.kRed)
+    self.assertSameStates(
+      expected, self.createCache().getTrajectory(kPathName, DriverStation.Alliance.kRed)
+    )
+
+  def test_invalid_data_is_rejected(self):
+    cache = self.createCache()
+    path = PathPlannerPath.fromPathFile(kPathName)
+    data = TrajectoryCache.encode(cache.generate(path, DriverStation.Alliance.kBlue))
+
+    self.assertIsNotNone(TrajectoryCache.decode(data, path))
+    self.assertIsNone(TrajectoryCache.decode(data[:-8], path))
+    self.assertIsNone(TrajectoryCache.decode(b"PPTJ", path))
+
+  def test_supported_pathplanner_is_installed(self):
+    # After updating PathPlanner, check that the tests below still pass before updating the
+    # supported version
+    self.assertTrue(
+      self.createCache().isSupported(),
+      f"PathPlanner {self.createCache().getPathPlannerVersion()} isn't"
+      f" {TrajectoryCacheConstants.kSupportedPathPlannerVersion}",
+    )
+
+  def test_events_match_pathplanner(self):
+    cache = self.createCache()
+    paths = [PathPlannerPath.fromPathFile(name) for name in cache.getPathNames()]
+    # The deployed paths may have no events, so one with every kind of event
+    paths.append(
+      PathPlannerPath(
+        PathPlannerPath.waypointsFromPoses([Pose2d(2, 2, 0), Pose2d(4, 3, 0), Pose2d(6, 2, 0)]),
+        PathConstraints(3.0, 3.0, 6.0, 6.0),
+        IdealStartingState(0.0, Rotation2d()),
+        GoalEndState(0.0, Rotation2d()),
+        point_towards_zones=[PointTowardsZone("Reef", Translation2d(4.5, 4), 0.2, 1.2)],
+        event_markers=[
+          EventMarker("Zoned", 0.5, 1.5, cmd.none()),
+          EventMarker("Start", 0.0, command=cmd.none()),
+          EventMarker("One Shot", 1.0),
+          EventMarker("End", 2.0),
+        ],
+      )
+    )
+
+    for path in paths:
+      with self.subTest(path=path.name):
+        for alliance in (DriverStation.Alliance.kBlue, DriverStation.Alliance.kRed):
+          expected = cache.generate(path, alliance)
+          decoded = TrajectoryCache.decode(TrajectoryCache.encode(expected), path)
+          self.assertSameEvents(expected, decoded)
+          self.assertSameStates(expected, decoded)
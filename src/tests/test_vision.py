@@ -0,0 +1,85 @@
+import math
+from unittest import TestCase
+
+from wpimath.geometry import Pose2d, Rotation2d
+
+from simulation.models import SimulatedLimelight
+from subsystems.vision import LimelightHelpers
+
+
+def botpose(x: float, y: float, tagCount: int, distance: float, latency: float = 20.0):
+  return [x, y, 0.0, 0.0, 0.0, 90.0, latency, tagCount, 0.5, distance, 0.1]
+
+
+class LimelightHelpersTestCase(TestCase):
+  def test_rejects_invalid_frames(self):
+    self.assertIsNone(LimelightHelpers.toVisionMeasurement([], 1e6, Pose2d()))
+    self.assertIsNone(LimelightHelpers.toVisionMeasurement(botpose(2, 2, 0, 2), 1e6, Pose2d()))
+
+  def test_rejects_poses_outside_the_field(self):
+    self.assertIsNone(LimelightHelpers.toVisionMeasurement(botpose(-3, 2, 2, 2), 1e6, Pose2d()))
+    self.assertIsNone(LimelightHelpers.toVisionMeasurement(botpose(5, 12, 2, 2), 1e6, Pose2d()))
+
+  def test_rejects_single_tag_jumps(self):
+    currentPose = Pose2d(2, 2, 0)
+    self.assertIsNone(LimelightHelpers.toVisionMeasurement(botpose(6, 2, 1, 2), 1e6, currentPose))
+    self.assertIsNotNone(
+      LimelightHelpers.toVisionMeasurement(botpose(6, 2, 2, 2), 1e6, currentPose)
+    )
+
+  def test_accepts_any_jump_without_a_pose(self):
+    # Before vision agreed with the estimate, or while disabled
+    measurement = LimelightHelpers.toVisionMeasurement(botpose(6, 2, 1, 2), 1e6, None)
+    self.assertAlmostEqual(measurement.pose.X(), 6)
+
+  def test_removes_latency_and_scales_std_devs(self):
+    measurement = LimelightHelpers.toVisionMeasurement(
+      botpose(2, 2, 1, 2, latency=30), 1e6, Pose2d(2, 2, 0)
+    )
+    self.assertAlmostEqual(measurement.timestamp, 0.97)
+    self.assertAlmostEqual(measurement.pose.rotation().degrees(), 90)
+
+    near = LimelightHelpers.toVisionMeasurement(botpose(2, 2, 2, 1), 1e6, Pose2d(2, 2, 0))
+    far = LimelightHelpers.toVisionMeasurement(botpose(2, 2, 1, 3), 1e6, Pose2d(2, 2, 0))
+    self.assertLess(near.stdDevs[0], measurement.stdDevs[0])
+    self.assertGreater(far.stdDevs[0], measurement.stdDevs[0])
+
+  def test_publishes_the_orientation_for_megatag2(self):
+    camera = LimelightHelpers("limelight-orientation")
+    subscriber = camera.ll.getDoubleArrayTopic("robot_orientation_set").subscribe([])
+
+    camera.setRobotOrientation(Rotation2d.fromDegrees(90), math.pi)
+    LimelightHelpers.flush()
+    self.assertEqual(list(subscriber.get()), [90, 180, 0, 0, 0, 0])
+
+    # A frame captured after the orientation was sent, and received 40 ms later
+    sentTime = camera.orientationTimes[-1]
+    measurement = LimelightHelpers.toVisionMeasurement(
+      botpose(2, 2, 1, 2, latency=30), (sentTime + 0.04) * 1e6, Pose2d(2, 2, 0)
+    )
+    self.assertAlmostEqual(
+      camera.getOrientationRoundTrip(measurement, (sentTime + 0.04) * 1e6), 0.04
+    )
+
+    # Captured before any orientation was sent
+    measurement = LimelightHelpers.toVisionMeasurement(
+      botpose(2, 2, 1, 2, latency=30), (sentTime + 0.01) * 1e6, Pose2d(2, 2, 0)
+    )
+    self.assertEqual(camera.getOrientationRoundTrip(measurement, (sentTime + 0.01) * 1e6), 0)
+
+  def test_simulated_limelight_frames(self):
+    camera = LimelightHelpers("limelight-simulated")
+    limelight = SimulatedLimelight("limelight-simulated")
+    limelight.frameRate = 20
+    limelight.latency = 0.05
+
+    # Captured every 50 ms, published 50 ms later with the latency in the array
+    for loop in range(10):
+      limelight.update(10 + loop * 0.02, Pose2d(2 + loop * 0.1, 3, 0))
+    measurements = camera.getVisionMeasurements(Pose2d(2, 3, 0))
+
+    self.assertEqual(
+      [round(measurement.timestamp, 6) for measurement in measurements], [10, 10.06, 10.12]
+    )
+    self.assertAlmostEqual(measurements[1].pose.X(), 2.3)
+    self.assertEqual(len(limelight.pending), 1)
@@ -0,0 +1,269 @@
+import json
+import pathlib
+import threading
+import time
+import typing
+from array import array
+
+from commands2 import Command, CommandScheduler
+
+from constants import CommandTraceConstants
+
+
+class CommandTracer:
+  """
+  Records what the command scheduler does as spans, to be viewed as a Chrome trace (Perfetto,
+  chrome://tracing):
+
+  - every `CommandScheduler.run()`,
+  - every command's `execute()`,
+  - every command's lifetime, from `initialize()` to its end (finished or interrupted, and by what).
+
+  Spans are written as plain numbers into preallocated arrays used as a ring buffer, so recording
+  one allocates nothing and the oldest spans are overwritten once it is full. Commands' `execute()`
+  is wrapped the first time they are initialized, and the wrappers only check a flag while tracing
+  is disabled.
+  """
+
+  # Span kinds
+  kSchedulerRun = 0
+  kExecute = 1
+  kFinished = 2
+  kInterrupted = 3
+
+  kSchedulerName = "CommandScheduler.run"
+
+  _instance: typing.Optional["CommandTracer"] = None
+
+  @staticmethod
+  def getInstance() -> "CommandTracer":
+    if CommandTracer._instance is None:
+      CommandTracer._instance = CommandTracer()
+    return CommandTracer._instance
+
+  def __init__(self, capacity: int = CommandTraceConstants.kCapacity):
+    """
+    :param capacity: Number of spans kept.
+    """
+    self.enabled = CommandTraceConstants.kEnabled
+    self.capacity = capacity
+    self.origin = time.perf_counter()
+
+    self.kinds = array("b", bytes(capacity))
+    self.nameIds = array("i", bytes(4 * capacity))
+    # Name of the command that interrupted, -1 if none
+    self.causeIds = array("i", bytes(4 * capacity))
+    self.starts = array("d", bytes(8 * capacity))  # seconds since `origin`
+    self.durations = array("d", bytes(8 * capacity))
+    self.index = 0
+    self.count = 0
+
+    # Names are only added the first time a command is initialized
+    self.names: list[str] = [CommandTracer.kSchedulerName]
+    self.nameIdsByName: dict[str, int] = {CommandTracer.kSchedulerName: 0}
+    self.commandStarts: dict[Command, float] = {}
+
+  def install(self, scheduler: CommandScheduler):
+    """
+    Registers the scheduler callbacks and times `scheduler.run()`. Call once.
+    """
+    scheduler.onCommandInitialize(self.onInitialize)
+    scheduler.onCommandFinish(self.onFinish)
+    scheduler.onCommandInterruptWithCause(self.onInterrupt)
+    scheduler.run = self.traced(scheduler.run, 0, CommandTracer.kSchedulerRun)
+
+  def record(self, kind: int, nameId: int, start: float, duration: float, causeId: int = -1):
+    i = self.index
+    self.kinds[i] = kind
+    self.nameIds[i] = nameId
+    self.causeIds[i] = causeId
+    self.starts[i] = start - self.origin
+    self.durations[i] = duration
+    self.index = (i + 1) % self.capacity
+    self.count += 1
+
+  def traced(self, function: typing.Callable[[], None], nameId: int, kind: int):
+    """
+    Wraps a method that takes no arguments so every call is recorded as a span.
+    """
+
+    def traced():
+      if not self.enabled:
+        return function()
+      start = time.perf_counter()
+      try:
+        return function()
+      finally:
+        self.record(kind, nameId, start, time.perf_counter() - start)
+
+    traced.traced = True
+    return traced
+
+  def getNameId(self, name: str) -> int:
+    nameId = self.nameIdsByName.get(name)
+    if nameId is None:
+      nameId = self.nameIdsByName[name] = len(self.names)
+      self.names.append(name)
+    return nameId
+
+  def onInitialize(self, command: Command):
+    if not self.enabled:
+      return
+
+    if not getattr(command.execute, "traced", False):
+      command.execute = self.traced(
+        command.execute, self.getNameId(command.getName()), CommandTracer.kExecute
+      )
+    self.commandStarts[command] = time.perf_counter()
+
+  def endCommand(self, command: Command, kind: int, interruptor: typing.Optional[Command] = None):
+    start = self.commandStarts.pop(command, None)
+    if start is None:
+      return
+
+    causeId = -1 if interruptor is None else self.getNameId(interruptor.getName())
+    self.record(
+      kind, self.getNameId(command.getName()), start, time.perf_counter() - start, causeId
+    )
+
+  def onFinish(self, command: Command):
+    self.endCommand(command, CommandTracer.kFinished)
+
+  def onInterrupt(self, command: Command, interruptor: typing.Optional[Command]):
+    self.endCommand(command, CommandTracer.kInterrupted, interruptor)
+
+  def snapshot(self) -> "TraceSnapshot":
+    """
+    A copy of the spans kept, cheap enough to take from the robot loop.
+    """
+    return TraceSnapshot(
+      array("b", self.kinds),
+      array("i", self.nameIds),
+      array("i", self.causeIds),
+      array("d", self.starts),
+      array("d", self.durations),
+      tuple(self.names),
+      self.index,
+      min(self.count, self.capacity),
+    )
+
+  def toChromeTrace(self, snapshot: typing.Optional["TraceSnapshot"] = None) -> dict:
+    """
+    The spans kept as Chrome trace events. The scheduler's runs are on the first track, then every
+    command has its own track with its lifetimes and its `execute()` calls nested in them.
+    """
+    if snapshot is None:
+      snapshot = self.snapshot()
+    names = snapshot.names
+
+    events: list[dict] = []
+    tracks = set()
+    for kind, nameId, start, duration, causeId in snapshot.spans():
+      event = {
+        "name": names[nameId],
+        "ph": "X",
+        "pid": 1,
+        "tid": nameId,
+        "ts": start * 1e6,
+        "dur": duration * 1e6,
+      }
+      if kind == CommandTracer.kExecute:
+        event["name"] += ".execute()"
+        event["cat"] = "execute"
+      elif kind == CommandTracer.kFinished:
+        event["cat"] = "command"
+        event["args"] = {"end": "finished"}
+      elif kind == CommandTracer.kInterrupted:
+        event["cat"] = "command"
+        event["args"] = {
+          "end": "interrupted",
+          "interruptor": names[causeId] if causeId >= 0 else None,
+        }
+      else:
+        event["cat"] = "scheduler"
+      events.append(event)
+      tracks.add(nameId)
+
+    # Name the tracks, in the order the commands were first seen
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Robot"}})
+    for nameId in sorted(tracks):
+      events.append(
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": nameId, "args": {"name": names[nameId]}}
+      )
+      events.append(
+        {
+          "name": "thread_sort_index",
+          "ph": "M",
+          "pid": 1,
+          "tid": nameId,
+          "args": {"sort_index": nameId},
+        }
+      )
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+  def export(self, path: typing.Union[str, pathlib.Path]):
+    """
+    Writes the spans kept to a Chrome trace JSON file.
+    """
+    CommandTracer.write(path, self.toChromeTrace())
+
+  def exportAsync(
+    self, path: typing.Union[str, pathlib.Path], keep: typing.Optional[int] = None
+  ) -> threading.Thread:
+    """
+    Exports from a background thread, so the robot loop only waits for the spans to be copied.
+
+    :param keep: If given, only this many of the newest traces are kept in the file's folder.
+    """
+    snapshot = self.snapshot()
+
+    def export():
+      CommandTracer.write(path, self.toChromeTrace(snapshot))
+      if keep is not None:
+        CommandTracer.removeOldTraces(pathlib.Path(path).parent, keep)
+
+    thread = threading.Thread(
+      target=export,
+      name="Command Trace Export",
+      daemon=True,
+    )
+    thread.start()
+    return thread
+
+  @staticmethod
+  def write(path: typing.Union[str, pathlib.Path], trace: dict):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+      json.dump(trace, file)
+
+  @staticmethod
+  def removeOldTraces(directory: pathlib.Path, keep: int):
+    """
+    Deletes all but the `keep` most recently written traces (`.json` files) of a folder.
+    """
+    traces = sorted(directory.glob("*.json"), key=lambda trace: trace.stat().st_mtime, reverse=True)
+    for trace in traces[keep:]:
+      trace.unlink(missing_ok=True)
+
+
+class TraceSnapshot(typing.NamedTuple):
+  kinds: array
+  nameIds: array
+  causeIds: array
+  starts: array
+  durations: array
+  names: tuple[str, ...]
+  index: int
+  size: int
+
+  def spans(self) -> typing.Iterator[tuple[int, int, float, float, int]]:
+    """
+    The spans, oldest first, as (kind, name id, start, duration, cause id).
+    """
+    capacity = len(self.kinds)
+    first = (self.index - self.size) % capacity
+    for j in range(self.size):
+      i = (first + j) % capacity
+      yield self.kinds[i], self.nameIds[i], self.starts[i], self.durations[i], self.causeIds[i]
@@ -0,0 +1,132 @@
+import math
+import typing
+
+import wpimath
+from commands2.button import CommandXboxController, Trigger
+from wpilib import DriverStation
+
+from constants import DriverControllerConstants, OperatorControllerConstants, RobotConstants
+
+
+class AxisShaper:
+  """
+  Turns a raw joystick axis into a command: deadband, then expo, then slew rate limit.
+  """
+
+  __slots__ = ("deadband", "expo", "maxStep", "value")
+
+  def __init__(
+    self,
+    deadband: float,
+    expo: float = 0.0,
+    slewRate: float = math.inf,
+    period: float = RobotConstants.kLoopPeriod,
+  ):
+    """
+    :param deadband: Inputs smaller than this are zero, the rest is rescaled to start from zero.
+    :param expo: Blend (0 to 1) between a linear (0) and a cubic (1) response, for finer control
+                 near the center of the stick.
+    :param slewRate: Fastest change of the output, in units per second.
+    :param period: Time (seconds) between two calls to `shape()`.
+    """
+    self.deadband = deadband
+    self.expo = expo
+    self.maxStep = slewRate * period
+    self.value = 0.0
+
+  def shape(self, raw: float) -> float:
+    value = wpimath.applyDeadband(raw, self.deadband)
+    value = (1 - self.expo) * value + self.expo * value * value * value
+
+    # Stops right away: releasing the stick must not be slew limited
+    if value == 0 or abs(value - self.value) <= self.maxStep:
+      self.value = value
+    elif value > self.value:
+      self.value += self.maxStep
+    else:
+      self.value -= self.maxStep
+    return self.value
+
+  def reset(self):
+    self.value = 0.0
+
+
+class ControllerSnapshot(typing.NamedTuple):
+  """
+  Every shaped axis of both controllers for a single loop cycle, in the robot's conventions
+  (forward, left, counterclockwise and up are positive).
+  """
+
+  driveX: float
+  driveY: float
+  driveRotation: float
+  elevator: float
+  pickup: float
+  """Positive to pull a game piece in (left trigger), negative to push it out (right trigger)."""
+
+
+class ControllerInput:
+  """
+  Reads both controllers' axes once per loop into a `ControllerSnapshot`.
+
+  `update()` must run before the command scheduler, so commands and triggers all see the same
+  snapshot. Axis activity is exposed as triggers: manual control commands are then scheduled when
+  a stick leaves its deadband and cancelled when it returns, instead of being polled every loop.
+  """
+
+  def __init__(
+    self, driverController: CommandXboxController, operatorController: CommandXboxController
+  ):
+    self.driver = driverController.getHID()
+    self.operator = operatorController.getHID()
+
+    self.driveXShaper = AxisShaper(
+      DriverControllerConstants.kDriveDeadband,
+      DriverControllerConstants.kDriveExpo,
+      DriverControllerConstants.kDriveSlewRate,
+    )
+    self.driveYShaper = AxisShaper(
+      DriverControllerConstants.kDriveDeadband,
+      DriverControllerConstants.kDriveExpo,
+      DriverControllerConstants.kDriveSlewRate,
+    )
+    self.driveRotationShaper = AxisShaper(
+      DriverControllerConstants.kDriveDeadband,
+      DriverControllerConstants.kRotationExpo,
+      DriverControllerConstants.kRotationSlewRate,
+    )
+    self.elevatorShaper = AxisShaper(
+      OperatorControllerConstants.kElevateDeadband, OperatorControllerConstants.kElevateExpo
+    )
+    self.pickupInShaper = AxisShaper(OperatorControllerConstants.kPickupDeadband)
+    self.pickupOutShaper = AxisShaper(OperatorControllerConstants.kPickupDeadband)
+
+    self.snapshot = ControllerSnapshot(0.0, 0.0, 0.0, 0.0, 0.0)
+
+    # Only in teleop, so a bumped stick can't interrupt an autonomous routine
+    self.elevatorActive = Trigger(
+      lambda: self.snapshot.elevator != 0 and DriverStation.isTeleopEnabled()
+    )
+    self.pickupActive = Trigger(
+      lambda: self.snapshot.pickup != 0 and DriverStation.isTeleopEnabled()
+    )
+
+  def update(self) -> ControllerSnapshot:
+    """
+    Reads and shapes every axis. Call once per loop, before the command scheduler runs.
+    """
+    driver = self.driver
+    operator = self.operator
+
+    pickupIn = self.pickupInShaper.shape(operator.getLeftTriggerAxis())
+    pickupOut = self.pickupOutShaper.shape(operator.getRightTriggerAxis())
+
+    self.snapshot = ControllerSnapshot(
+      self.driveXShaper.shape(-driver.getLeftY()),
+      self.driveYShaper.shape(-driver.getLeftX()),
+      self.driveRotationShaper.shape(-driver.getRightX()),
+      self.elevatorShaper.shape(-operator.getLeftY()),
+      # Pulling in wins when both triggers are pressed
+      pickupIn if pickupIn > 0 else -pickupOut,
+    )
+    return self.snapshot
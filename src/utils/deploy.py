@@ -0,0 +1,17 @@
+"""
+The robot's deploy folder, for the scripts run next to the robot code with `python -m`.
+"""
+
+import pathlib
+import sys
+
+kRobotFile = pathlib.Path(__file__).parent.parent / "robot.py"
+
+
+def useRobotDeployDirectory():
+  """
+  Makes `wpilib.getDeployDirectory()` return the robot's deploy folder. In simulation, WPILib looks
+  for it next to the main module, which is the script instead of robot.py. Call it before anything
+  that reads the deploy folder, including importing PathPlanner's pathfinders.
+  """
+  sys.modules["__main__"].__file__ = str(kRobotFile)
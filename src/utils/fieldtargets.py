@@ -0,0 +1,189 @@
+"""
+Scoring and pickup poses of the field, indexed for nearest target lookups from the robot's pose.
+"""
+
+import enum
+import math
+import typing
+
+from pathplannerlib.util import FlippingUtil
+from wpilib import DriverStation
+from wpimath import units
+from wpimath.geometry import Pose2d, Rotation2d, Transform2d, Translation2d
+
+from constants import FieldConstants, FieldTargetConstants
+
+
+class FieldTarget(typing.NamedTuple):
+  name: str
+  # Where the robot's center should be, facing the target
+  pose: Pose2d
+
+
+class TargetKind(enum.Enum):
+  kReef = enum.auto()
+  kCoralStation = enum.auto()
+
+
+def tagPose(x: float, y: float, degrees: float) -> Pose2d:
+  return Pose2d(units.inchesToMeters(x), units.inchesToMeters(y), Rotation2d.fromDegrees(degrees))
+
+
+def facingTag(tag: Pose2d, lateralOffset: float = 0.0) -> Pose2d:
+  """
+  The robot pose with its bumpers against the tag's wall, facing it.
+
+  :param lateralOffset: Along the wall, positive to the robot's right
+  """
+  return tag.transformBy(
+    Transform2d(FieldTargetConstants.kTargetDistance, lateralOffset, Rotation2d(math.pi))
+  )
+
+
+def blueTargets(kind: TargetKind) -> list[FieldTarget]:
+  if kind == TargetKind.kReef:
+    targets = []
+    for tagId, tag in FieldConstants.kReefTags.items():
+      pose = tagPose(*tag)
+      # The robot's left is the tag's right (negative y), since they face each other
+      targets.append(
+        FieldTarget(f"Reef {tagId} Left", facingTag(pose, -FieldConstants.kReefBranchOffset))
+      )
+      targets.append(
+        FieldTarget(f"Reef {tagId} Right", facingTag(pose, FieldConstants.kReefBranchOffset))
+      )
+    return targets
+
+  return [
+    FieldTarget(f"Coral Station {tagId}", facingTag(tagPose(*tag)))
+    for tagId, tag in FieldConstants.kCoralStationTags.items()
+  ]
+
+
+class TargetIndex:
+  """
+  A lookup table of the targets that can be among the `maxNeighbors` nearest ones, for each cell of
+  a grid over the field.
+
+  For a cell, let R be the `maxNeighbors`-th smallest of the targets' farthest distance to the
+  cell. At least that many targets are within R of any point in the cell, so a target whose
+  closest distance to the cell is beyond R can never be one of the nearest. The few that remain
+  are compared exactly at query time, which makes `nearest()` and `kNearest()` constant time and
+  exact for any position on the field (positions outside of it use the closest cell, so they may
+  not get the exact nearest targets).
+  """
+
+  def __init__(
+    self,
+    targets: typing.Sequence[FieldTarget],
+    cellSize: float = FieldTargetConstants.kCellSize,
+    maxNeighbors: int = FieldTargetConstants.kMaxNeighbors,
+  ):
+    self.targets = tuple(targets)
+    self.cellSize = cellSize
+    self.maxNeighbors = min(maxNeighbors, len(self.targets))
+    self.columns = math.ceil(FieldConstants.kFieldLength / cellSize)
+    self.rows = math.ceil(FieldConstants.kFieldWidth / cellSize)
+
+    self.xs = [target.pose.X() for target in self.targets]
+    self.ys = [target.pose.Y() for target in self.targets]
+    self.candidates: list[tuple[int, ...]] = [
+      self.cellCandidates(column, row) for row in range(self.rows) for column in range(self.columns)
+    ]
+
+  def cellCandidates(self, column: int, row: int) -> tuple[int, ...]:
+    minX, minY = column * self.cellSize, row * self.cellSize
+    maxX, maxY = minX + self.cellSize, minY + self.cellSize
+
+    closest, farthest = [], []
+    for x, y in zip(self.xs, self.ys):
+      dx = max(minX - x, 0.0, x - maxX)
+      dy = max(minY - y, 0.0, y - maxY)
+      closest.append(dx * dx + dy * dy)
+      dx = max(abs(x - minX), abs(x - maxX))
+      dy = max(abs(y - minY), abs(y - maxY))
+      farthest.append(dx * dx + dy * dy)
+
+    radius = sorted(farthest)[self.maxNeighbors - 1]
+    return tuple(i for i, distance in enumerate(closest) if distance <= radius)
+
+  def getCell(self, position: Translation2d) -> int:
+    column = min(max(int(position.X() / self.cellSize), 0), self.columns - 1)
+    row = min(max(int(position.Y() / self.cellSize), 0), self.rows - 1)
+    return row * self.columns + column
+
+  def kNearest(self, position: Translation2d, k: int) -> list[FieldTarget]:
+    """
+    The `k` targets closest to a position, nearest first.
+
+    :param k: At most `maxNeighbors`
+    """
+    if k > self.maxNeighbors:
+      raise ValueError(f"k must be at most {self.maxNeighbors}, got {k}")
+
+    x, y = position.X(), position.Y()
+    candidates = sorted(
+      self.candidates[self.getCell(position)],
+      key=lambda i: (self.xs[i] - x) ** 2 + (self.ys[i] - y) ** 2,
+    )
+    return [self.targets[i] for i in candidates[:k]]
+
+  def nearest(self, position: Translation2d) -> FieldTarget:
+    x, y = position.X(), position.Y()
+    return self.targets[
+      min(
+        self.candidates[self.getCell(position)],
+        key=lambda i: (self.xs[i] - x) ** 2 + (self.ys[i] - y) ** 2,
+      )
+    ]
+
+
+class FieldTargets:
+  """
+  The target indexes of both alliances, the red targets being the blue ones rotated around the
+  center of the field like PathPlanner paths. Each index is built the first time it is used.
+  """
+
+  _instance: typing.Optional["FieldTargets"] = None
+
+  @staticmethod
+  def getInstance() -> "FieldTargets":
+    if FieldTargets._instance is None:
+      FieldTargets._instance = FieldTargets()
+    return FieldTargets._instance
+
+  def __init__(self):
+    self.indexes: dict[tuple[DriverStation.Alliance, TargetKind], TargetIndex] = {}
+
+  def getIndex(
+    self, kind: TargetKind, alliance: typing.Optional[DriverStation.Alliance] = None
+  ) -> TargetIndex:
+    """
+    :param alliance: The robot's alliance by default, blue if it isn't known yet
+    """
+    if alliance is None:
+      alliance = DriverStation.getAlliance() or DriverStation.Alliance.kBlue
+
+    index = self.indexes.get((alliance, kind))
+    if index is None:
+      targets = blueTargets(kind)
+      if alliance == DriverStation.Alliance.kRed:
+        targets = [
+          FieldTarget(target.name, FlippingUtil.flipFieldPose(target.pose)) for target in targets
+        ]
+      index = self.indexes[(alliance, kind)] = TargetIndex(targets)
+    return index
+
+  def buildAll(self):
+    """
+    Builds every index that isn't yet, so the first lookup of a match doesn't have to.
+    """
+    for alliance in (DriverStation.Alliance.kBlue, DriverStation.Alliance.kRed):
+      for kind in TargetKind:
+        self.getIndex(kind, alliance)
+
+  def nearest(self, kind: TargetKind, position: Translation2d) -> FieldTarget:
+    return self.getIndex(kind).nearest(position)
+
+  def kNearest(self, kind: TargetKind, position: Translation2d, k: int) -> list[FieldTarget]:
+    return self.getIndex(kind).kNearest(position, k)
@@ -0,0 +1,102 @@
+import gc
+import time
+
+from constants import GarbageCollectorConstants, RobotConstants
+from utils.telemetry import Priority, Telemetry
+
+
+class GarbageCollector:
+  """
+  Keeps Python's garbage collector out of the enabled robot loop.
+
+  CPython collects whenever the objects it tracks (lists, dicts, closures... but not wpimath's
+  objects, which can't be in reference cycles) outnumber the ones freed by 700. That happens in
+  whatever code allocates next, in any thread, and a full collection takes milliseconds on the
+  roboRIO.
+
+  While enabled, automatic collections are off. The young generation is collected at the end of a
+  loop with time to spare, once enough objects piled up (or whatever the time left, past
+  `maxPending`). Everything is collected when the robot is disabled, and `freeze()` moves what
+  startup created out of the collector's way for good.
+  """
+
+  def __init__(
+    self,
+    enabled: bool = GarbageCollectorConstants.kEnabled,
+    youngThreshold: int = GarbageCollectorConstants.kYoungThreshold,
+    maxPending: int = GarbageCollectorConstants.kMaxPending,
+    idleMargin: float = GarbageCollectorConstants.kIdleMargin,
+    period: float = RobotConstants.kLoopPeriod,
+  ):
+    """
+    :param enabled: Whether to control the collector at all.
+    :param youngThreshold: Pending objects before a young collection at the end of a loop.
+    :param maxPending: Pending objects before a young collection even with no time left.
+    :param idleMargin: Time (seconds) that must be left in the loop for a young collection.
+    :param period: Time (seconds) between two loops.
+    """
+    self.enabled = enabled
+    self.youngThreshold = youngThreshold
+    self.maxPending = maxPending
+    self.latestStart = period - idleMargin
+
+    self.collections = 0
+    self.forcedCollections = 0
+    self.maxCollectionTime = 0.0
+
+    telemetry = Telemetry.getInstance()
+    self.pendingTelemetry = telemetry.addDouble("GC/Pending Objects", Priority.kLow)
+    self.collectionsTelemetry = telemetry.addDouble("GC/Young Collections", Priority.kLow)
+    self.collectionTimeTelemetry = telemetry.addDouble("GC/Max Collection Time", Priority.kLow)
+
+  def freeze(self):
+    """
+    Collects everything, then moves every object still alive to a generation that is never
+    collected. Call it once startup is done.
+    """
+    if not self.enabled:
+      return
+
+    gc.collect()
+    gc.freeze()
+
+  def robotEnabled(self):
+    if self.enabled:
+      gc.disable()
+
+  def robotDisabled(self):
+    """
+    Collects everything and turns automatic collections back on.
+    """
+    if not self.enabled:
+      return
+
+    gc.enable()
+    gc.collect()
+
+  def periodic(self, elapsed: float):
+    """
+    Collects the young generation if it is due and the loop has time left. Should be called once
+    at the end of every loop.
+
+    :param elapsed: Time (seconds) since the start of the loop.
+    """
+    if gc.isenabled():
+      return
+
+    pending = gc.get_count()[0]
+    self.pendingTelemetry.set(pending)
+    if pending < self.youngThreshold:
+      return
+    if elapsed > self.latestStart:
+      if pending < self.maxPending:
+        return
+      self.forcedCollections += 1
+
+    start = time.perf_counter()
+    gc.collect(0)
+    self.maxCollectionTime = max(self.maxCollectionTime, time.perf_counter() - start)
+    self.collections += 1
+
+    self.collectionsTelemetry.set(self.collections)
+    self.collectionTimeTelemetry.set(self.maxCollectionTime * 1000)
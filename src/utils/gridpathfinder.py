@@ -0,0 +1,524 @@
+import heapq
+import json
+import math
+import pathlib
+import threading
+import typing
+from array import array
+
+import wpilib
+from pathplannerlib.path import GoalEndState, PathConstraints, PathPlannerPath, Waypoint
+from pathplannerlib.pathfinders import Pathfinder
+from wpimath.geometry import Pose2d, Translation2d
+
+from constants import PathfinderConstants
+
+# The 8-connected distance overestimates the straight line distance by at most this factor
+kOctileOverestimate = math.sqrt(4 - 2 * math.sqrt(2))
+
+
+class NavGrid:
+  """
+  PathPlanner's navigation grid (`deploy/pathplanner/navgrid.json`), with one bit per cell.
+
+  Cells are indexed row by row (`row * columns + column`), row 0 being the bottom of the field.
+  Besides the static obstacles from the file, dynamic obstacles (ex: other robots) can be added.
+  A clearance field (distance from each cell to the closest obstacle) is kept up to date: adding
+  obstacles only lowers the distances around them, removing some recomputes it.
+  """
+
+  def __init__(
+    self,
+    columns: int,
+    rows: int,
+    nodeSize: float,
+    fieldLength: float,
+    fieldWidth: float,
+    obstacles: typing.Iterable[int],
+  ):
+    """
+    :param nodeSize: Size (meters) of a cell.
+    :param obstacles: Indices of the cells that can't be driven through.
+    """
+    self.columns = columns
+    self.rows = rows
+    self.cellCount = columns * rows
+    self.nodeSize = nodeSize
+    self.fieldLength = fieldLength
+    self.fieldWidth = fieldWidth
+
+    self.staticBits = bytearray((self.cellCount + 7) // 8)
+    for cell in obstacles:
+      self.staticBits[cell >> 3] |= 1 << (cell & 7)
+    self.dynamicBits = bytearray(len(self.staticBits))
+    # Static and dynamic obstacles, which is what the pathfinder reads
+    self.blockedBits = bytearray(self.staticBits)
+
+    # (neighbor, distance in cells, and for diagonals the two cells whose corner is cut)
+    self.neighbors: list[tuple[tuple[int, float, int, int], ...]] = [
+      self.findNeighbors(cell) for cell in range(self.cellCount)
+    ]
+
+    self.clearance = array("d", [math.inf]) * self.cellCount
+    self.updateClearance(self.blockedCells(), reset=True)
+
+  @staticmethod
+  def fromFile(file: pathlib.Path) -> "NavGrid":
+    navgrid = json.loads(file.read_text())
+    grid = navgrid["grid"]
+    columns = len(grid[0])
+    return NavGrid(
+      columns,
+      len(grid),
+      float(navgrid["nodeSizeMeters"]),
+      navgrid["field_size"]["x"],
+      navgrid["field_size"]["y"],
+      (
+        row * columns + column
+        for row, values in enumerate(grid)
+        for column, blocked in enumerate(values)
+        if blocked
+      ),
+    )
+
+  @staticmethod
+  def fromDeploy() -> "NavGrid":
+    return NavGrid.fromFile(pathlib.Path(wpilib.getDeployDirectory()) / "pathplanner/navgrid.json")
+
+  def findNeighbors(self, cell: int) -> tuple[tuple[int, float, int, int], ...]:
+    columns = self.columns
+    column, row = cell % columns, cell // columns
+    neighbors = []
+    for dx in (-1, 0, 1):
+      for dy in (-1, 0, 1):
+        x, y = column + dx, row + dy
+        if (dx or dy) and 0 <= x < columns and 0 <= y < self.rows:
+          if dx and dy:
+            neighbors.append(
+              (y * columns + x, math.sqrt(2), row * columns + x, y * columns + column)
+            )
+          else:
+            neighbors.append((y * columns + x, 1.0, -1, -1))
+    return tuple(neighbors)
+
+  ### Cells ###
+
+  def isBlocked(self, cell: int) -> bool:
+    return bool(self.blockedBits[cell >> 3] >> (cell & 7) & 1)
+
+  def blockedCells(self) -> list[int]:
+    return [cell for cell in range(self.cellCount) if self.isBlocked(cell)]
+
+  def getCell(self, position: Translation2d) -> int:
+    """
+    Cell containing a field position, clamped to the grid.
+    """
+    column = min(max(int(position.X() / self.nodeSize), 0), self.columns - 1)
+    row = min(max(int(position.Y() / self.nodeSize), 0), self.rows - 1)
+    return row * self.columns + column
+
+  def getCellCenter(self, cell: int) -> Translation2d:
+    return Translation2d(
+      (cell % self.columns + 0.5) * self.nodeSize, (cell // self.columns + 0.5) * self.nodeSize
+    )
+
+  def findClosestFreeCell(self, cell: int) -> typing.Optional[int]:
+    """
+    The cell itself if it is free, otherwise the closest free cell (breadth first).
+    """
+    if not self.isBlocked(cell):
+      return cell
+
+    visited = {cell}
+    queue = [cell]
+    for current in queue:
+      for neighbor, _, _, _ in self.neighbors[current]:
+        if neighbor in visited:
+          continue
+        if not self.isBlocked(neighbor):
+          return neighbor
+        visited.add(neighbor)
+        queue.append(neighbor)
+    return None
+
+  ### Obstacles ###
+
+  def setDynamicObstacles(
+    self, boxes: typing.Iterable[tuple[Translation2d, Translation2d]]
+  ) -> list[int]:
+    """
+    Replaces the dynamic obstacles and returns the cells that became blocked.
+
+    :param boxes: Opposite corners of each obstacle's bounding box.
+    """
+    dynamicBits = bytearray(len(self.staticBits))
+    for corner1, corner2 in boxes:
+      cell1, cell2 = self.getCell(corner1), self.getCell(corner2)
+      columns = self.columns
+      for row in range(min(cell1, cell2) // columns, max(cell1, cell2) // columns + 1):
+        for column in range(
+          min(cell1 % columns, cell2 % columns), max(cell1 % columns, cell2 % columns) + 1
+        ):
+          cell = row * columns + column
+          dynamicBits[cell >> 3] |= 1 << (cell & 7)
+
+    blockedBits = bytearray(
+      static | dynamic for static, dynamic in zip(self.staticBits, dynamicBits)
+    )
+    added = [
+      cell
+      for cell in range(self.cellCount)
+      if blockedBits[cell >> 3] >> (cell & 7) & 1 and not self.isBlocked(cell)
+    ]
+    removed = any(previous & ~current for previous, current in zip(self.blockedBits, blockedBits))
+
+    self.dynamicBits = dynamicBits
+    self.blockedBits = blockedBits
+    if removed:
+      self.updateClearance(self.blockedCells(), reset=True)
+    elif added:
+      self.updateClearance(added, reset=False)
+    return added
+
+  def updateClearance(self, sources: list[int], reset: bool):
+    """
+    Dijkstra from the obstacle cells. Only lowers distances unless `reset`, which is exact when
+    obstacles were only added.
+    """
+    distances = array("d", [math.inf]) * self.cellCount if reset else array("d", self.clearance)
+    queue = []
+    for cell in sources:
+      distances[cell] = 0.0
+      queue.append((0.0, cell))
+    heapq.heapify(queue)
+
+    neighbors = self.neighbors
+    while queue:
+      distance, cell = heapq.heappop(queue)
+      if distance > distances[cell]:
+        continue
+      for neighbor, cost, _, _ in neighbors[cell]:
+        newDistance = distance + cost
+        if newDistance < distances[neighbor]:
+          distances[neighbor] = newDistance
+          heapq.heappush(queue, (newDistance, neighbor))
+
+    self.clearance = distances
+
+  def getClearance(self, cell: int) -> float:
+    """
+    Lower bound of the distance (meters) from the cell's center to the closest obstacle's center.
+    """
+    return self.clearance[cell] / kOctileOverestimate * self.nodeSize
+
+  def lineOfSight(self, start: int, end: int) -> bool:
+    """
+    Whether the straight line between two cell centers only crosses free cells.
+    """
+    columns = self.columns
+    x, y = start % columns, start // columns
+    endX, endY = end % columns, end // columns
+    dx, dy = abs(endX - x), abs(endY - y)
+
+    # The line stays in the obstacle free circle around the start
+    if math.hypot(dx, dy) < self.clearance[start] / kOctileOverestimate - math.sqrt(2):
+      return True
+
+    stepX = 1 if endX > x else -1
+    stepY = columns if endY > y else -columns
+    cell = start
+    blockedBits = self.blockedBits
+    error = dx - dy
+    dx *= 2
+    dy *= 2
+    remaining = dx // 2 + dy // 2
+    while remaining > 0:
+      if error > 0:
+        cell += stepX
+        error -= dy
+      elif error < 0:
+        cell += stepY
+        error += dx
+      else:
+        # Exactly through a corner, neither cell around it may be blocked
+        side1 = cell + stepX
+        side2 = cell + stepY
+        if blockedBits[side1 >> 3] >> (side1 & 7) & 1 or blockedBits[side2 >> 3] >> (side2 & 7) & 1:
+          return False
+        cell += stepX + stepY
+        error += dx - dy
+        remaining -= 1
+      remaining -= 1
+      if blockedBits[cell >> 3] >> (cell & 7) & 1:
+        return False
+    return True
+
+
+class GridPathfinder(Pathfinder):
+  """
+  Lazy Theta* pathfinder over a `NavGrid`, used by PathPlanner's pathfinding commands
+  (`AutoBuilder.pathfindToPose()`, ...) once set with `Pathfinding.setPathfinder()`.
+
+  Theta* searches the grid like A*, but connects each cell to its parent's parent when it can see
+  it, so paths are straight lines between obstacle corners instead of grid steps. Cells close to
+  an obstacle cost a little more, which keeps paths away from walls when there is room.
+
+  Planning happens on a background thread that sleeps until a new start, goal or obstacle
+  invalidates the current path. Dynamic obstacles that don't cross the current path don't
+  trigger a new plan.
+  """
+
+  def __init__(self, grid: NavGrid):
+    self.grid = grid
+
+    self.condition = threading.Condition()
+    self.requestId = 0
+    self.plannedId = 0
+    self.start = Translation2d()
+    self.goal = Translation2d()
+    self.startCell = -1
+    self.pendingObstacles: typing.Optional[
+      tuple[list[tuple[Translation2d, Translation2d]], Translation2d]
+    ] = None
+
+    self.path: list[Translation2d] = []
+    self.waypoints: list[Waypoint] = []
+    self.newPathAvailable = False
+
+    self.thread = threading.Thread(target=self.run, name="Pathfinder", daemon=True)
+    self.thread.start()
+
+  ### Pathfinder ###
+
+  def isNewPathAvailable(self) -> bool:
+    return self.newPathAvailable
+
+  def getCurrentPath(
+    self, constraints: PathConstraints, goal_end_state: GoalEndState
+  ) -> typing.Optional[PathPlannerPath]:
+    with self.condition:
+      waypoints = self.waypoints
+      self.newPathAvailable = False
+
+    if len(waypoints) < 2:
+      return None
+    return PathPlannerPath(waypoints, constraints, None, goal_end_state)
+
+  def setStartPosition(self, start_position: Translation2d) -> None:
+    cell = self.grid.getCell(start_position)
+    with self.condition:
+      if cell == self.startCell:
+        return
+      self.startCell = cell
+      self.start = start_position
+      self.request()
+
+  def setGoalPosition(self, goal_position: Translation2d) -> None:
+    with self.condition:
+      self.goal = goal_position
+      self.request()
+
+  def setDynamicObstacles(
+    self, obs: list[tuple[Translation2d, Translation2d]], current_robot_pos: Translation2d
+  ) -> None:
+    # Applied by the planning thread, the only one that touches the grid
+    with self.condition:
+      self.pendingObstacles = (list(obs), current_robot_pos)
+      self.condition.notify()
+
+  ### Planning thread ###
+
+  def request(self):
+    # Called with the lock held
+    self.requestId += 1
+    self.newPathAvailable = False
+    self.condition.notify()
+
+  def run(self):
+    while True:
+      with self.condition:
+        self.condition.wait_for(
+          lambda: self.requestId != self.plannedId or self.pendingObstacles is not None
+        )
+        pendingObstacles = self.pendingObstacles
+        self.pendingObstacles = None
+
+      if pendingObstacles is not None:
+        self.applyObstacles(*pendingObstacles)
+
+      with self.condition:
+        if self.requestId == self.plannedId:
+          continue
+        requestId = self.requestId
+        start = self.start
+        goal = self.goal
+
+      path = self.plan(start, goal)
+      waypoints = GridPathfinder.createWaypoints(path)
+
+      with self.condition:
+        self.plannedId = requestId
+        # A newer request would make this path outdated, it is planned again right away
+        if requestId == self.requestId:
+          self.path = path
+          self.waypoints = waypoints
+          self.newPathAvailable = True
+
+  def applyObstacles(
+    self, boxes: list[tuple[Translation2d, Translation2d]], robotPosition: Translation2d
+  ):
+    added = self.grid.setDynamicObstacles(boxes)
+    if not added or not self.path or not self.crossesPath(set(added)):
+      return
+
+    # Plan again from where the robot is now
+    with self.condition:
+      self.startCell = self.grid.getCell(robotPosition)
+      self.start = robotPosition
+      self.request()
+
+  def crossesPath(self, cells: set[int]) -> bool:
+    grid = self.grid
+    path = [grid.getCell(point) for point in self.path]
+    for start, end in zip(path, path[1:]):
+      if start in cells or end in cells or not grid.lineOfSight(start, end):
+        return True
+    return False
+
+  def plan(self, start: Translation2d, goal: Translation2d) -> list[Translation2d]:
+    """
+    Shortest path (corners only) from start to goal. Empty if there is none.
+    """
+    grid = self.grid
+    startCell = grid.findClosestFreeCell(grid.getCell(start))
+    goalCell = grid.findClosestFreeCell(grid.getCell(goal))
+    if startCell is None or goalCell is None:
+      return []
+
+    if startCell == goalCell:
+      return [start, goal]
+
+    cells = self.search(startCell, goalCell)
+    if not cells:
+      return []
+
+    path = [grid.getCellCenter(cell) for cell in cells]
+    # The real positions replace the centers of their cells
+    path[0] = start
+    path[-1] = goal
+    return path
+
+  def search(self, startCell: int, goalCell: int) -> list[int]:
+    """
+    Lazy Theta* from `startCell` to `goalCell`. Returns the path's cells, empty if there is none.
+
+    Every cell is first assumed to be visible from its parent's parent. That is only checked when
+    the cell is expanded (most queued cells never are), falling back to its best expanded
+    neighbor when it isn't visible.
+    """
+    grid = self.grid
+    columns = grid.columns
+    neighbors = grid.neighbors
+    blockedBits = grid.blockedBits
+    clearance = grid.clearance
+    lineOfSight = grid.lineOfSight
+
+    # Clearance penalty, in cells
+    minClearance = PathfinderConstants.kClearance / grid.nodeSize
+    penaltyWeight = PathfinderConstants.kClearanceWeight
+    goalX, goalY = goalCell % columns, goalCell // columns
+
+    cost = array("d", [math.inf]) * grid.cellCount
+    parent = array("i", [-1]) * grid.cellCount
+    closed = bytearray(grid.cellCount)
+
+    cost[startCell] = 0.0
+    parent[startCell] = startCell
+    queue = [(math.hypot(startCell % columns - goalX, startCell // columns - goalY), startCell)]
+
+    while queue:
+      _, cell = heapq.heappop(queue)
+      if closed[cell]:
+        continue
+
+      cellParent = parent[cell]
+      if not lineOfSight(cellParent, cell):
+        # Through the best expanded neighbor instead (the one that queued it is one of them)
+        cellClearance = clearance[cell]
+        penalty = (
+          penaltyWeight * (minClearance - cellClearance) if cellClearance < minClearance else 0.0
+        )
+        cost[cell] = math.inf
+        for neighbor, stepCost, corner1, corner2 in neighbors[cell]:
+          if not closed[neighbor] or (
+            corner1 >= 0
+            and (
+              blockedBits[corner1 >> 3] >> (corner1 & 7) & 1
+              or blockedBits[corner2 >> 3] >> (corner2 & 7) & 1
+            )
+          ):
+            continue
+          newCost = cost[neighbor] + stepCost + penalty
+          if newCost < cost[cell]:
+            cost[cell] = newCost
+            cellParent = parent[cell] = neighbor
+
+      if cell == goalCell:
+        break
+      closed[cell] = 1
+
+      parentCost = cost[cellParent]
+      parentX, parentY = cellParent % columns, cellParent // columns
+      for neighbor, _, corner1, corner2 in neighbors[cell]:
+        if closed[neighbor] or blockedBits[neighbor >> 3] >> (neighbor & 7) & 1:
+          continue
+        if corner1 >= 0 and (
+          blockedBits[corner1 >> 3] >> (corner1 & 7) & 1
+          or blockedBits[corner2 >> 3] >> (corner2 & 7) & 1
+        ):
+          continue
+
+        neighborX, neighborY = neighbor % columns, neighbor // columns
+        neighborClearance = clearance[neighbor]
+        penalty = (
+          penaltyWeight * (minClearance - neighborClearance)
+          if neighborClearance < minClearance
+          else 0.0
+        )
+
+        # Straight from this cell's parent, checked once the neighbor is expanded
+        newCost = parentCost + math.hypot(neighborX - parentX, neighborY - parentY) + penalty
+        if newCost < cost[neighbor]:
+          cost[neighbor] = newCost
+          parent[neighbor] = cellParent
+          heapq.heappush(
+            queue, (newCost + math.hypot(neighborX - goalX, neighborY - goalY), neighbor)
+          )
+
+    if parent[goalCell] < 0:
+      return []
+
+    cells = [goalCell]
+    while cells[-1] != startCell:
+      cells.append(parent[cells[-1]])
+    cells.reverse()
+    return cells
+
+  @staticmethod
+  def createWaypoints(path: list[Translation2d]) -> list[Waypoint]:
+    """
+    Rounds every corner of the path, the same way PathPlanner's own pathfinder does.
+    """
+    if len(path) < 2 or (len(path) == 2 and path[0].distance(path[1]) < 1e-6):
+      return []
+
+    anchor = PathfinderConstants.kSmoothingAnchor
+    poses = [Pose2d(path[0], (path[1] - path[0]).angle())]
+    for previous, current, following in zip(path, path[1:], path[2:]):
+      anchor1 = (current - previous) * anchor + previous
+      anchor2 = (current - following) * anchor + following
+      poses.append(Pose2d(anchor1, (current - previous).angle()))
+      poses.append(Pose2d(anchor2, (following - anchor2).angle()))
+    poses.append(Pose2d(path[-1], (path[-1] - path[-2]).angle()))
+
+    return PathPlannerPath.waypointsFromPoses(poses)
@@ -0,0 +1,218 @@
+import typing
+
+import wpilib
+from wpilib import DataLogManager, DriverStation, RobotController
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import SwerveModulePosition, SwerveModuleState
+from wpiutil.log import (
+  BooleanLogEntry,
+  DataLog,
+  DoubleArrayLogEntry,
+  DoubleLogEntry,
+  IntegerLogEntry,
+)
+
+from constants import InputLogConstants
+
+if typing.TYPE_CHECKING:
+  from subsystems.DriveSnapshot import DriveSnapshot, OdometrySample
+  from subsystems.EdgeCapture import Edge
+  from utils.powermanager import PowerSample
+
+
+class InputLog:
+  """
+  Writes every hardware input read during a loop cycle to the robot's data log (`.wpilog`).
+
+  The data log is written to disk by WPILib's background writer thread, so logging only copies
+  values into a buffer. Joysticks and driver station state are logged by WPILib itself
+  (`DriverStation.startDataLog()`).
+
+  Every record of a cycle follows, and has the timestamp of, the cycle's `Inputs/Cycle` record,
+  which is how `simulation.replay` groups them back into cycles. Values are stored as plain
+  doubles and double arrays (see the `encode`/`decode` helpers) so they can also be read by
+  AdvantageScope.
+  """
+
+  # Values per odometry sample: [timestamp, gyro, *positions]
+  kOdometrySampleLength = 10
+  # Values per digital input edge: [timestamp, rising, position, velocity]
+  kEdgeLength = 4
+
+  _instance: typing.Optional["InputLog"] = None
+
+  @staticmethod
+  def getInstance() -> "InputLog":
+    if InputLog._instance is None:
+      InputLog._instance = InputLog(InputLog.startDataLog() if wpilib.RobotBase.isReal() else None)
+    return InputLog._instance
+
+  @staticmethod
+  def startDataLog(directory: str = "") -> DataLog:
+    """
+    Starts WPILib's data log, along with driver station and joystick logging.
+
+    :param directory: Where to write the log. By default a USB drive when one is plugged into the
+                      roboRIO, /home/lvuser/logs otherwise.
+    """
+    DataLogManager.start(directory, period=InputLogConstants.kFlushPeriod)
+    DataLogManager.logNetworkTables(InputLogConstants.kLogNetworkTables)
+    log = DataLogManager.getLog()
+    DriverStation.startDataLog(log, True)
+    return log
+
+  def __init__(self, log: typing.Optional[DataLog]):
+    """
+    :param log: Data log to write to. Nothing is logged when `None` (simulation, replay).
+    """
+    self.log = log
+    self.cycle = 0
+    self.timestamp = 0  # microseconds
+    self.booleanEntries: dict[str, BooleanLogEntry] = {}
+    self.edgeEntries: dict[str, DoubleArrayLogEntry] = {}
+    self.visionFrameEntries: dict[str, DoubleArrayLogEntry] = {}
+
+    if log is None:
+      return
+
+    self.cycleEntry = IntegerLogEntry(log, "Inputs/Cycle")
+    self.driveTimestampEntry = DoubleLogEntry(log, "Inputs/Drive/Timestamp")
+    self.gyroEntry = DoubleLogEntry(log, "Inputs/Drive/Gyro")
+    self.gyroRateEntry = DoubleLogEntry(log, "Inputs/Drive/Gyro Rate")
+    self.positionsEntry = DoubleArrayLogEntry(log, "Inputs/Drive/Positions")
+    self.statesEntry = DoubleArrayLogEntry(log, "Inputs/Drive/States")
+    self.odometryEntry = DoubleArrayLogEntry(log, "Inputs/Drive/Odometry")
+    self.redAllianceEntry = BooleanLogEntry(log, "Inputs/DS/Red Alliance")
+    self.powerEntry = DoubleArrayLogEntry(log, "Inputs/Power")
+    self.poseEntry = DoubleArrayLogEntry(log, "Outputs/Drive/Pose")
+
+  def beginCycle(self):
+    """
+    Starts a new cycle. Should be called once per loop, before any subsystem reads its inputs.
+    """
+    if self.log is None:
+      return
+
+    self.cycle += 1
+    self.timestamp = RobotController.getFPGATime()
+    self.cycleEntry.append(self.cycle, self.timestamp)
+    self.redAllianceEntry.update(
+      DriverStation.getAlliance() == DriverStation.Alliance.kRed, self.timestamp
+    )
+
+  def logSnapshot(self, snapshot: "DriveSnapshot"):
+    if self.log is None:
+      return
+
+    timestamp = self.timestamp
+    self.driveTimestampEntry.append(snapshot.timestamp, timestamp)
+    self.gyroEntry.append(snapshot.gyroRotation.radians(), timestamp)
+    self.gyroRateEntry.append(snapshot.yawRate, timestamp)
+    self.positionsEntry.append(InputLog.encodePositions(snapshot.positions), timestamp)
+    self.statesEntry.append(InputLog.encodeStates(snapshot.states), timestamp)
+
+  def logOdometry(self, samples: typing.Sequence["OdometrySample"]):
+    if self.log is None:
+      return
+
+    values = []
+    for sample in samples:
+      values.append(sample.timestamp)
+      values.append(sample.gyroRotation.radians())
+      values.extend(InputLog.encodePositions(sample.positions))
+    self.odometryEntry.append(values, self.timestamp)
+
+  def logVisionFrames(self, camera: str, frames: typing.Sequence[typing.Any]):
+    """
+    Logs a camera's frames under `Inputs/Vision/<camera>/Frame`.
+
+    :param frames: Frames with a `value` (botpose array) and `time` (microseconds).
+    """
+    if self.log is None:
+      return
+
+    entry = self.visionFrameEntries.get(camera)
+    if entry is None:
+      entry = self.visionFrameEntries[camera] = DoubleArrayLogEntry(
+        self.log, f"Inputs/Vision/{camera}/Frame"
+      )
+    for frame in frames:
+      entry.append([float(frame.time), *frame.value], self.timestamp)
+
+  def logBoolean(self, name: str, value: bool):
+    """
+    Logs a digital input (ex: a limit switch) under `Inputs/<name>`.
+    """
+    if self.log is None:
+      return
+
+    entry = self.booleanEntries.get(name)
+    if entry is None:
+      entry = self.booleanEntries[name] = BooleanLogEntry(self.log, "Inputs/" + name)
+    entry.append(value, self.timestamp)
+
+  def logEdges(self, name: str, edges: typing.Sequence["Edge"]):
+    """
+    Logs the edges of a digital input captured since the last cycle under `Inputs/<name>`.
+    """
+    if self.log is None or not edges:
+      return
+
+    entry = self.edgeEntries.get(name)
+    if entry is None:
+      entry = self.edgeEntries[name] = DoubleArrayLogEntry(self.log, "Inputs/" + name)
+    values = []
+    for edge in edges:
+      values.extend((edge.timestamp, float(edge.rising), edge.position, edge.velocity))
+    entry.append(values, self.timestamp)
+
+  def logPower(self, sample: "PowerSample"):
+    """
+    Logs the battery voltage, total current and brownout state as [voltage, current, browned out].
+    """
+    if self.log is None:
+      return
+
+    self.powerEntry.append(
+      [sample.voltage, sample.current, float(sample.brownedOut)], self.timestamp
+    )
+
+  def logPose(self, pose: Pose2d):
+    """
+    Logs the pose estimate computed from this cycle's inputs, to compare with a replay.
+    """
+    if self.log is None:
+      return
+
+    self.poseEntry.append([pose.X(), pose.Y(), pose.rotation().radians()], self.timestamp)
+
+  ### Encoding ###
+  # Module tuples are flattened as [distance or speed, angle (radians)] * 4
+
+  @staticmethod
+  def encodePositions(positions: typing.Sequence[SwerveModulePosition]) -> list[float]:
+    values = []
+    for position in positions:
+      values.append(position.distance)
+      values.append(position.angle.radians())
+    return values
+
+  @staticmethod
+  def decodePositions(values: typing.Sequence[float]) -> tuple[SwerveModulePosition, ...]:
+    return tuple(
+      SwerveModulePosition(values[i], Rotation2d(values[i + 1])) for i in range(0, len(values), 2)
+    )
+
+  @staticmethod
+  def encodeStates(states: typing.Sequence[SwerveModuleState]) -> list[float]:
+    values = []
+    for state in states:
+      values.append(state.speed)
+      values.append(state.angle.radians())
+    return values
+
+  @staticmethod
+  def decodeStates(values: typing.Sequence[float]) -> tuple[SwerveModuleState, ...]:
+    return tuple(
+      SwerveModuleState(values[i], Rotation2d(values[i + 1])) for i in range(0, len(values), 2)
+    )
@@ -0,0 +1,33 @@
+import typing
+
+T = typing.TypeVar("T")
+
+
+class LazyClassAttribute(typing.Generic[T]):
+  """
+  Class attribute built by a function the first time it is read, then cached.
+
+  Used in `config.py` so that reading `Config.ElevatorSubsystem.leftMotorConfig` still works, but
+  configs are only built when a subsystem actually needs them instead of on import.
+
+  Usage:
+
+    class Configs:
+      @LazyClassAttribute
+      def motorConfig(cls) -> SparkBaseConfig:
+        return SparkBaseConfig().smartCurrentLimit(40)
+  """
+
+  def __init__(self, build: typing.Callable[[type], T]):
+    self.build = build
+    self.name = build.__name__
+    self.__doc__ = build.__doc__
+
+  def __set_name__(self, owner: type, name: str):
+    self.name = name
+
+  def __get__(self, instance: typing.Any, owner: type) -> T:
+    value = self.build(owner)
+    # Replaces this descriptor so later reads are plain attribute lookups
+    setattr(owner, self.name, value)
+    return value
@@ -0,0 +1,176 @@
+import functools
+import sys
+import time
+from array import array
+
+from ntcore import NetworkTableInstance
+
+from constants import LoopTimerConstants
+
+
+class PhaseTimer:
+  """
+  Rolling timing window for a single phase of the robot loop.
+
+  A phase may be started and stopped several times per loop (ex: two different dashboard
+  updates). Those times are added together and recorded as a single sample when the owning
+  `LoopTimer` commits the loop.
+
+  While `sampling` is set (see `RetentionMonitor`), it also counts the memory blocks (roughly,
+  objects) each call leaves allocated into `blocks`.
+  """
+
+  __slots__ = (
+    "name",
+    "budget",
+    "samples",
+    "index",
+    "count",
+    "overruns",
+    "startTime",
+    "accumulated",
+    "calls",
+    "sampling",
+    "startBlocks",
+    "blocks",
+  )
+
+  def __init__(self, name: str, budget: float, windowSize: int):
+    """
+    :param name: Name the phase is published under.
+    :param budget: Time (seconds) the phase may take per loop before counting as an overrun.
+    :param windowSize: Number of loops kept in the rolling window.
+    """
+    self.name = name
+    self.budget = budget
+    self.samples = array("d", bytes(8 * windowSize))
+    self.index = 0
+    self.count = 0
+    self.overruns = 0
+
+    self.startTime = 0.0
+    self.accumulated = 0.0
+    self.calls = 0
+
+    self.sampling = False
+    self.startBlocks = 0
+    self.blocks = 0
+
+  def start(self):
+    # Blocks are counted outside of the timed part, counting them takes a while
+    if self.sampling:
+      self.startBlocks = sys.getallocatedblocks()
+    self.startTime = time.perf_counter()
+
+  def stop(self):
+    self.accumulated += time.perf_counter() - self.startTime
+    self.calls += 1
+    if self.sampling:
+      self.blocks += sys.getallocatedblocks() - self.startBlocks
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *exc):
+    self.stop()
+    return False
+
+  def commit(self):
+    """
+    Records the time accumulated this loop as one sample. Phases that did not run are skipped.
+    """
+    if self.calls == 0:
+      return
+
+    elapsed = self.accumulated
+    self.samples[self.index] = elapsed
+    self.index = (self.index + 1) % len(self.samples)
+    self.count += 1
+    if elapsed > self.budget:
+      self.overruns += 1
+
+    self.accumulated = 0.0
+    self.calls = 0
+
+  def statistics(self) -> tuple[float, float, float]:
+    """
+    Returns the (p50, p99, max) of the rolling window, in seconds.
+    """
+    size = min(self.count, len(self.samples))
+    if size == 0:
+      return (0.0, 0.0, 0.0)
+
+    window = sorted(self.samples[:size])
+    return (window[size // 2], window[min(size - 1, (size * 99) // 100)], window[-1])
+
+
+class LoopTimer:
+  """
+  Times the phases of the robot loop and publishes p50/p99/max and overrun counts to
+  NetworkTables at a low rate. Cheap enough to be left on during matches.
+
+  Every phase is published to `/LoopTimer/<phase>` as `[p50 (ms), p99 (ms), max (ms), overruns]`.
+  """
+
+  def __init__(
+    self,
+    tableName: str = LoopTimerConstants.kTableName,
+    windowSize: int = LoopTimerConstants.kWindowSize,
+    publishPeriod: int = LoopTimerConstants.kPublishPeriodLoops,
+  ):
+    self.table = NetworkTableInstance.getDefault().getTable(tableName)
+    self.windowSize = windowSize
+    self.publishPeriod = publishPeriod
+
+    self.phases: list[PhaseTimer] = []
+    self.publishers = []
+    self.loopCount = 0
+
+  def addPhase(self, name: str, budget: float) -> PhaseTimer:
+    """
+    Creates a new phase and pre-resolves the topic it is published to.
+
+    :param name: Name of the phase.
+    :param budget: Time (seconds) the phase may take per loop before counting as an overrun.
+    """
+    phase = PhaseTimer(name, budget, self.windowSize)
+    self.phases.append(phase)
+    self.publishers.append(self.table.getDoubleArrayTopic(name).publish())
+    return phase
+
+  @staticmethod
+  def instrument(obj: object, methodName: str, phase: PhaseTimer):
+    """
+    Replaces `obj.methodName` with a wrapper that times every call to it under `phase`.
+
+    Used to time methods that are called from outside the robot class, like a subsystem's
+    `periodic()` being called by the `CommandScheduler`.
+    """
+    method = getattr(obj, methodName)
+
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+      phase.start()
+      try:
+        return method(*args, **kwargs)
+      finally:
+        phase.stop()
+
+    setattr(obj, methodName, timed)
+
+  def periodic(self):
+    """
+    Commits every phase's time for this loop. Should be called once at the end of every loop.
+    """
+    for phase in self.phases:
+      phase.commit()
+
+    self.loopCount += 1
+    if self.loopCount % self.publishPeriod == 0:
+      self.publish()
+
+  def publish(self):
+    for phase, publisher in zip(self.phases, self.publishers):
+      p50, p99, maximum = phase.statistics()
+      publisher.set([p50 * 1000, p99 * 1000, maximum * 1000, phase.overruns])
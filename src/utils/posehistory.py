@@ -0,0 +1,173 @@
+import math
+import typing
+from array import array
+
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import ChassisSpeeds
+
+from constants import DriveSubsystemConstants, RobotConstants
+
+
+class PoseHistory:
+  """
+  The robot's pose and field relative speeds over the last `duration` seconds, to answer "where
+  was the robot at time t" for latency compensated features.
+
+  Samples are stored as plain floats in preallocated arrays used as a ring buffer, so adding one
+  never allocates: the oldest sample is overwritten once the buffer is full, and samples older
+  than `duration` are evicted as new ones come in. Lookups binary search the timestamps
+  (O(log n)) and interpolate between the two samples around the requested time.
+  """
+
+  __slots__ = (
+    "duration",
+    "capacity",
+    "start",
+    "count",
+    "timestamps",
+    "x",
+    "y",
+    "theta",
+    "vx",
+    "vy",
+    "omega",
+  )
+
+  def __init__(
+    self,
+    duration: float = DriveSubsystemConstants.kPoseHistoryDuration,
+    period: float = RobotConstants.kLoopPeriod,
+  ):
+    """
+    :param duration: How long samples are kept (seconds).
+    :param period: Expected time between two samples (seconds), to size the buffer.
+    """
+    self.duration = duration
+    self.capacity = math.ceil(duration / period) + 1
+    # Index of the oldest sample, and number of samples
+    self.start = 0
+    self.count = 0
+
+    empty = bytes(8 * self.capacity)
+    self.timestamps = array("d", empty)
+    self.x = array("d", empty)
+    self.y = array("d", empty)
+    self.theta = array("d", empty)
+    self.vx = array("d", empty)
+    self.vy = array("d", empty)
+    self.omega = array("d", empty)
+
+  def clear(self):
+    """
+    Forgets every sample, for example after the pose is reset.
+    """
+    self.start = 0
+    self.count = 0
+
+  def add(self, timestamp: float, pose: Pose2d, speeds: ChassisSpeeds) -> bool:
+    """
+    Adds the newest sample. Returns False, and ignores it, if it isn't newer than the last one.
+
+    :param timestamp: FPGA timestamp (seconds) of the sample.
+    :param speeds: Field relative speeds.
+    """
+    capacity = self.capacity
+    if self.count > 0:
+      if timestamp <= self.timestamps[(self.start + self.count - 1) % capacity]:
+        return False
+
+      # Evict what is too old, keeping at least one sample before the window to interpolate from
+      oldest = timestamp - self.duration
+      while self.count > 1 and self.timestamps[(self.start + 1) % capacity] <= oldest:
+        self.start = (self.start + 1) % capacity
+        self.count -= 1
+
+    if self.count == capacity:
+      self.start = (self.start + 1) % capacity
+      self.count -= 1
+
+    i = (self.start + self.count) % capacity
+    self.timestamps[i] = timestamp
+    self.x[i] = pose.X()
+    self.y[i] = pose.Y()
+    self.theta[i] = pose.rotation().radians()
+    self.vx[i] = speeds.vx
+    self.vy[i] = speeds.vy
+    self.omega[i] = speeds.omega
+    self.count += 1
+    return True
+
+  def getOldestTimestamp(self) -> typing.Optional[float]:
+    return self.timestamps[self.start] if self.count > 0 else None
+
+  def getNewestTimestamp(self) -> typing.Optional[float]:
+    if self.count == 0:
+      return None
+    return self.timestamps[(self.start + self.count - 1) % self.capacity]
+
+  def find(self, timestamp: float) -> typing.Optional[tuple[int, int, float]]:
+    """
+    Finds the samples around a time: (index before, index after, fraction of the way from one to
+    the other). Times after the newest sample give the newest sample. Returns None when the
+    history is empty or the time is older than every sample.
+    """
+    count = self.count
+    if count == 0:
+      return None
+
+    capacity = self.capacity
+    start = self.start
+    timestamps = self.timestamps
+
+    # Number of samples at or before the timestamp
+    low, high = 0, count
+    while low < high:
+      middle = (low + high) // 2
+      if timestamps[(start + middle) % capacity] <= timestamp:
+        low = middle + 1
+      else:
+        high = middle
+
+    if low == 0:
+      return None
+    before = (start + low - 1) % capacity
+    if low == count:
+      return before, before, 0.0
+
+    after = (start + low) % capacity
+    t = (timestamp - timestamps[before]) / (timestamps[after] - timestamps[before])
+    return before, after, t
+
+  def getPose(self, timestamp: float) -> typing.Optional[Pose2d]:
+    """
+    The pose at a time (FPGA seconds), interpolated between the samples around it.
+    """
+    found = self.find(timestamp)
+    if found is None:
+      return None
+
+    before, after, t = found
+    x, y, theta = self.x, self.y, self.theta
+    # Along the shortest rotation
+    dtheta = math.remainder(theta[after] - theta[before], math.tau)
+    return Pose2d(
+      x[before] + (x[after] - x[before]) * t,
+      y[before] + (y[after] - y[before]) * t,
+      Rotation2d(theta[before] + dtheta * t),
+    )
+
+  def getSpeeds(self, timestamp: float) -> typing.Optional[ChassisSpeeds]:
+    """
+    The field relative speeds at a time (FPGA seconds), interpolated between the samples around it.
+    """
+    found = self.find(timestamp)
+    if found is None:
+      return None
+
+    before, after, t = found
+    vx, vy, omega = self.vx, self.vy, self.omega
+    return ChassisSpeeds(
+      vx[before] + (vx[after] - vx[before]) * t,
+      vy[before] + (vy[after] - vy[before]) * t,
+      omega[before] + (omega[after] - omega[before]) * t,
+    )
@@ -0,0 +1,190 @@
+import enum
+import math
+import typing
+
+import wpilib
+from rev import SparkBase, SparkBaseConfig
+from wpilib import RobotController, Timer
+
+from constants import PowerManagerConstants
+from utils.inputlog import InputLog
+from utils.sparkconfig import configureTemporarily
+from utils.telemetry import Priority, Telemetry
+
+
+class PowerLevel(enum.IntEnum):
+  kNormal = 0
+  kReduced = 1
+  kCritical = 2
+
+
+class PowerSample(typing.NamedTuple):
+  voltage: float
+  """Battery voltage (volts)."""
+  current: float
+  """Total current of the robot, measured by the power distribution (amps)."""
+  brownedOut: bool
+
+
+class PowerConsumer(typing.NamedTuple):
+  """
+  A subsystem's motors, and how much of the current budget they may get. Consumers get their share
+  of the budget in the order they are given to the `PowerManager`.
+  """
+
+  name: str
+  motors: typing.Sequence[SparkBase]
+  """Motors whose current is measured and limited."""
+  minCurrentLimit: int
+  """Lowest current limit (amps, per motor), whatever the budget."""
+  maxCurrentLimit: int
+  """Current limit (amps, per motor) when the budget allows it, the one in `config.py`."""
+  speedScales: typing.Sequence[float]
+  """Speed scale at each `PowerLevel`."""
+  setSpeedScale: typing.Callable[[float], None]
+
+
+def allocateCurrent(budget: float, consumers: typing.Sequence[PowerConsumer]) -> list[int]:
+  """
+  Splits a current budget (amps) across consumers by priority and returns each consumer's current
+  limit (amps, per motor). Every consumer gets its minimum, then what is left goes to the first
+  consumers, up to their maximum.
+  """
+  limits = [consumer.minCurrentLimit for consumer in consumers]
+  remaining = budget - sum(
+    consumer.minCurrentLimit * len(consumer.motors) for consumer in consumers
+  )
+
+  for i, consumer in enumerate(consumers):
+    if remaining <= 0:
+      break
+    extra = min(
+      consumer.maxCurrentLimit - consumer.minCurrentLimit, remaining / len(consumer.motors)
+    )
+    # Sparks only take whole amps
+    extra = math.floor(extra)
+    limits[i] += extra
+    remaining -= extra * len(consumer.motors)
+
+  return limits
+
+
+class PowerManager:
+  """
+  Lowers the motors' current limits and speeds as the battery sags, to stay out of brownout
+  (heavy pushing, every mechanism moving at once) without giving up any performance otherwise.
+
+  Every loop, the battery voltage and the robot's total current pick a
+  `PowerLevel`. Each level has a current budget, split across the consumers by priority (see
+  `allocateCurrent()`), and a speed scale per consumer. Nothing is sent to the Sparks unless the
+  level changes: levels are entered as soon as a threshold is crossed, and left one at a time once
+  clear of it by a margin for `kRecoveryTime`, so a noisy voltage can't flip limits every loop.
+  """
+
+  def __init__(
+    self,
+    consumers: typing.Sequence[PowerConsumer],
+    currentBudgets: typing.Sequence[float] = PowerManagerConstants.kCurrentBudgets,
+  ):
+    """
+    :param consumers: Highest priority first.
+    :param currentBudgets: Current (amps) shared by every consumer's motors, at each level.
+    """
+    self.consumers = tuple(consumers)
+    self.allocations = [allocateCurrent(budget, self.consumers) for budget in currentBudgets]
+    # The Sparks' output current is the motor's phase current, which is higher than what it draws
+    # from the battery at low duty cycles. The PDH measures what the battery actually supplies.
+    self.powerDistribution = wpilib.PowerDistribution()
+
+    self.level = PowerLevel.kNormal
+    self.recoveryStart: typing.Optional[float] = None
+    self.levelChanges = 0
+
+    telemetry = Telemetry.getInstance()
+    self.levelTelemetry = telemetry.addDouble("Power/Level", Priority.kMedium)
+    self.voltageTelemetry = telemetry.addDouble("Power/Battery Voltage", Priority.kMedium)
+    self.currentTelemetry = telemetry.addDouble("Power/Total Current", Priority.kMedium)
+    self.currentLimitTelemetry = [
+      telemetry.addDouble(f"Power/{consumer.name}/Current Limit", Priority.kLow)
+      for consumer in self.consumers
+    ]
+
+    # The normal level's limits can be lower than those in `config.py`, and only the limits that
+    # change are sent afterwards
+    self.currentLimits = list(self.allocations[PowerLevel.kNormal])
+    for i, consumer in enumerate(self.consumers):
+      self.currentLimitTelemetry[i].set(self.currentLimits[i])
+      PowerManager.sendCurrentLimit(consumer.motors, self.currentLimits[i])
+
+  def readSample(self) -> PowerSample:
+    return PowerSample(
+      RobotController.getBatteryVoltage(),
+      self.powerDistribution.getTotalCurrent(),
+      RobotController.isBrownedOut(),
+    )
+
+  @staticmethod
+  def getLevel(voltage: float, current: float) -> PowerLevel:
+    if (
+      voltage < PowerManagerConstants.kCriticalVoltage
+      or current > PowerManagerConstants.kCriticalCurrent
+    ):
+      return PowerLevel.kCritical
+    if (
+      voltage < PowerManagerConstants.kReducedVoltage
+      or current > PowerManagerConstants.kReducedCurrent
+    ):
+      return PowerLevel.kReduced
+    return PowerLevel.kNormal
+
+  def periodic(self):
+    sample = self.readSample()
+    InputLog.getInstance().logPower(sample)
+
+    level = (
+      PowerLevel.kCritical if sample.brownedOut else self.getLevel(sample.voltage, sample.current)
+    )
+    if level > self.level:
+      self.setLevel(level)
+    elif level < self.level and (
+      self.getLevel(
+        sample.voltage - PowerManagerConstants.kVoltageHysteresis,
+        sample.current + PowerManagerConstants.kCurrentHysteresis,
+      )
+      < self.level
+    ):
+      now = Timer.getFPGATimestamp()
+      if self.recoveryStart is None:
+        self.recoveryStart = now
+      elif now - self.recoveryStart >= PowerManagerConstants.kRecoveryTime:
+        self.setLevel(PowerLevel(self.level - 1))
+    else:
+      self.recoveryStart = None
+
+    self.levelTelemetry.set(self.level)
+    self.voltageTelemetry.set(sample.voltage)
+    self.currentTelemetry.set(sample.current)
+
+  def setLevel(self, level: PowerLevel):
+    """
+    Sends the level's current limits (only those that changed) and speed scales.
+    """
+    self.level = level
+    self.recoveryStart = None
+    self.levelChanges += 1
+
+    for i, consumer in enumerate(self.consumers):
+      limit = self.allocations[level][i]
+      if limit != self.currentLimits[i]:
+        self.currentLimits[i] = limit
+        self.currentLimitTelemetry[i].set(limit)
+        PowerManager.sendCurrentLimit(consumer.motors, limit)
+
+      consumer.setSpeedScale(consumer.speedScales[level])
+
+  @staticmethod
+  def sendCurrentLimit(motors: typing.Sequence[SparkBase], limit: int):
+    # Only the current limit changes
+    config = SparkBaseConfig().smartCurrentLimit(limit)
+    for motor in motors:
+      configureTemporarily(motor, config)
@@ -0,0 +1,162 @@
+import gc
+import sys
+from array import array
+
+import wpilib
+from ntcore import NetworkTableInstance
+
+from constants import RetentionMonitorConstants
+from utils.looptimer import LoopTimer
+
+
+class RetentionWindow:
+  """
+  Rolling window of the memory blocks a phase of the loop left allocated, one sample per sampled
+  loop.
+  """
+
+  __slots__ = ("name", "budget", "samples", "index", "count", "regressed", "regressions")
+
+  def __init__(self, name: str, budget: int, windowSize: int):
+    """
+    :param name: Name the phase is published under.
+    :param budget: Median blocks per loop over which the phase is flagged as a regression.
+    :param windowSize: Number of samples kept in the rolling window.
+    """
+    self.name = name
+    self.budget = budget
+    self.samples = array("q", bytes(8 * windowSize))
+    self.index = 0
+    self.count = 0
+    self.regressed = False
+    self.regressions = 0
+
+  def add(self, blocks: int) -> bool:
+    """
+    Records a sample. Returns True if this sample made the phase regress.
+    """
+    self.samples[self.index] = blocks
+    self.index = (self.index + 1) % len(self.samples)
+    self.count += 1
+
+    # Not until the window is full: the first loops fill caches and histories
+    regressed = self.count >= len(self.samples) and self.statistics()[0] > self.budget
+    newRegression = regressed and not self.regressed
+    self.regressed = regressed
+    if newRegression:
+      self.regressions += 1
+    return newRegression
+
+  def statistics(self) -> tuple[int, int]:
+    """
+    Returns the (median, max) of the rolling window, in blocks.
+    """
+    size = min(self.count, len(self.samples))
+    if size == 0:
+      return (0, 0)
+
+    window = sorted(self.samples[:size])
+    return (window[size // 2], window[-1])
+
+
+class RetentionMonitor:
+  """
+  Samples how many objects each phase of a `LoopTimer`, and the whole loop, leave allocated, and
+  flags the phases that go over their budget.
+
+  Once every `samplePeriod` loops, the phases count the memory blocks allocated by Python (about
+  one per object, and two for wpimath's) before and after each call. Temporaries freed before the
+  phase ends cancel out: what is left is what the phase keeps, or leaves for the garbage collector
+  (reference cycles). That is what builds up until a collection pauses the loop, or leaks. Loops
+  in which the collector ran are dropped.
+
+  It doesn't count allocations: a phase that creates and drops hundreds of objects every loop
+  shows 0. Counting those needs `tracemalloc`, which slows every allocation while it runs, and
+  starting and stopping it for each sample crashed the tests (Python 3.11, with native threads).
+
+  Counting blocks walks Python's whole heap, hence the sampling. Every phase is published to
+  `/RetainedObjects/<phase>` as `[median, max, regressed]`, and a warning is reported to the
+  driver station when a phase's median goes over its budget.
+  """
+
+  kLoop = "Loop"
+
+  def __init__(
+    self,
+    loopTimer: LoopTimer,
+    tableName: str = RetentionMonitorConstants.kTableName,
+    samplePeriod: int = RetentionMonitorConstants.kSamplePeriodLoops,
+    windowSize: int = RetentionMonitorConstants.kWindowSize,
+  ):
+    """
+    Monitors the phases the loop timer has when created.
+    """
+    self.phases = list(loopTimer.phases)
+    self.samplePeriod = samplePeriod
+
+    self.loop = RetentionWindow(self.kLoop, RetentionMonitorConstants.kLoopBudget, windowSize)
+    self.windows = [
+      RetentionWindow(phase.name, RetentionMonitorConstants.kPhaseBudget, windowSize)
+      for phase in self.phases
+    ]
+
+    table = NetworkTableInstance.getDefault().getTable(tableName)
+    self.publishers = [
+      table.getIntegerArrayTopic(window.name).publish() for window in (self.loop, *self.windows)
+    ]
+
+    self.loopCount = 0
+    self.sampling = False
+    self.startBlocks = 0
+    self.startCollections = 0
+
+  @staticmethod
+  def getCollections() -> int:
+    return sum(generation["collections"] for generation in gc.get_stats())
+
+  def periodic(self):
+    """
+    Records this loop's sample, if it was sampled, and arms the next one. Should be called once at
+    the end of every loop, before `LoopTimer.periodic()` (which resets which phases ran).
+    """
+    if self.sampling:
+      self.record()
+
+    self.loopCount += 1
+    if self.loopCount % self.samplePeriod == 0:
+      for phase in self.phases:
+        phase.sampling = True
+        phase.blocks = 0
+      self.sampling = True
+      self.startCollections = self.getCollections()
+      self.startBlocks = sys.getallocatedblocks()
+
+  def record(self):
+    blocks = sys.getallocatedblocks() - self.startBlocks
+    self.sampling = False
+    for phase in self.phases:
+      phase.sampling = False
+
+    if self.getCollections() != self.startCollections:
+      return
+
+    regressed = []
+    if self.loop.add(blocks):
+      regressed.append(self.loop)
+    for phase, window in zip(self.phases, self.windows):
+      # Skipping the phases that did not run this loop
+      if phase.calls > 0 and window.add(phase.blocks):
+        regressed.append(window)
+
+    for window in regressed:
+      wpilib.reportWarning(
+        f"{window.name} leaves {window.statistics()[0]} objects allocated per loop, over its "
+        f"budget of {window.budget}"
+      )
+
+    self.publish()
+
+  def publish(self):
+    for window, publisher in zip((self.loop, *self.windows), self.publishers):
+      median, maximum = window.statistics()
+      publisher.set([median, maximum, int(window.regressed)])
@@ -0,0 +1,195 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import pathlib
+import threading
+import time
+import typing
+
+import wpilib
+from rev import REVLibError, SparkBase, SparkBaseConfig
+
+from constants import SparkConfigConstants
+from utils.telemetry import Priority, Telemetry
+
+logger = logging.getLogger("sparkconfig")
+
+
+class ConfigResult(typing.NamedTuple):
+  deviceId: int
+  persisted: bool
+  """The configuration changed, so safe parameters were reset and it was written to flash."""
+  duration: float
+  """Time (seconds) `configure()` took."""
+  error: REVLibError
+
+
+def defaultHashFile() -> typing.Optional[pathlib.Path]:
+  # Simulated Sparks start from their defaults every time, so every config is persisted
+  if wpilib.RobotBase.isSimulation():
+    return None
+  return pathlib.Path(wpilib.getOperatingDirectory()) / SparkConfigConstants.kHashFileName
+
+
+def configureTemporarily(motor: SparkBase, config: SparkBaseConfig):
+  """
+  Applies `config` to a Spark without resetting or persisting parameters, so a reboot is back to
+  `config.py`. On the robot it doesn't wait for the Spark's answer (errors are reported to the
+  driver station), but that crashes simulated Sparks, so they are configured synchronously.
+  """
+  resetMode = SparkBase.ResetMode.kNoResetSafeParameters
+  persistMode = SparkBase.PersistMode.kNoPersistParameters
+
+  if wpilib.RobotBase.isReal():
+    motor.configureAsync(config, resetMode, persistMode)
+  else:
+    motor.configure(config, resetMode, persistMode)
+
+
+class SparkConfigManager:
+  """
+  Applies the configs in `config.py` to every Spark, and only writes them to flash when they
+  changed.
+
+  Every config is always sent without resetting or persisting parameters, so a Spark that was
+  swapped, factory reset or left with settings from a previous run (like the `PowerManager`'s
+  current limits) still gets it. The hash of the last config persisted to each device is kept on
+  the roboRIO: when it doesn't match, safe parameters are also reset and the config is persisted.
+  Devices are configured in parallel on a thread pool. `waitForAll()` blocks until they are done,
+  `report()` publishes how long each one took.
+  """
+
+  _instance: typing.Optional["SparkConfigManager"] = None
+
+  @staticmethod
+  def getInstance() -> "SparkConfigManager":
+    if SparkConfigManager._instance is None:
+      SparkConfigManager._instance = SparkConfigManager(defaultHashFile())
+    return SparkConfigManager._instance
+
+  def __init__(self, hashFile: typing.Optional[pathlib.Path] = None):
+    """
+    :param hashFile: Where the hashes of persisted configs are kept. `None` always persists.
+    """
+    self.hashFile = hashFile
+    self.hashes: dict[str, str] = self.loadHashes()
+    self.lock = threading.Lock()
+    self.changed = False
+
+    self.executor = concurrent.futures.ThreadPoolExecutor(
+      max_workers=SparkConfigConstants.kMaxWorkers, thread_name_prefix="SparkConfig"
+    )
+    self.pending: list[concurrent.futures.Future[ConfigResult]] = []
+    self.results: list[ConfigResult] = []
+    self.startTime: typing.Optional[float] = None
+    self.endTime: typing.Optional[float] = None
+
+  @staticmethod
+  def configHash(config: SparkBaseConfig) -> str:
+    """
+    Hash of every parameter set by a config.
+    """
+    return hashlib.sha256(config.flatten().encode()).hexdigest()
+
+  def loadHashes(self) -> dict[str, str]:
+    if self.hashFile is None or not self.hashFile.exists():
+      return {}
+
+    try:
+      return json.loads(self.hashFile.read_text())
+    except (OSError, ValueError):
+      logger.warning("Could not read %s, persisting every Spark's config", self.hashFile)
+      return {}
+
+  def configure(self, motor: SparkBase, config: SparkBaseConfig) -> None:
+    """
+    Starts configuring a Spark. Safe parameters are only reset, and the config persisted, if it
+    isn't the last one persisted to this device. Returns right away, call `waitForAll()` before
+    relying on the configuration.
+    """
+    if self.startTime is None:
+      self.startTime = time.perf_counter()
+
+    configHash = self.configHash(config)
+    persist = self.hashFile is None or self.hashes.get(str(motor.getDeviceId())) != configHash
+
+    self.pending.append(self.executor.submit(self.apply, motor, config, configHash, persist))
+
+  def apply(
+    self, motor: SparkBase, config: SparkBaseConfig, configHash: str, persist: bool
+  ) -> ConfigResult:
+    start = time.perf_counter()
+    if persist:
+      error = motor.configure(
+        config, SparkBase.ResetMode.kResetSafeParameters, SparkBase.PersistMode.kPersistParameters
+      )
+    else:
+      # Only in RAM: fast, and it doesn't wear the flash
+      error = motor.configure(
+        config,
+        SparkBase.ResetMode.kNoResetSafeParameters,
+        SparkBase.PersistMode.kNoPersistParameters,
+      )
+    duration = time.perf_counter() - start
+
+    deviceId = motor.getDeviceId()
+    if persist and error == REVLibError.kOk:
+      with self.lock:
+        self.hashes[str(deviceId)] = configHash
+        self.changed = True
+
+    return ConfigResult(deviceId, persist, duration, error)
+
+  def waitForAll(self) -> list[ConfigResult]:
+    """
+    Waits for every configuration started so far and saves the new hashes.
+    """
+    for future in self.pending:
+      result = future.result()
+      self.results.append(result)
+      if result.error != REVLibError.kOk:
+        wpilib.reportError(f"Spark {result.deviceId} configuration failed: {result.error}")
+    self.pending.clear()
+    self.endTime = time.perf_counter()
+
+    self.saveHashes()
+    return self.results
+
+  def saveHashes(self):
+    if self.hashFile is None or not self.changed:
+      return
+
+    try:
+      self.hashFile.write_text(json.dumps(self.hashes, indent=2, sort_keys=True))
+      self.changed = False
+    except OSError:
+      logger.warning("Could not save %s", self.hashFile)
+
+  def report(self):
+    """
+    Logs and publishes the configuration times. Should be called once, after the last
+    `waitForAll()`.
+    """
+    # From the first configure() call until every Spark was configured
+    totalTime = (
+      self.endTime - self.startTime
+      if self.startTime is not None and self.endTime is not None
+      else 0.0
+    )
+    persisted = sum(result.persisted for result in self.results)
+
+    logger.info(
+      "Configured %d Sparks in %.1f ms (%d persisted to flash)",
+      len(self.results),
+      totalTime * 1000,
+      persisted,
+    )
+
+    telemetry = Telemetry.getInstance()
+    telemetry.addDouble("SparkConfig/Total Time (ms)", Priority.kLow).set(totalTime * 1000)
+    telemetry.addDouble("SparkConfig/Persisted", Priority.kLow).set(persisted)
+    for result in self.results:
+      telemetry.addDouble(f"SparkConfig/{result.deviceId} Time (ms)", Priority.kLow).set(
+        result.duration * 1000
+      )
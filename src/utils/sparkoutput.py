@@ -0,0 +1,122 @@
+import typing
+
+from rev import SparkBase, SparkClosedLoopController, SparkLowLevel
+from wpilib import Timer
+
+from constants import SparkOutputConstants
+from utils.telemetry import Priority, Telemetry
+
+
+class SparkOutput:
+  """
+  Sends setpoints to a Spark only when they change.
+
+  Default commands and closed loop setpoints usually send the exact same value every loop, which
+  is one CAN frame per motor per loop for nothing. A setpoint is only sent when its control type
+  changes, its value or feedforward moves by more than `tolerance`, or `keepAlivePeriod` has
+  passed since the last frame (so a missed frame is recovered from quickly). Sent and suppressed
+  frame counts are published under `CAN/<device id>`.
+  """
+
+  __slots__ = (
+    "motor",
+    "controller",
+    "tolerance",
+    "keepAlivePeriod",
+    "lastValue",
+    "lastControlType",
+    "lastArbFeedforward",
+    "lastSentTime",
+    "sentFrames",
+    "suppressedFrames",
+    "sentFramesTelemetry",
+    "suppressedFramesTelemetry",
+  )
+
+  def __init__(
+    self,
+    motor: SparkBase,
+    tolerance: float = SparkOutputConstants.kTolerance,
+    keepAlivePeriod: float = SparkOutputConstants.kKeepAlivePeriod,
+  ):
+    """
+    :param motor: Motor controller to send setpoints to.
+    :param tolerance: Changes smaller than this (in the setpoint's units) are not sent.
+    :param keepAlivePeriod: Time (seconds) after which an unchanged setpoint is sent again.
+    """
+    self.motor = motor
+    self.controller = motor.getClosedLoopController()
+    self.tolerance = tolerance
+    self.keepAlivePeriod = keepAlivePeriod
+
+    self.lastValue = 0.0
+    self.lastControlType: typing.Optional[SparkLowLevel.ControlType] = None
+    self.lastArbFeedforward = 0.0
+    self.lastSentTime = 0.0
+
+    self.sentFrames = 0
+    self.suppressedFrames = 0
+
+    telemetry = Telemetry.getInstance()
+    deviceId = motor.getDeviceId()
+    self.sentFramesTelemetry = telemetry.addDouble(f"CAN/{deviceId}/Sent Frames", Priority.kLow)
+    self.suppressedFramesTelemetry = telemetry.addDouble(
+      f"CAN/{deviceId}/Suppressed Frames", Priority.kLow
+    )
+
+  def shouldSend(
+    self, value: float, controlType: SparkLowLevel.ControlType, arbFeedforward: float
+  ) -> bool:
+    """
+    Returns whether the setpoint needs to be sent and updates the frame counters.
+    """
+    now = Timer.getFPGATimestamp()
+    tolerance = self.tolerance
+
+    if (
+      controlType is self.lastControlType
+      and abs(value - self.lastValue) <= tolerance
+      and abs(arbFeedforward - self.lastArbFeedforward) <= tolerance
+      and now - self.lastSentTime < self.keepAlivePeriod
+    ):
+      self.suppressedFrames += 1
+      self.suppressedFramesTelemetry.set(self.suppressedFrames)
+      return False
+
+    self.lastValue = value
+    self.lastControlType = controlType
+    self.lastArbFeedforward = arbFeedforward
+    self.lastSentTime = now
+    self.sentFrames += 1
+    self.sentFramesTelemetry.set(self.sentFrames)
+    return True
+
+  def set(self, speed: float) -> None:
+    """
+    Same as `SparkMax.set()` (duty cycle, -1 to 1).
+    """
+    if self.shouldSend(speed, SparkLowLevel.ControlType.kDutyCycle, 0.0):
+      self.motor.set(speed)
+
+  def setReference(
+    self,
+    value: float,
+    controlType: SparkLowLevel.ControlType,
+    arbFeedforward: float = 0.0,
+    arbFFUnits: SparkClosedLoopController.ArbFFUnits = (
+      SparkClosedLoopController.ArbFFUnits.kVoltage
+    ),
+  ) -> None:
+    """
+    Same as `SparkClosedLoopController.setReference()` on the first closed loop slot.
+    """
+    if self.shouldSend(value, controlType, arbFeedforward):
+      self.controller.setReference(
+        value, controlType, arbFeedforward=arbFeedforward, arbFFUnits=arbFFUnits
+      )
+
+  def invalidate(self) -> None:
+    """
+    Forces the next setpoint to be sent. Call this after anything else commands the motor.
+    """
+    self.lastControlType = None
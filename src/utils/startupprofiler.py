@@ -0,0 +1,90 @@
+import contextlib
+import importlib
+import logging
+import time
+import typing
+
+from wpilib import Timer
+
+from utils.telemetry import Priority, Telemetry
+
+logger = logging.getLogger("startup")
+
+
+class StartupStep(typing.NamedTuple):
+  name: str
+  depth: int
+  """How many steps this one is nested in."""
+  duration: float
+  """Wall-clock time (seconds)."""
+
+
+class StartupProfiler:
+  """
+  Measures how long each step of robot startup takes (imports, subsystem construction, deferred
+  work) and when the robot was ready.
+
+  Steps can be nested, each one's time includes its children. Everything is logged and published
+  under `Telemetry/Startup` by `report()`.
+  """
+
+  _instance: typing.Optional["StartupProfiler"] = None
+
+  @staticmethod
+  def getInstance() -> "StartupProfiler":
+    if StartupProfiler._instance is None:
+      StartupProfiler._instance = StartupProfiler()
+    return StartupProfiler._instance
+
+  def __init__(self):
+    self.steps: list[StartupStep] = []
+    self.depth = 0
+    self.readyTime: typing.Optional[float] = None
+
+  @contextlib.contextmanager
+  def measure(self, name: str) -> typing.Iterator[None]:
+    """
+    Times everything in the `with` block as a single step.
+    """
+    index = len(self.steps)
+    # Reserve the step's place so it is listed before its children
+    self.steps.append(StartupStep(name, self.depth, 0.0))
+    self.depth += 1
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.depth -= 1
+      self.steps[index] = StartupStep(name, self.depth, time.perf_counter() - start)
+
+  def importModules(self, names: typing.Iterable[str]):
+    """
+    Imports each module as its own step. Later imports of a module are free, so the order decides
+    which step pays for shared dependencies.
+    """
+    for name in names:
+      with self.measure(f"import {name}"):
+        importlib.import_module(name)
+
+  def ready(self):
+    """
+    Marks the robot as ready to be enabled. On the roboRIO the FPGA timer starts at boot, so this
+    is the time to ready after a reboot.
+    """
+    self.readyTime = Timer.getFPGATimestamp()
+    logger.info("Robot ready %.2f s after boot", self.readyTime)
+
+  def report(self):
+    """
+    Logs and publishes every step. Should be called once, after the deferred startup work.
+    """
+    telemetry = Telemetry.getInstance()
+
+    if self.readyTime is not None:
+      telemetry.addDouble("Startup/Time To Ready (s)", Priority.kLow).set(self.readyTime)
+
+    for step in self.steps:
+      logger.info(
+        "%s%-*s %8.1f ms", "  " * step.depth, 40 - 2 * step.depth, step.name, step.duration * 1000
+      )
+      telemetry.addDouble(f"Startup/{step.name} (ms)", Priority.kLow).set(step.duration * 1000)
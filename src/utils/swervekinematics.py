@@ -0,0 +1,114 @@
+import math
+import typing
+from array import array
+
+from wpimath.geometry import Translation2d
+
+
+class SwerveKinematics:
+  """
+  Allocation free replacement for `toSwerveModuleStates` + `desaturateWheelSpeeds` +
+  `SwerveModuleState.optimize` on every module.
+
+  Module locations and chassis angular offsets are unpacked into plain floats once. `calculate()`
+  then writes every module's motor setpoint into the same two arrays each loop, instead of
+  creating `ChassisSpeeds`, `SwerveModuleState` and `Rotation2d` objects. Results match the WPILib
+  path (see `tests/test_swervekinematics.py`).
+  """
+
+  __slots__ = ("x", "y", "offsets", "maxSpeed", "headings", "speeds", "angles")
+
+  def __init__(
+    self,
+    moduleLocations: typing.Sequence[Translation2d],
+    chassisAngularOffsets: typing.Sequence[float],
+    maxSpeed: float,
+  ):
+    """
+    :param moduleLocations: Location of each module relative to the center of the robot.
+    :param chassisAngularOffsets: Angle (radians) of each module relative to the chassis.
+    :param maxSpeed: Maximum module speed (m/s). Faster setpoints are scaled down together.
+    """
+    self.x = array("d", (location.X() for location in moduleLocations))
+    self.y = array("d", (location.Y() for location in moduleLocations))
+    self.offsets = array("d", chassisAngularOffsets)
+    self.maxSpeed = maxSpeed
+
+    # Chassis relative module headings, kept when the robot is stopped like WPILib does
+    self.headings = array("d", bytes(8 * len(self.x)))
+
+    # Outputs of `calculate()`, in the turning motor's frame (chassis offset added)
+    self.speeds = array("d", bytes(8 * len(self.x)))
+    self.angles = array("d", bytes(8 * len(self.x)))
+
+  def calculate(
+    self, vx: float, vy: float, omega: float, currentAngles: typing.Sequence[float]
+  ) -> None:
+    """
+    Computes every module's optimized speed and angle setpoint into `speeds` and `angles`.
+
+    :param vx: Robot relative forward speed (m/s).
+    :param vy: Robot relative left speed (m/s).
+    :param omega: Counter-clockwise rotation speed (rad/s).
+    :param currentAngles: Each turning motor's current angle (radians, chassis offset included).
+    """
+    x = self.x
+    y = self.y
+    offsets = self.offsets
+    headings = self.headings
+    speeds = self.speeds
+    angles = self.angles
+    moving = vx != 0 or vy != 0 or omega != 0
+
+    fastest = 0.0
+    for i in range(len(x)):
+      if moving:
+        moduleX = vx - omega * y[i]
+        moduleY = vy + omega * x[i]
+        speed = math.hypot(moduleX, moduleY)
+        headings[i] = math.atan2(moduleY, moduleX)
+      else:
+        speed = 0.0
+
+      speeds[i] = speed
+      if speed > fastest:
+        fastest = speed
+
+    scale = self.maxSpeed / fastest if fastest > self.maxSpeed else 1.0
+
+    halfPi = math.pi / 2
+    for i in range(len(x)):
+      # Never turn more than 90 degrees, drive backwards instead
+      angle = math.remainder(headings[i] + offsets[i], math.tau)
+      speed = speeds[i] * scale
+      if abs(math.remainder(angle - currentAngles[i], math.tau)) > halfPi:
+        angle = math.remainder(angle + math.pi, math.tau)
+        speed = -speed
+
+      speeds[i] = speed
+      angles[i] = angle
+
+  @staticmethod
+  def discretize(vx: float, vy: float, omega: float, dt: float) -> tuple[float, float, float]:
+    """
+    Same as `ChassisSpeeds.discretize()`, without creating any objects.
+
+    :return: The discretized `(vx, vy, omega)`.
+    """
+    # Twist2d of a pose moving by (vx, vy, omega) * dt, like `Pose2d.log()`
+    dtheta = omega * dt
+    halfDtheta = dtheta / 2
+    cosMinusOne = math.cos(dtheta) - 1
+
+    if abs(cosMinusOne) < 1e-9:
+      halfThetaByTanOfHalfDtheta = 1.0 - dtheta * dtheta / 12.0
+    else:
+      halfThetaByTanOfHalfDtheta = -(halfDtheta * math.sin(dtheta)) / cosMinusOne
+
+    dx = vx * dt
+    dy = vy * dt
+    return (
+      (dx * halfThetaByTanOfHalfDtheta + dy * halfDtheta) / dt,
+      (dy * halfThetaByTanOfHalfDtheta - dx * halfDtheta) / dt,
+      omega,
+    )
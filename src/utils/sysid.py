@@ -0,0 +1,117 @@
+"""
+SysId characterization of the robot's mechanisms.
+
+The tests run in test mode, for the mechanism picked in the "SysId Mechanism" chooser. Each
+motor's voltage, position and velocity are logged to the robot's data log in the SysId tool's
+format. The logs are fitted offline by `utils.sysidfit`.
+"""
+
+import typing
+
+from commands2 import Command, Subsystem, cmd
+from commands2.sysid import SysIdRoutine
+from rev import SparkBase, SparkBaseConfig
+from wpilib import Notifier
+
+from constants import SysIdConstants
+from utils.sparkconfig import configureTemporarily
+
+
+class SysIdMotor(typing.NamedTuple):
+  name: str
+  motor: SparkBase
+  # Position and velocity in the motor controller's units (what its closed loop uses)
+  position: typing.Callable[[], float]
+  velocity: typing.Callable[[], float]
+
+
+class SysIdMechanism:
+  """
+  Quasistatic and dynamic tests of a mechanism, in both directions, using WPILib's `SysIdRoutine`.
+
+  The routine only logs once per loop, so the motors are logged by a notifier at `frequency`
+  instead, with the Sparks' status frames sped up to match while the tests run. The faster status
+  frames aren't persisted and last until the Sparks restart.
+  """
+
+  def __init__(
+    self,
+    name: str,
+    subsystem: Subsystem,
+    drive: typing.Callable[[float], None],
+    motors: typing.Sequence[SysIdMotor],
+    config: SysIdRoutine.Config,
+    angular: bool = False,
+    limit: typing.Optional[typing.Callable[[SysIdRoutine.Direction], bool]] = None,
+    frequency: float = SysIdConstants.kLogFrequency,
+  ):
+    """
+    :param name: Name in the log, and in `utils.sysidfit.kMechanismFits`.
+    :param drive: Applies a voltage to the mechanism.
+    :param angular: Whether positions are rotations (instead of meters).
+    :param limit: Whether a test in that direction must stop (ex: near the end of travel).
+    """
+    self.name = name
+    self.motors = tuple(motors)
+    self.angular = angular
+    self.limit = limit
+    self.period = 1 / frequency
+
+    self.routine = SysIdRoutine(
+      config, SysIdRoutine.Mechanism(drive, lambda log: None, subsystem, name)
+    )
+
+    self.notifier = Notifier(self.logMotors)
+    self.notifier.setName("SysId")
+
+  def logMotors(self):
+    """
+    Logs one sample of every motor. Called by the notifier.
+    """
+    routine = self.routine
+    for motor in self.motors:
+      log = routine.motor(motor.name).voltage(
+        motor.motor.getAppliedOutput() * motor.motor.getBusVoltage()
+      )
+      if self.angular:
+        log.angularPosition(motor.position()).angularVelocity(motor.velocity())
+      else:
+        log.position(motor.position()).velocity(motor.velocity())
+
+  def start(self):
+    config = SparkBaseConfig()
+    periodMs = SysIdConstants.kStatusFramePeriodMs
+    config.signals.appliedOutputPeriodMs(periodMs).busVoltagePeriodMs(
+      periodMs
+    ).primaryEncoderPositionPeriodMs(periodMs).primaryEncoderVelocityPeriodMs(
+      periodMs
+    ).absoluteEncoderPositionPeriodMs(periodMs).absoluteEncoderVelocityPeriodMs(periodMs)
+    for motor in self.motors:
+      configureTemporarily(motor.motor, config)
+
+    self.notifier.startPeriodic(self.period)
+
+  def stop(self):
+    self.notifier.stop()
+
+  def test(self, command: Command, direction: SysIdRoutine.Direction) -> Command:
+    if self.limit is not None:
+      command = command.until(lambda: self.limit(direction))
+    return command.andThen(cmd.waitSeconds(SysIdConstants.kRestTime))
+
+  def testCommand(self) -> Command:
+    """
+    Runs the four tests one after the other, letting the mechanism stop in between.
+    """
+    forward, reverse = SysIdRoutine.Direction.kForward, SysIdRoutine.Direction.kReverse
+    return (
+      cmd.sequence(
+        self.test(self.routine.quasistatic(forward), forward),
+        self.test(self.routine.quasistatic(reverse), reverse),
+        self.test(self.routine.dynamic(forward), forward),
+        self.test(self.routine.dynamic(reverse), reverse),
+      )
+      .beforeStarting(self.start)
+      .finallyDo(lambda interrupted: self.stop())
+      .withName(f"SysId {self.name}")
+    )
@@ -0,0 +1,296 @@
+"""
+Offline fitter for the SysId logs recorded by `utils.sysid`.
+
+It isn't imported by the robot code, since it needs numpy, which isn't installed on the roboRIO.
+Copy the `.wpilog` from the roboRIO, then fit it (from the `src` folder):
+
+  python -m utils.sysidfit LOG [--mechanism NAME] [--delay SECONDS]
+"""
+
+import argparse
+import bisect
+import math
+import statistics
+import typing
+
+import numpy as np
+from wpimath.controller import LinearQuadraticRegulator_1_1, LinearQuadraticRegulator_2_1
+from wpimath.system.plant import LinearSystemId
+from wpiutil.log import DataLogReader
+
+from constants import SysIdConstants
+
+kStatePrefix = "sysid-test-state-"
+kQuantities = ("voltage", "position", "velocity")
+
+
+class LoggedTest(typing.NamedTuple):
+  """
+  The samples of one motor during one run of a test.
+  """
+
+  state: str
+  times: list[float]  # seconds
+  voltages: list[float]
+  positions: list[float]
+  velocities: list[float]
+
+
+class FeedforwardGains(typing.NamedTuple):
+  kS: float
+  kV: float
+  kA: float
+  kG: float
+  rSquared: float
+  samples: int
+
+
+class FeedbackGains(typing.NamedTuple):
+  kP: float
+  kD: float
+
+
+class MechanismFit(typing.NamedTuple):
+  gravity: bool
+  # "velocity" or "position", like the mechanism's closed loop
+  loop: str
+  # Largest acceptable errors, used to weigh the LQR that suggests feedback gains
+  maxPositionError: float
+  maxVelocityError: float
+
+
+kMechanismFits = {
+  "drive": MechanismFit(False, "velocity", math.inf, 0.2),  # meters
+  "turn": MechanismFit(False, "position", 0.01, 0.5),  # rotations
+  "elevator": MechanismFit(True, "position", 0.25, 5),  # motor rotations
+}
+
+
+def readLog(path: str) -> dict[str, dict[str, list[LoggedTest]]]:
+  """
+  Reads the tests of every mechanism in a SysId data log.
+
+  :returns: The test segments of each motor, by mechanism then motor name.
+  """
+  entries: dict[int, tuple[str, ...]] = {}
+  states: dict[str, tuple[list[float], list[str]]] = {}
+  samples: dict[tuple[str, str], list[list[float]]] = {}
+
+  for record in DataLogReader(path):
+    if record.isStart():
+      data = record.getStartData()
+      if data.name.startswith(kStatePrefix):
+        mechanism = data.name[len(kStatePrefix) :]
+        entries[data.entry] = ("state", mechanism)
+        states.setdefault(mechanism, ([], []))
+      else:
+        quantity, _, rest = data.name.partition("-")
+        if quantity in kQuantities and "-" in rest:
+          motor, _, mechanism = rest.rpartition("-")
+          entries[data.entry] = (quantity, mechanism, motor)
+      continue
+    if record.isControl() or record.getEntry() not in entries:
+      continue
+
+    entry = entries[record.getEntry()]
+    timestamp = record.getTimestamp() / 1e6
+    if entry[0] == "state":
+      times, names = states[entry[1]]
+      times.append(timestamp)
+      names.append(record.getString())
+      continue
+
+    # Every sample starts with its voltage, followed by position and velocity
+    motorSamples = samples.setdefault(entry[1:], [])
+    value = record.getDouble()
+    if entry[0] == "voltage":
+      motorSamples.append([timestamp, value, math.nan, math.nan])
+    elif motorSamples:
+      motorSamples[-1][kQuantities.index(entry[0]) + 1] = value
+
+  tests: dict[str, dict[str, list[LoggedTest]]] = {}
+  for (mechanism, motor), motorSamples in samples.items():
+    stateTimes, stateNames = states.get(mechanism, ([], []))
+    segments = tests.setdefault(mechanism, {}).setdefault(motor, [])
+    segment: typing.Optional[LoggedTest] = None
+
+    for timestamp, voltage, position, velocity in motorSamples:
+      stateIndex = bisect.bisect_right(stateTimes, timestamp) - 1
+      state = stateNames[stateIndex] if stateIndex >= 0 else "none"
+      if state == "none" or math.isnan(velocity):
+        segment = None
+        continue
+
+      if segment is None or state != segment.state:
+        segment = LoggedTest(state, [], [], [], [])
+        segments.append(segment)
+
+      segment.times.append(timestamp)
+      segment.voltages.append(voltage)
+      segment.positions.append(position)
+      segment.velocities.append(velocity)
+
+  return tests
+
+
+def fitFeedforward(
+  segments: typing.Iterable[LoggedTest],
+  gravity: bool = False,
+  minVelocity: float = SysIdConstants.kMinVelocity,
+) -> FeedforwardGains:
+  """
+  Fits `V = kS sgn(v) + kV v + kA a (+ kG)` to the tests by ordinary least squares.
+
+  Like the SysId tool, it fits the discrete form `v[k+1] = α v[k] + β V[k] + γ sgn(v[k]) (+ δ)`
+  instead of differentiating noisy velocities. Segments are resampled at their median period first,
+  since notifier samples aren't evenly spaced.
+
+  :param gravity: Whether to fit kG, a constant voltage (an elevator's).
+  :param minVelocity: Samples slower than this are ignored (static friction isn't modeled).
+  """
+  rows: list[list[float]] = []
+  targets: list[float] = []
+  periods: list[float] = []
+
+  for segment in segments:
+    if len(segment.times) < 3:
+      continue
+    period = statistics.median(np.diff(segment.times))
+    periods.append(period)
+
+    times = np.arange(segment.times[0], segment.times[-1], period)
+    voltages = np.interp(times, segment.times, segment.voltages)
+    velocities = np.interp(times, segment.times, segment.velocities)
+
+    for k in range(len(times) - 1):
+      velocity = velocities[k]
+      if abs(velocity) < minVelocity:
+        continue
+      row = [velocity, voltages[k], math.copysign(1, velocity)]
+      if gravity:
+        row.append(1.0)
+      rows.append(row)
+      targets.append(velocities[k + 1])
+
+  if len(rows) < 4 + gravity:
+    raise ValueError("Not enough samples to fit")
+
+  x = np.array(rows)
+  y = np.array(targets)
+  coefficients, *_ = np.linalg.lstsq(x, y, rcond=None)
+  alpha, beta, gamma = coefficients[:3]
+  delta = coefficients[3] if gravity else 0.0
+
+  residuals = y - x @ coefficients
+  rSquared = 1 - float(residuals @ residuals) / float(((y - y.mean()) ** 2).sum())
+
+  if not (0 < alpha < 1) or beta <= 0:
+    raise ValueError(f"The data doesn't fit a DC motor (alpha={alpha:.4f}, beta={beta:.4f})")
+
+  period = statistics.median(periods)
+  kV = (1 - alpha) / beta
+  kA = -kV * period / math.log(alpha)
+  return FeedforwardGains(-gamma / beta, kV, kA, -delta / beta, rSquared, len(rows))
+
+
+def feedbackGains(
+  gains: FeedforwardGains,
+  fit: MechanismFit,
+  delay: float = 0.0,
+  maxControlEffort: float = SysIdConstants.kMaxControlEffort,
+  period: float = SysIdConstants.kControllerPeriod,
+) -> FeedbackGains:
+  """
+  Suggests feedback gains (volts per unit of error) with an LQR, like the SysId tool.
+
+  :param delay: Measurement delay (seconds) of the closed loop's sensor.
+  """
+  if fit.loop == "velocity":
+    plant = LinearSystemId.identifyVelocitySystemMeters(gains.kV, gains.kA)
+    regulator = LinearQuadraticRegulator_1_1(
+      plant, (fit.maxVelocityError,), (maxControlEffort,), period
+    )
+  else:
+    plant = LinearSystemId.identifyPositionSystemMeters(gains.kV, gains.kA)
+    regulator = LinearQuadraticRegulator_2_1(
+      plant, (fit.maxPositionError, fit.maxVelocityError), (maxControlEffort,), period
+    )
+
+  if delay > 0:
+    regulator.latencyCompensate(plant, period, delay)
+
+  gain = np.ravel(regulator.K())
+  return FeedbackGains(float(gain[0]), float(gain[1]) if fit.loop == "position" else 0.0)
+
+
+def printGains(
+  name: str, segments: typing.Sequence[LoggedTest], fit: MechanismFit
+) -> FeedforwardGains:
+  try:
+    gains = fitFeedforward(segments, fit.gravity)
+  except ValueError as e:
+    print(f"  {name:12} {e}")
+    raise
+  print(
+    f"  {name:12} kS {gains.kS:8.4f}  kV {gains.kV:8.4f}  kA {gains.kA:8.4f}"
+    + (f"  kG {gains.kG:8.4f}" if fit.gravity else "")
+    + f"  r² {gains.rSquared:.4f}  ({gains.samples} samples)"
+  )
+  return gains
+
+
+def printMechanism(
+  mechanism: str, motors: dict[str, list[LoggedTest]], delay: float = 0.0
+) -> typing.Optional[FeedforwardGains]:
+  """
+  Fits and prints the gains of each motor of a mechanism, then of all of them together with
+  suggested feedback gains. A motor that can't be fitted doesn't stop the others.
+
+  :returns: The gains of all the motors, `None` if they can't be fitted.
+  """
+  fit = kMechanismFits.get(mechanism, MechanismFit(False, "velocity", math.inf, 1))
+  print(f"{mechanism} ({fit.loop} loop)")
+
+  if not motors:
+    print("  no samples")
+    return None
+
+  for name, segments in motors.items():
+    try:
+      printGains(name, segments, fit)
+    except ValueError:
+      continue
+
+  try:
+    gains = printGains(
+      "all", [segment for segments in motors.values() for segment in segments], fit
+    )
+  except ValueError:
+    return None
+  feedback = feedbackGains(gains, fit, delay)
+  print(
+    f"  Suggested feedback: kP {feedback.kP:.4f}  kD {feedback.kD:.4f} (volts per unit of error),"
+    f" Spark kP {feedback.kP / 12:.4f} (duty cycle)"
+  )
+  return gains
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+  parser.add_argument("log", help="SysId .wpilog file")
+  parser.add_argument("--mechanism", help="only fit this mechanism")
+  parser.add_argument(
+    "--delay", type=float, default=0.0, help="measurement delay (seconds) of the sensors"
+  )
+  args = parser.parse_args()
+
+  tests = readLog(args.log)
+  if args.mechanism is not None:
+    tests = {args.mechanism: tests.get(args.mechanism, {})}
+
+  for mechanism, motors in tests.items():
+    printMechanism(mechanism, motors, args.delay)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,110 @@
+import enum
+import typing
+
+from ntcore import NetworkTableInstance
+
+from constants import TelemetryConstants
+
+T = typing.TypeVar("T")
+
+
+class Priority(enum.IntEnum):
+  """
+  How often (in loops) a telemetry entry is published.
+  """
+
+  kHigh = 1  # 50 Hz
+  kMedium = 5  # 10 Hz
+  kLow = 25  # 2 Hz
+
+
+class TelemetryEntry(typing.Generic[T]):
+  """
+  A single pre-resolved telemetry value.
+
+  `set()` only stores the value. It is written to NetworkTables by `Telemetry.flush()` once its
+  priority allows it, so setting it many times in a loop costs nothing extra.
+  """
+
+  __slots__ = ("publish", "period", "offset", "value", "dirty")
+
+  def __init__(self, publish: typing.Callable[[T], None], period: int, offset: int):
+    self.publish = publish
+    self.period = period
+    self.offset = offset
+    self.value: typing.Optional[T] = None
+    self.dirty = False
+
+  def set(self, value: T):
+    self.value = value
+    self.dirty = True
+
+
+class Telemetry:
+  """
+  Batched telemetry publisher.
+
+  Topics are resolved once when an entry is added instead of looking up string keys every loop
+  like `SmartDashboard.putNumber()`. Values are only written when `flush()` is called at the end
+  of the loop, each at the rate of its priority. Entries with the same priority are spread across
+  different loops so they are not all sent at once.
+  """
+
+  _instance: typing.Optional["Telemetry"] = None
+
+  @staticmethod
+  def getInstance() -> "Telemetry":
+    if Telemetry._instance is None:
+      Telemetry._instance = Telemetry()
+    return Telemetry._instance
+
+  def __init__(self, tableName: str = TelemetryConstants.kTableName):
+    self.table = NetworkTableInstance.getDefault().getTable(tableName)
+    self.entries: list[TelemetryEntry] = []
+    self.loopCount = 0
+
+  def addEntry(
+    self, publish: typing.Callable[[T], None], priority: Priority = Priority.kMedium
+  ) -> TelemetryEntry[T]:
+    """
+    Adds an entry that calls `publish` with the latest value when flushed. Used for anything that
+    isn't a plain topic, like `Field2d.setRobotPose`.
+    """
+    entry = TelemetryEntry(publish, int(priority), len(self.entries) % int(priority))
+    self.entries.append(entry)
+    return entry
+
+  def addDouble(self, name: str, priority: Priority = Priority.kMedium) -> TelemetryEntry[float]:
+    return self.addEntry(self.table.getDoubleTopic(name).publish().set, priority)
+
+  def addBoolean(self, name: str, priority: Priority = Priority.kMedium) -> TelemetryEntry[bool]:
+    return self.addEntry(self.table.getBooleanTopic(name).publish().set, priority)
+
+  def addStruct(
+    self, name: str, structType: type[T], priority: Priority = Priority.kMedium
+  ) -> TelemetryEntry[T]:
+    """
+    Adds a struct-typed topic (ex: `Pose2d`). Can be viewed directly in AdvantageScope.
+    """
+    return self.addEntry(self.table.getStructTopic(name, structType).publish().set, priority)
+
+  def addStructArray(
+    self, name: str, structType: type, priority: Priority = Priority.kMedium
+  ) -> TelemetryEntry[list]:
+    """
+    Adds a struct array topic (ex: `SwerveModuleState[]`).
+    """
+    return self.addEntry(self.table.getStructArrayTopic(name, structType).publish().set, priority)
+
+  def flush(self):
+    """
+    Publishes every entry that changed and is due this loop. Should be called once at the end of
+    every loop.
+    """
+    loopCount = self.loopCount
+    for entry in self.entries:
+      if entry.dirty and loopCount % entry.period == entry.offset:
+        entry.publish(entry.value)
+        entry.dirty = False
+
+    self.loopCount = loopCount + 1
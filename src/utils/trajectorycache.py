@@ -0,0 +1,438 @@
+"""
+Generated PathPlanner trajectories, cached on disk by the content of what they are generated from.
+
+Precompile every path before deploying (from the `src` folder):
+
+  python -m utils.trajectorycache
+"""
+
+import array
+import hashlib
+import importlib.metadata
+import logging
+import pathlib
+import struct
+import typing
+
+import wpilib
+from commands2 import Command, cmd
+from pathplannerlib.config import RobotConfig
+from pathplannerlib.events import (
+  CancelCommandEvent,
+  Event,
+  OneShotTriggerEvent,
+  PointTowardsZoneEvent,
+  ScheduleCommandEvent,
+  TriggerEvent,
+)
+from pathplannerlib.path import PathPlannerPath
+from pathplannerlib.trajectory import PathPlannerTrajectory, PathPlannerTrajectoryState
+from pathplannerlib.util import DriveFeedforwards
+from wpilib import DriverStation
+from wpimath.geometry import Pose2d, Rotation2d, Translation2d
+from wpimath.kinematics import ChassisSpeeds
+
+from constants import TrajectoryCacheConstants
+from utils.deploy import useRobotDeployDirectory
+
+logger = logging.getLogger("trajectorycache")
+
+kAlliances = (DriverStation.Alliance.kBlue, DriverStation.Alliance.kRed)
+
+# File header: magic, format version, modules, states, events
+kHeader = struct.Struct("<4sHHII")
+kMagic = b"PPTJ"
+kFormatVersion = 1
+# Doubles per state before the feedforwards: time, vx, vy, omega, x, y, rotation, linear velocity,
+# heading
+kStateLength = 9
+# Feedforward lists per state (DriveFeedforwards), each with one value per module
+kFeedforwardLists = 5
+
+
+def pathplannerDirectory() -> pathlib.Path:
+  return pathlib.Path(wpilib.getDeployDirectory()) / "pathplanner"
+
+
+def defaultCacheDirectory() -> typing.Optional[pathlib.Path]:
+  # Trajectories generated in simulation aren't kept, like on a freshly imaged roboRIO
+  if wpilib.RobotBase.isSimulation():
+    return None
+  return pathlib.Path(wpilib.getOperatingDirectory()) / TrajectoryCacheConstants.kCacheDirectoryName
+
+
+class TrajectoryCache:
+  """
+  Loads the trajectory of every PathPlanner path from disk instead of generating it on the robot.
+
+  PathPlanner generates a path's ideal trajectory (the one followed when the robot starts the path
+  at its ideal starting state, as in an auto) when the path's command is built, and flips it again
+  every time the path starts on the red alliance. Both take tens of milliseconds per path on the
+  roboRIO. Each trajectory is stored in a compact binary file named after the hash of the `.path`
+  file, PathPlanner's `settings.json` (robot config), the alliance and the PathPlanner version, so
+  editing any of them simply misses the cache.
+
+  Trajectories are looked up in the precompiled folder (deployed with the code, see `main()`),
+  then in the robot's own cache folder, where missing ones are saved once generated.
+  `loadIdealTrajectories()` is called before the autos are built. `warmUpCommand()` prepares the
+  red alliance paths, one per loop, while the robot is disabled.
+
+  Trajectories are generated and rebuilt with PathPlanner's public API, but PathPlanner has no way
+  to give a path a trajectory: `loadIdealTrajectories()`, `loadFlippedPath()` and `pathEvents()`
+  rely on its internals. They do nothing (PathPlanner generates every trajectory itself) unless
+  the installed PathPlanner is `TrajectoryCacheConstants.kSupportedPathPlannerVersion`.
+  """
+
+  _instance: typing.Optional["TrajectoryCache"] = None
+
+  @staticmethod
+  def getInstance() -> "TrajectoryCache":
+    if TrajectoryCache._instance is None:
+      TrajectoryCache._instance = TrajectoryCache(
+        pathplannerDirectory(),
+        pathplannerDirectory() / TrajectoryCacheConstants.kPrecompiledDirectoryName,
+        defaultCacheDirectory(),
+      )
+    return TrajectoryCache._instance
+
+  def __init__(
+    self,
+    pathplannerDirectory: pathlib.Path,
+    precompiledDirectory: typing.Optional[pathlib.Path],
+    cacheDirectory: typing.Optional[pathlib.Path],
+  ):
+    """
+    :param pathplannerDirectory: PathPlanner's deploy folder (`paths` and `settings.json`).
+    :param precompiledDirectory: Trajectories generated before deploying. `None` to skip.
+    :param cacheDirectory: Where trajectories generated on the robot are saved. `None` to skip.
+    """
+    self.pathsDirectory = pathplannerDirectory / "paths"
+    self.settingsFile = pathplannerDirectory / "settings.json"
+    self.precompiledDirectory = precompiledDirectory
+    self.cacheDirectory = cacheDirectory
+
+    self.robotConfig: typing.Optional[RobotConfig] = None
+    self.pathplannerVersion: typing.Optional[str] = None
+    self.sharedDigest: typing.Optional["hashlib._Hash"] = None
+    self.hits = 0
+    self.misses = 0
+
+    self.warmUpQueue: typing.Optional[list[str]] = None
+
+  def getPathNames(self) -> list[str]:
+    return sorted(file.stem for file in self.pathsDirectory.glob("*.path"))
+
+  def getRobotConfig(self) -> RobotConfig:
+    # Only needed to generate trajectories, reading it on every boot would be wasted
+    if self.robotConfig is None:
+      self.robotConfig = RobotConfig.fromGUISettings()
+    return self.robotConfig
+
+  def getPathPlannerVersion(self) -> str:
+    # Looking up the installed version is slow
+    if self.pathplannerVersion is None:
+      self.pathplannerVersion = importlib.metadata.version("robotpy-pathplannerlib")
+    return self.pathplannerVersion
+
+  def isSupported(self) -> bool:
+    """
+    Whether the installed PathPlanner is the one the cache was checked against.
+    """
+    return self.getPathPlannerVersion() == TrajectoryCacheConstants.kSupportedPathPlannerVersion
+
+  def key(self, pathName: str, alliance: DriverStation.Alliance) -> str:
+    """
+    Hash of everything a path's trajectory is generated from.
+    """
+    if self.sharedDigest is None:
+      # Same for every path
+      self.sharedDigest = hashlib.sha256()
+      self.sharedDigest.update(f"{kFormatVersion}:{self.getPathPlannerVersion()}".encode())
+      self.sharedDigest.update(self.settingsFile.read_bytes())
+
+    digest = self.sharedDigest.copy()
+    digest.update((self.pathsDirectory / f"{pathName}.path").read_bytes())
+    digest.update(alliance.name.encode())
+    return digest.hexdigest()
+
+  ### Loading ###
+
+  def getTrajectory(
+    self, pathName: str, alliance: DriverStation.Alliance
+  ) -> typing.Optional[PathPlannerTrajectory]:
+    """
+    Returns a path's ideal trajectory for the alliance (flipped for red), generating and saving it
+    when it isn't cached. `None` when the path has no ideal trajectory.
+    """
+    path = PathPlannerPath.fromPathFile(pathName)
+    if path.isChoreoPath() or path.getIdealStartingState() is None:
+      return None
+
+    key = self.key(pathName, alliance)
+    for directory in (self.precompiledDirectory, self.cacheDirectory):
+      file = directory / f"{key}.traj" if directory is not None else None
+      if file is not None and file.exists():
+        trajectory = TrajectoryCache.decode(file.read_bytes(), path)
+        if trajectory is not None:
+          self.hits += 1
+          return trajectory
+
+    self.misses += 1
+    trajectory = self.generate(path, alliance)
+    if self.cacheDirectory is not None:
+      self.save(self.cacheDirectory / f"{key}.traj", trajectory)
+    return trajectory
+
+  def generate(
+    self, path: PathPlannerPath, alliance: DriverStation.Alliance
+  ) -> PathPlannerTrajectory:
+    if alliance == DriverStation.Alliance.kRed:
+      # Flipped from the blue alliance trajectory, like PathPlanner does
+      return self.generate(path, DriverStation.Alliance.kBlue).flip()
+
+    # Starting at the ideal starting state, like `PathPlannerPath.getIdealTrajectory()` (which
+    # would return the trajectory the path already has)
+    heading = path.getInitialHeading()
+    startingState = path.getIdealStartingState()
+    fieldSpeeds = Translation2d(startingState.velocity, heading)
+    startingSpeeds = ChassisSpeeds.fromFieldRelativeSpeeds(
+      fieldSpeeds.X(), fieldSpeeds.Y(), 0.0, heading
+    )
+    return path.generateTrajectory(startingSpeeds, startingState.rotation, self.getRobotConfig())
+
+  def save(self, file: pathlib.Path, trajectory: PathPlannerTrajectory):
+    try:
+      file.parent.mkdir(parents=True, exist_ok=True)
+      file.write_bytes(TrajectoryCache.encode(trajectory))
+    except OSError:
+      logger.warning("Could not save %s", file)
+
+  def loadIdealTrajectories(self):
+    """
+    Gives every path its cached blue alliance trajectory. Should be called before building autos,
+    which would otherwise generate them all.
+    """
+    if not self.isSupported():
+      wpilib.reportWarning(
+        f"Trajectory cache disabled, PathPlanner {self.getPathPlannerVersion()} isn't"
+        f" {TrajectoryCacheConstants.kSupportedPathPlannerVersion}"
+      )
+      return
+
+    for pathName in self.getPathNames():
+      trajectory = self.getTrajectory(pathName, DriverStation.Alliance.kBlue)
+      if trajectory is not None:
+        # Paths are loaded once, autos use this same instance
+        PathPlannerPath.fromPathFile(pathName)._idealTrajectory = trajectory
+
+    logger.info("Loaded trajectories: %d cached, %d generated", self.hits, self.misses)
+
+  def loadFlippedPath(self, pathName: str):
+    """
+    Makes a path flip to its cached red alliance trajectory instead of flipping its states when it
+    starts.
+    """
+    if not self.isSupported():
+      return
+
+    path = PathPlannerPath.fromPathFile(pathName)
+    trajectory = self.getTrajectory(pathName, DriverStation.Alliance.kRed)
+    if trajectory is None:
+      return
+
+    # Flip the path without its trajectory, which is what takes time
+    idealTrajectory = path._idealTrajectory
+    path._idealTrajectory = None
+    try:
+      flippedPath = path.flipPath()
+    finally:
+      path._idealTrajectory = idealTrajectory
+    flippedPath._idealTrajectory = trajectory
+
+    # FollowPathCommand flips its path every time it starts on the red alliance
+    path.flipPath = lambda: flippedPath
+
+  ### Warm-up ###
+
+  def warmUpCommand(self) -> Command:
+    """
+    Loads the red alliance trajectories, one path per loop, while the robot is disabled.
+    """
+    return (
+      cmd.run(self.warmUpNext)
+      .until(self.isWarm)
+      .onlyWhile(DriverStation.isDisabled)
+      .ignoringDisable(True)
+      .withName("Trajectory Warm-Up")
+    )
+
+  def warmUpNext(self):
+    if self.warmUpQueue is None:
+      self.warmUpQueue = self.getPathNames()
+    if self.warmUpQueue:
+      self.loadFlippedPath(self.warmUpQueue.pop(0))
+
+  def isWarm(self) -> bool:
+    return self.warmUpQueue is not None and not self.warmUpQueue
+
+  ### Binary format ###
+  # Header, then every state as doubles ([time, vx, vy, omega, x, y, rotation, linear velocity,
+  # heading] then each feedforward list), then every event's timestamp
+
+  @staticmethod
+  def encode(trajectory: PathPlannerTrajectory) -> bytes:
+    states = trajectory.getStates()
+    events = trajectory.getEvents()
+    modules = len(states[0].feedforwards.accelerationsMPS) if states else 0
+
+    values = array.array("d")
+    for state in states:
+      speeds = state.fieldSpeeds
+      pose = state.pose
+      feedforwards = state.feedforwards
+      values.extend(
+        (
+          state.timeSeconds,
+          speeds.vx,
+          speeds.vy,
+          speeds.omega,
+          pose.X(),
+          pose.Y(),
+          pose.rotation().radians(),
+          state.linearVelocity,
+          state.heading.radians(),
+        )
+      )
+      values.extend(feedforwards.accelerationsMPS)
+      values.extend(feedforwards.forcesNewtons)
+      values.extend(feedforwards.torqueCurrentsAmps)
+      values.extend(feedforwards.robotRelativeForcesXNewtons)
+      values.extend(feedforwards.robotRelativeForcesYNewtons)
+
+    values.extend(event.getTimestamp() for event in events)
+
+    header = kHeader.pack(kMagic, kFormatVersion, modules, len(states), len(events))
+    return header + values.tobytes()
+
+  @staticmethod
+  def decode(data: bytes, path: PathPlannerPath) -> typing.Optional[PathPlannerTrajectory]:
+    """
+    Rebuilds a trajectory saved by `encode()`. `None` if the data isn't a valid trajectory of
+    `path`.
+
+    :param path: Path the trajectory was generated from, its event markers hold the commands.
+    """
+    if len(data) < kHeader.size:
+      return None
+    magic, version, modules, stateCount, eventCount = kHeader.unpack_from(data)
+    stride = kStateLength + kFeedforwardLists * modules
+    if (
+      magic != kMagic
+      or version != kFormatVersion
+      or len(data) != kHeader.size + 8 * (stateCount * stride + eventCount)
+    ):
+      return None
+
+    events = pathEvents(path)
+    if len(events) != eventCount:
+      return None
+
+    values = array.array("d")
+    values.frombytes(data[kHeader.size :])
+
+    states = []
+    for i in range(0, stateCount * stride, stride):
+      state = PathPlannerTrajectoryState()
+      state.timeSeconds = values[i]
+      state.fieldSpeeds = ChassisSpeeds(values[i + 1], values[i + 2], values[i + 3])
+      state.pose = Pose2d(values[i + 4], values[i + 5], Rotation2d(values[i + 6]))
+      state.linearVelocity = values[i + 7]
+      state.heading = Rotation2d(values[i + 8])
+
+      start = i + kStateLength
+      state.feedforwards = DriveFeedforwards(
+        *(
+          values[start + j * modules : start + (j + 1) * modules].tolist()
+          for j in range(kFeedforwardLists)
+        )
+      )
+      states.append(state)
+
+    timestamps = values[stateCount * stride :]
+    for event, timestamp in zip(events, timestamps):
+      event.setTimestamp(timestamp)
+
+    return PathPlannerTrajectory(None, None, None, None, states, events)
+
+  ### Precompilation ###
+
+  def precompile(self) -> int:
+    """
+    Generates every path's trajectories into the precompiled folder and removes stale ones.
+    Returns how many trajectories were generated.
+    """
+    assert self.precompiledDirectory is not None
+    self.precompiledDirectory.mkdir(parents=True, exist_ok=True)
+
+    keys = set()
+    generated = 0
+    for pathName in self.getPathNames():
+      path = PathPlannerPath.fromPathFile(pathName)
+      if path.isChoreoPath() or path.getIdealStartingState() is None:
+        continue
+
+      for alliance in kAlliances:
+        key = self.key(pathName, alliance)
+        keys.add(key)
+        file = self.precompiledDirectory / f"{key}.traj"
+        if not file.exists():
+          self.save(file, self.generate(path, alliance))
+          generated += 1
+
+    for file in self.precompiledDirectory.glob("*.traj"):
+      if file.stem not in keys:
+        file.unlink()
+
+    return generated
+
+
+def pathEvents(path: PathPlannerPath) -> list[Event]:
+  """
+  A path's events, without their timestamps, in the order `PathPlannerTrajectory` adds them. Copied
+  from `PathPlannerTrajectory.__init__`, tests compare them with PathPlanner's own.
+  """
+  events: list[Event] = []
+  for marker in path.getEventMarkers():
+    if marker.command is not None:
+      events.append(ScheduleCommandEvent(marker.waypointRelativePos, marker.command))
+
+    if marker.endWaypointRelativePos >= 0.0:
+      if marker.command is not None:
+        events.append(CancelCommandEvent(marker.endWaypointRelativePos, marker.command))
+      events.append(TriggerEvent(marker.waypointRelativePos, marker.triggerName, True))
+      events.append(TriggerEvent(marker.endWaypointRelativePos, marker.triggerName, False))
+    else:
+      events.append(OneShotTriggerEvent(marker.waypointRelativePos, marker.triggerName))
+  for zone in path.getPointTowardsZones():
+    events.append(PointTowardsZoneEvent(zone.minWaypointRelativePos, zone.name, True))
+    events.append(PointTowardsZoneEvent(zone.maxWaypointRelativePos, zone.name, False))
+
+  # Stable sort on waypoint relative positions, like the trajectory does
+  events.sort(key=lambda event: event.getTimestamp())
+  return events
+
+
+def main():
+  useRobotDeployDirectory()
+
+  cache = TrajectoryCache(
+    pathplannerDirectory(),
+    pathplannerDirectory() / TrajectoryCacheConstants.kPrecompiledDirectoryName,
+    None,
+  )
+  generated = cache.precompile()
+  print(f"Precompiled {generated} trajectories into {cache.precompiledDirectory}")
+
+
+if __name__ == "__main__":
+  main()